@@ -11,9 +11,8 @@ app = marimo.App(
 def _():
     import marimo as mo
     import pandas as pd
-    import matplotlib.pyplot as plt
     import matplotlib.ticker as mtick
-    return mo, pd, plt
+    return mo, pd
 
 
 @app.cell
@@ -57,11 +56,34 @@ def _(mo):
 
 
 @app.cell
-def _(pd):
-    # load the raw csv
-    df_raw = pd.read_csv('../data/fish_stocking_data.csv')
+def _(trace):
+    from fish_stocking.cache import load_stocking_cached
+    from fish_stocking.dimensions import DimensionRegistry
+
+    # load the raw csv with a typed schema (Range, Section & Town are skipped at read time)
+    # a parquet cache is used when the csv hasn't changed since the last run
+    with trace.stage('load') as _stage:
+        df_raw, load_report = load_stocking_cached('../data/fish_stocking_data.csv')
+        # integer code & tags (species family, STS group) for every species, county,
+        # water body & site, so category checks are lookups instead of regexes
+        dimensions = DimensionRegistry(df_raw)
+        _stage['rows_out'] = len(df_raw)
+    print(f"{load_report['status']} load in {load_report['seconds']:.3f}s")
     df_raw.head()
-    return (df_raw,)
+    return df_raw, dimensions, load_report
+
+
+@app.cell
+def _(df_deduped, df_raw, load_report, quarantine):
+    from fish_stocking.pipeline import excluded_rows
+    from fish_stocking.query import Stocking
+
+    # sql engine (duckdb) over the same year partitioned parquet cache, the rankings
+    # below are declared as queries and aggregated there instead of in pandas
+    # (filters on Year skip whole partitions, the scan and group by use every core)
+    # collapsed duplicates and quarantined rows are left out like they are from df_clean
+    stocking = Stocking(load_report['cache'], exclude_rows=excluded_rows(df_raw, df_deduped, quarantine))
+    return (stocking,)
 
 
 @app.cell
@@ -71,33 +93,22 @@ def _(mo):
 
 
 @app.cell
-def _(df_raw, pd):
-    # missing vs non missing values count
-    missing_summary = pd.DataFrame({
-        "missing count": df_raw.isnull().sum(),
-        "non_missing_count": df_raw.notnull().sum(),
-        "total_rows": len(df_raw),
-        "missing_%": round(df_raw.isnull().mean() *100, 2)
-    })
-    missing_summary.sort_values(by="missing_%", ascending=False)
+def _(df_raw):
+    from fish_stocking.pipeline import missing_summary as _missing_summary
+
+    # missing vs non missing values count, most missing first
+    missing_summary = _missing_summary(df_raw)
+    missing_summary
     return (missing_summary,)
 
 
 @app.cell
 def _(df_raw):
     # Checking row values to better understand the dataset
-    print('Range sample values:')
-    print(df_raw['Range'].dropna().unique()[:10])
-
-    print("\nStrain sample values:")
+    # (Range, Town & Section are skipped by the loader so they aren't shown here)
+    print("Strain sample values:")
     print(df_raw['Strain'].dropna().unique()[:10])
 
-    print("\nTown sample values:")
-    print(df_raw['Town'].dropna().unique()[:10])
-
-    print("\nsection sample values:")
-    print(df_raw['Section'].dropna().unique()[:10])
-
     print("\nsite name sample values:")
     print(df_raw['Site Name'].dropna().unique()[:10])
 
@@ -116,17 +127,119 @@ def _(df_raw):
 
 
 @app.cell
-def _(df_raw, pd):
-    # data cleaning & dropping rows not needed
-    df_clean = df_raw.drop(columns=["Range", "Section", "Town"])
+def _(mo):
+    mo.md(r"""# Duplicate stocking events""")
+    return
+
+
+@app.cell
+def _(df_raw, trace):
+    from fish_stocking.dedup import deduplicate
+
+    # repeated export rows of one stocking event inflate both the effort counts and the fish totals
+    # exact duplicates: same Date, Water Body, Site Name, Species, Strain & Number (hashed, in one pass)
+    # near duplicates: same water body, site, species & strain, at most 3 days apart with fish counts within 5%,
+    # only compared inside each water body's date window instead of between all pairs of rows
+    # set collapse_duplicates to 'exact' or 'near' to drop the later copies before anything is aggregated
+    collapse_duplicates = None
+    with trace.stage('dedup', rows_in=len(df_raw)) as _stage:
+        df_deduped, duplicates, duplicate_summary = deduplicate(df_raw, collapse=collapse_duplicates)
+        _stage['rows_out'] = len(df_deduped)
+    print(duplicate_summary.to_string(index=False))
+    duplicates
+    return collapse_duplicates, df_deduped, duplicate_summary, duplicates
 
-    # convert date to datetime and keep only the date part (drop the time part)
-    df_clean['Date'] = pd.to_datetime(df_clean['Date'], errors='coerce').dt.date
+
+@app.cell
+def _(mo):
+    mo.md(r"""# Validating the rows""")
+    return
+
+
+@app.cell
+def _(df_deduped, trace):
+    from fish_stocking.validation import validate
+
+    # data quality rules (validation.RULES) checked as vectorized masks over every row at once:
+    # rows with a negative Number, a missing or out of range Date or an unknown county are
+    # quarantined instead of going into the analysis, duplicate stocking events and strains
+    # seen with an unusual species are only reported
+    with trace.stage('validate', rows_in=len(df_deduped)) as _stage:
+        df_valid, quarantine, validation_report, validation_samples = validate(df_deduped)
+        _stage['rows_out'] = len(df_valid)
+    print(f"{len(quarantine):,} of {len(df_deduped):,} rows quarantined")
+    validation_report
+    return df_valid, quarantine, validation_report, validation_samples
+
+
+@app.cell
+def _(quarantine, validation_samples):
+    # the first offending rows of every rule, and the quarantined rows with the rules they broke
+    print(validation_samples[['Rule', 'Row', 'County', 'Water Body', 'Species', 'Strain', 'Date', 'Number']])
+    quarantine
+    return
+
+
+@app.cell
+def _(df_valid, trace):
+    from fish_stocking.dates import with_calendar
+
+    # data cleaning: unused columns are skipped and Date is parsed by the loader,
+    # invalid rows were quarantined above, here Year, month, iso_week, day_of_year & the 5/10 year bins are added as small
+    # ints in one pass (a new frame, df_raw isn't touched)
+    with trace.stage('clean', rows_in=len(df_valid)) as _stage:
+        df_clean = with_calendar(df_valid)
+        _stage['rows_out'] = len(df_clean)
 
     print(df_clean['Date'].dropna().unique()[:10])
     return (df_clean,)
 
 
+@app.cell
+def _(collapse_duplicates, df_clean, load_report):
+    from fish_stocking.cache import default_cache_dir
+    from fish_stocking.memo import DiskMemo
+
+    # on-disk cache of the heavier steps, keyed by their code and input data
+    # df_clean is keyed by the csv it was loaded from instead of hashing all of its rows
+    memo = DiskMemo(default_cache_dir('../data/fish_stocking_data.csv') / 'memo')
+    memo.remember(df_clean, load_report['fingerprint'], collapse_duplicates)
+    return (memo,)
+
+
+@app.cell
+def _():
+    from fish_stocking.cache import default_cache_dir as _default_cache_dir
+    from fish_stocking.charts import ChartCache, bar, barh, line, shifts
+
+    # rendered charts, keyed by their data & style, the stale ones drawn in a process pool
+    charts = ChartCache(_default_cache_dir('../data/fish_stocking_data.csv') / 'charts')
+    return bar, barh, charts, line, shifts
+
+
+@app.cell
+def _():
+    import os
+    from fish_stocking.trace import Trace
+
+    # wall/cpu time, rows & memory of each stage (shown at the end of the notebook)
+    # FISH_STOCKING_PROFILE=trend_fit,export also samples the stacks of those stages
+    trace = Trace(profile=[s for s in os.environ.get('FISH_STOCKING_PROFILE', '').split(',') if s])
+    return (trace,)
+
+
+@app.cell
+def _(df_clean, memo, trace):
+    from fish_stocking.pipeline import CUBOIDS
+    from fish_stocking.rollup import compute_cuboids
+
+    # every grouping the analysis needs (pipeline.CUBOIDS), computed from a single pass over df_clean
+    with trace.stage('rollups', rows_in=len(df_clean)) as _stage:
+        cuboids = memo(compute_cuboids)(df_clean, CUBOIDS)
+        _stage['rows_out'] = sum(len(_cuboid) for _cuboid in cuboids.values())
+    return (cuboids,)
+
+
 @app.cell
 def _(mo):
     mo.md(
@@ -147,36 +260,25 @@ def _(mo):
 
 
 @app.cell
-def _(df_clean, pd):
-    # top 10 most consistenly stocked fish from 2000 to 2025
-    # group by year and species
-    yearly_species = df_clean.groupby(['Date', 'Species'])['Number'].sum().reset_index()
-
-    # extract year from the date
-    yearly_species['Year'] = pd.to_datetime(yearly_species['Date']).dt.year
-
-    # count how many years each species appears
-    species_years = yearly_species.groupby('Species')['Year'].nunique()
+def _(cuboids, stocking, trace):
+    from fish_stocking.pipeline import species_tables
+    from fish_stocking.ranking import top_bottom, top_k
 
-    # total number of fish stocked per species
-    species_total = yearly_species.groupby('Species')['Number'].sum()
-
-    # combining and filtering
-    species_stats = pd.DataFrame({
-        'Years Stocked': species_years,
-        'Total Fish Stocked': species_total
-    })
-
-    # sort by number of years for consistency and by fish total
-    top_10_consistent = species_stats.sort_values(
-        by=['Total Fish Stocked', 'Years Stocked'],
-        ascending=False
-    ).head(10)
-
-    bottom_10_consistent = species_stats.sort_values(
-        by=['Total Fish Stocked', 'Years Stocked'],
-        ascending=True
-    ).head(10)
+    # top 10 most consistenly stocked fish from 2000 to 2025
+    # fish stocked per year and species (from the shared rollup)
+    yearly_species = cuboids['year_species']
+
+    # total number of fish stocked per species and how many years each species appears,
+    # ranked by fish total and then number of years for consistency (bottom 10 least stocked first),
+    # plus the yearly totals with their 5 & 10 year bins and the averages over them
+    with trace.stage('yearly_species') as _stage:
+        _tables = species_tables(yearly_species, stocking)
+        species_stats = _tables['species_stats']
+        top_10_consistent = _tables['top_10_consistent']
+        bottom_10_consistent = _tables['bottom_10_consistent']
+        yearly_totals = _tables['yearly_totals']
+        species_averages = _tables['averages']
+        _stage['rows_out'] = len(species_stats)
 
     # format total fish with commas for readability
     top_10_consistent['Total Fish Stocked'] = top_10_consistent['Total Fish Stocked'].apply(lambda x: f"{x:,}")
@@ -185,44 +287,20 @@ def _(df_clean, pd):
     top_10_consistent
     return (
         bottom_10_consistent,
+        species_averages,
         species_stats,
         top_10_consistent,
+        top_bottom,
+        top_k,
         yearly_species,
+        yearly_totals,
     )
 
 
 @app.cell
-def _(plt, top_10_consistent):
-    # plot from dataframe showing numbers
-    # creating a copy to safely convert strings into integers
-    top_10_plot = top_10_consistent.copy()
-    if top_10_plot['Total Fish Stocked'].dtype== 'object':
-        top_10_plot['Total Fish Stocked'] = top_10_plot['Total Fish Stocked'].replace({',': ''}, regex=True).astype(int)
-
-
-    # convert to millions for readability
-    top_10_plot['Stocked (M)'] = top_10_plot['Total Fish Stocked'] / 1_000_000
-
-    # plot
-    fig, ax = plt.subplots(figsize=(10, 6))
-    bars = plt.barh(top_10_plot.index[::-1], top_10_plot['Stocked (M)'][::-1], color='mediumseagreen')
-
-    # addding labels and title
-    plt.xlabel("Total Fish Stocked (Millions)")
-    plt.title("Top 10 Consistently Stocked Fish Species in Michigan (2000 - 2025)")
-    plt.grid(axis='x', linestyle='--', alpha=0.6)
-
-    # adding data labels with 2 decimal places at end of each bar
-    for bar in bars:
-        width = bar.get_width()
-        plt.text(width + 1, bar.get_y() + bar.get_height() / 2,
-                f"{width:.2f} M", va='center', fontsize=9)
-
-    # adding footnote
-    fig.text(0.95, 0.01, "Figures shown in millions", ha="right", fontsize=8, style='italic')
-
+def _(figures, mo):
     # return figure so it shows in web dashboard
-    fig
+    mo.image(figures['top_consistent'])
     return
 
 
@@ -254,44 +332,9 @@ def _(bottom_10_consistent):
 
 
 @app.cell
-def _(bottom_10_consistent, plt):
-    # bottom 10 plot
-    bottom_10_plot = bottom_10_consistent.copy()
-    if bottom_10_plot['Total Fish Stocked'].dtype == 'object':
-        bottom_10_plot['Total Fish Stocked'] = (
-            bottom_10_plot['Total Fish Stocked']
-            .replace({',': ''}, regex=True)
-            .astype(int)
-        )
-    # sorting before plotting
-    bottom_10_plot = bottom_10_plot.sort_values(by='Total Fish Stocked', ascending=True).head(10)
-
-    # creating plots
-    fig1, ax1 = plt.subplots(figsize=(10,6))
-    bars1 = ax1.barh(bottom_10_plot.index, bottom_10_plot['Total Fish Stocked'], color='mediumseagreen')
-
-
-    # adding labels and title
-    ax1.set_xlabel('Total Fish Stocked')
-    ax1.set_title('Bottom 10 Fish Stocked Fish Species (2000-2025')
-    ax1.invert_yaxis() # highest at the top
-
-    # adding data labels at end of each bar
-    for bar1 in bars1:
-        width1 = bar1.get_width()
-        ax1.text(
-            width1 + max(bottom_10_plot['Total Fish Stocked']) * 0.01,  # small offset
-            bar1.get_y() + bar1.get_height() / 2,
-            f"{int(width1):,}",  # convert to int and format with commas
-            va='center',
-            fontsize=9
-        )
-
-    # footnote
-    fig1.text(0.95, 0.01, "Figures shown in raw totals", fontsize=8, style='italic')
-
+def _(figures, mo):
     #show plot
-    fig1
+    mo.image(figures['bottom_consistent'])
     return
 
 
@@ -302,26 +345,10 @@ def _(mo):
 
 
 @app.cell
-def _(plt, yearly_species):
-    # grouping by year 
-    yearly_totals = (
-        yearly_species.groupby('Year')['Number'].sum().reset_index().sort_values('Year')
-    )
-
-    # plot the yearly trend
-    fig2, ax2 = plt.subplots(figsize=(10,6))
-    ax2.plot(yearly_totals['Year'], yearly_totals['Number'], marker='o', linestyle='-', color='mediumseagreen')
-
-    # format the chart
-    ax2.set_title('Total Fish Stocked Per Year in Michigan 2000 - 2025')
-    ax2.set_xlabel('Year')
-    ax2.set_ylabel('Total Fish Stocked')
-    ax2.grid(True, linestyle='--', alpha=0.5)
-    ax2.get_yaxis().set_major_formatter(plt.FuncFormatter(lambda x, _: f"{int(x):,}"))
-
+def _(figures, mo):
     # Show the figure
-    fig2
-    return (yearly_totals,)
+    mo.image(figures['yearly_totals'])
+    return
 
 
 @app.cell
@@ -346,19 +373,9 @@ def _(mo):
 
 
 @app.cell
-def _(mo, yearly_totals):
-    # yearly average 2000 to 2025 
-    yearly_avg = yearly_totals['Number'].mean()
-
-    # creating bins for semi decadal a nd decadal
-    yearly_totals['5yr_bin'] = (yearly_totals['Year'] // 5) * 5
-    yearly_totals['10yr_bin'] = (yearly_totals['Year'] // 10) * 10
-
-    # calculating semi decadal average
-    semi_decadal_avg = yearly_totals.groupby('5yr_bin')['Number'].sum().mean()
-
-    # calculating decadal average
-    decadal_avg = yearly_totals.groupby('10yr_bin')['Number'].sum().mean()
+def _(mo, species_averages):
+    # yearly average 2000 to 2025, semi decadal & decadal averages (sums per 5 / 10 year bin, averaged)
+    yearly_avg, semi_decadal_avg, decadal_avg = species_averages['Fish Stocked']
 
     # print results
     # print(f"Yearly Average from 2000 to 2025: {yearly_avg:,.0f} fish")
@@ -388,50 +405,30 @@ def _(mo):
 
 
 @app.cell
-def _(pd, plt, yearly_species):
-    import numpy as np
-    from scipy.stats import linregress
+def _(memo, trace, yearly_species):
+    from fish_stocking.pipeline import trend_tables
+
+    # yearly totals per species filtered for 2000-2025, then the trend of each species
+    # (more than 3 years of data) in one vectorized pass, also keeping the intercept, r,
+    # p-value and std err of each fit, marked increasing or decreasing, the top 10 of both
+    # and the salmon, trout & steelhead species (tagged once per species in a registry)
+    with trace.stage('trend_fit', rows_in=len(yearly_species)) as _stage:
+        _trends = memo(trend_tables)(yearly_species, 2000, 2025)
+        trend_df = _trends['trend_df']
+        _stage['rows_out'] = len(trend_df)
+    top_increasing = _trends['top_increasing']
+    top_decreasing = _trends['top_decreasing']
+    focus_species = _trends['focus_species']
 
-    # ensure yearly totals per species
-    species_trends = (
-        yearly_species.groupby(['Year', 'Species'])['Number']
-            .sum()
-            .reset_index()
-    )
-
-    # filter for 200-2025
-    species_trends = species_trends[
-        (species_trends['Year'] >= 2000) & (species_trends['Year'] <=2025)
-    ]
+    print(top_increasing)
+    return focus_species, top_decreasing, top_increasing, trend_df
 
-    # claculate trend for each species
-    trend_results = []
-    for species, group in species_trends.groupby('Species'):
-        if len(group['Year'].unique()) > 3:
-            slope, intercept, r_value, p_value, std_err = linregress(group['Year'], group['Number'])
-            trend_results.append({
-                'Species' : species,
-                'Slope' : slope,
-                'Mean Stocked' : group['Number'].mean(),
-                'Years Observed' : group['Year'].nunique()
-            })
-    trend_df = pd.DataFrame(trend_results)
-
-    # identify increase & decrease
-    trend_df['Trend'] = np.where(trend_df['Slope'] > 0, 'Increasing', 'Decreasing')
-
-    # top 10 increasing and descreasing
-    top_increasing = trend_df.sort_values('Slope', ascending=False).head(10)
-    top_decreasing = trend_df.sort_values('Slope', ascending=True).head(10)
 
-    print(top_increasing)
-    # creating visual for the trends
-    fig3, ax3 = plt.subplots(figsize=(10,6))
-    ax3.barh(top_increasing['Species'], top_increasing['Slope'], color='mediumseagreen')
-    ax3.set_title('Top 10 Increasing Fish Stocked (2000-2025')
-    ax3.set_xlabel('Trend Slope (Fish per Year)')
-    fig3
-    return top_decreasing, top_increasing, trend_df
+@app.cell
+def _(figures, mo):
+    # visual for the increasing trends
+    mo.image(figures['top_increasing'])
+    return
 
 
 @app.cell
@@ -447,14 +444,10 @@ def _(mo):
 
 
 @app.cell
-def _(plt, top_decreasing):
+def _(figures, mo, top_decreasing):
     # visuals for decreasing trend
     print(top_decreasing)
-    fig4,ax4 = plt.subplots(figsize=(10,6))
-    ax4.barh(top_decreasing['Species'], top_decreasing['Slope'], color='red')
-    ax4.set_title('Top 10 Decreasing Fish Stocked (2000 - 2025)')
-    ax4.set_xlabel('Trend Slope (Fish Per Year')
-    fig4
+    mo.image(figures['top_decreasing'])
     return
 
 
@@ -479,13 +472,10 @@ def _(mo):
 
 
 @app.cell
-def _(trend_df):
+def _(focus_species):
     # focusing on STS (Salmon, Trout, Steelhead)
-    focus_species = trend_df[
-        trend_df['Species'].str.contains('Salmon|Trout|Steelhead', case=False)
-    ].sort_values('Slope', ascending=False)
     print(focus_species)
-    return (focus_species,)
+    return
 
 
 @app.cell
@@ -495,17 +485,9 @@ def _(mo):
 
 
 @app.cell
-def _(focus_species, plt):
-    # focusing on STS
-    fig5, ax5 = plt.subplots(figsize=(10,6))
-
-    # color by slope
-    colors = ['green' if slope > 0 else 'red' for slope in focus_species['Slope']]
-
-    ax5.barh(focus_species['Species'], focus_species['Slope'], color=colors)
-    ax5.set_title('Salmon, Steelhead, Trout Trend 2000 - 2025')
-    ax5.set_xlabel('Trend Slope (Fish per Year)')
-    fig5
+def _(figures, mo):
+    # focusing on STS, colored by slope
+    mo.image(figures['focus_species'])
     return
 
 
@@ -522,23 +504,102 @@ def _(mo):
     return
 
 
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""# **When did the trend flip? 5 year rolling trends**""")
+    return
+
+
+@app.cell
+def _(cuboids, dimensions, trace, yearly_species):
+    from fish_stocking.pipeline import rolling_tables
+
+    # 5 year moving sums, slopes & year over year change for every species, county & water body,
+    # each window is a difference of running sums instead of a new fit
+    with trace.stage('rolling_trends', rows_in=len(yearly_species)) as _stage:
+        _rolling = rolling_tables(cuboids, window=5)
+        rolling_species = _rolling['rolling_species']
+        rolling_county = _rolling['rolling_county']
+        rolling_waterbody = _rolling['rolling_waterbody']
+        species_flips = _rolling['trend_flips']
+        _stage['rows_out'] = len(rolling_species) + len(rolling_county) + len(rolling_waterbody)
+
+    # rolling slope of the salmon, steelhead & trout species
+    sts_rolling = rolling_species[
+        dimensions.has_tag(rolling_species['Species'], 'Species', 'salmon_trout_steelhead')
+    ]
+    print(species_flips[dimensions.has_tag(species_flips['Species'], 'Species', 'salmon_trout_steelhead')])
+    return rolling_county, rolling_species, rolling_waterbody, species_flips, sts_rolling
+
+
 @app.cell
+def _(figures, mo):
+    mo.image(figures['sts_rolling'])
+    return
+
+
+@app.cell(hide_code=True)
 def _(mo):
-    mo.md(r"""## **Lets look at Monthly totals from 2000 to 2025**""")
+    mo.md(r"""# **Where did the stocking pattern shift? Change points & anomalies**""")
     return
 
 
 @app.cell
-def _(df_clean):
-    # total fish stocked per county
-    county_stocked = df_clean.groupby('County')['Number'].sum().reset_index(name='total_stocked')
+def _(cuboids, trace, trend_df, yearly_species):
+    from fish_stocking.pipeline import shift_tables
+
+    # level shifts (PELT) & robust z-score anomalies in the yearly and monthly series
+    # of every species, county & water body, all series of a dimension in one batch,
+    # and the species trends with when (if ever) their stocking level shifted
+    with trace.stage('change_points', rows_in=len(yearly_species)) as _stage:
+        _shifts = shift_tables(cuboids, trend_df)
+        shift_points = _shifts['shift_points']
+        shift_anomalies = _shifts['shift_anomalies']
+        shift_summary = _shifts['shift_summary']
+        trend_shifts = _shifts['trend_shifts']
+        _stage['rows_out'] = len(shift_summary)
+    return shift_anomalies, shift_points, shift_summary, trend_shifts
 
-    # sort from most to least
-    county_stocked = county_stocked.sort_values(by='total_stocked', ascending=False)
 
-    # declaring top and bottom 10
-    top_10_counties = county_stocked.head(10)
-    bottom_10_counties = county_stocked.tail(10)
+@app.cell
+def _(figures, mo, trend_df, trend_shifts):
+    # walleye, the most stocked species, with its shifted levels & anomalous years
+    mo.vstack([
+        mo.hstack([trend_df[['Species', 'Slope', 'Trend']], trend_shifts[['Species', 'Change Points', 'Last Change', 'Anomalies']]]),
+        mo.image(figures['walleye_shifts']),
+    ])
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    - # *Walleye, the most stocked species, dropped to a much lower level in 2007 and did not come back until 2011. 2007 & 2008 are flagged as anomalies together with 2020.*
+    - # *The dips are not just walleye: 2007, 2020 and 2024 are the years the most counties & water bodies shift down or stock unusually little, with 2020 standing out the most. Drops across that many places at once most likely point at program wide causes (funding, hatchery capacity, the 2020 shutdowns) more than species management.*
+    """
+    )
+    return
+
+
+@app.cell
+def _(mo):
+    mo.md(r"""## **Lets look at Monthly totals from 2000 to 2025**""")
+    return
+
+
+@app.cell
+def _(stocking, trace):
+    from fish_stocking.pipeline import county_tables
+
+    # total fish stocked per county and the top and bottom 10
+    # (most to least, the totals per county come back from the query and are ranked here)
+    with trace.stage('county_ranking') as _stage:
+        _counties = county_tables(stocking)
+        county_stocked = _counties['county_stocked']
+        top_10_counties = _counties['top_10_counties']
+        bottom_10_counties = _counties['bottom_10_counties']
+        _stage['rows_out'] = len(county_stocked)
 
     # show the top and bottom counties
     print("Counties with the most stocking efforts:")
@@ -550,40 +611,21 @@ def _(df_clean):
 
 
 @app.cell
-def _(df_clean, pd, plt):
-    #Ensure Date is datetime format
-    df_clean['Date'] = pd.to_datetime(df_clean['Date'])
-
-    # extract year and month
-    df_clean['Year'] = df_clean['Date'].dt.year
-    df_clean['month'] = df_clean['Date'].dt.month
+def _(stocking, trace):
+    from fish_stocking.pipeline import monthly_table
 
-    # total number of fished stocked per month
-    monthly_stocked = df_clean.groupby('month')['Number'].sum().reset_index(name='total_stocked')
-    monthly_stocked = monthly_stocked.sort_values('month')
+    # total number of fished stocked per month (month is taken from Date in the query)
+    with trace.stage('monthly'):
+        monthly_stocked = monthly_table(stocking)
     monthly_stocked
+    return (monthly_stocked,)
 
-    # visualization
-    fig6, ax6 = plt.subplots(figsize=(10,6))
-
-    # color for bars
-    bar_colors = ['green'] * len(monthly_stocked)
-
-    # horizontal bar chart
-    ax6.barh(monthly_stocked['month'].astype(str), monthly_stocked['total_stocked'], color=bar_colors)
-
-    # adding value labels
-    for i, v in enumerate(monthly_stocked['total_stocked']):
-        ax6.text(v + 0.5, i, f"{v:,}", color='black', va='center')
-
-    # titles and labels
-    ax6.set_title('Total Fish Stocked per Month (2000-2025')
-    ax6.set_xlabel('Total Fish Stocked')
-    ax6.set_ylabel('Month')
 
+@app.cell
+def _(figures, mo):
     # show plot
-    fig6
-    return (monthly_stocked,)
+    mo.image(figures['monthly'])
+    return
 
 
 @app.cell(hide_code=True)
@@ -600,22 +642,67 @@ def _(mo):
 
 @app.cell(hide_code=True)
 def _(mo):
-    mo.md(r"""# **Let's plot top and bottom county numbers and then dive deeper and uncover insights**""")
+    mo.md(r"""# **How many times a year is a water body stocked with the same species?**""")
     return
 
 
 @app.cell
-def _(plt, top_10_counties):
-    # plotting top 10 counties
-    fig7, ax7 = plt.subplots(figsize=(10,6))
-    ax7.barh(top_10_counties["County"][::-1], top_10_counties['total_stocked'][:: -1], color="green") #reversed for better order
+def _(df_clean, memo, top_k, trace):
+    from fish_stocking.events import stocking_events
+    from fish_stocking.pipeline import EVENT_KEYS, SITE_EVENT_KEYS, event_tables
+
+    # one event per water body, species & stocking day (several plants on one day count once),
+    # with the days since the previous event from a single sorted pass; the same again per site
+    with trace.stage('stocking_events', rows_in=len(df_clean)) as _stage:
+        stocking_event_table = memo(stocking_events)(df_clean, EVENT_KEYS)
+        _site_events = memo(stocking_events)(df_clean, SITE_EVENT_KEYS)
+        _events = event_tables(stocking_event_table, _site_events)
+        stocking_per_year = _events['stocking_per_year']
+        stocking_summary = _events['stocking_frequency']
+        site_stocking_per_year = _events['site_stocking_per_year']
+        site_stocking_summary = _events['site_stocking_frequency']
+        _stage['rows_out'] = len(stocking_event_table) + len(_site_events)
+
+    # how often a water body & species pair is stocked in a year it is stocked at all
+    times_per_year = (
+        stocking_per_year['Times Stocked'].clip(upper=6).value_counts().sort_index()
+    )
 
-    # setting titles
-    ax7.set_title("Top 10 Counties by Total Fish Stocked (2000 - 2025)")
-    ax7.set_xlabel("Fish Stocked")
+    print(f"Median days between stockings of the same species & water body: "
+          f"{stocking_event_table['Days Since Last'].median():.0f}")
+    print("\nWater bodies & species stocked most often per year:")
+    print(top_k(stocking_summary, 'Events Per Year', 10)[
+        ['Water Body', 'Species', 'Events Per Year', 'Median Days Between', 'First Month', 'Last Month', 'Peak Month']
+    ])
+    print("\nSites & species stocked most often per year:")
+    print(top_k(site_stocking_summary, 'Events Per Year', 10)[
+        ['Water Body', 'Site Name', 'Species', 'Events Per Year', 'Median Days Between', 'Peak Month']
+    ])
+    return (
+        site_stocking_per_year,
+        site_stocking_summary,
+        stocking_per_year,
+        stocking_summary,
+        times_per_year,
+    )
 
-    # show plot
-    fig7
+
+@app.cell
+def _(figures, mo):
+    mo.image(figures['times_stocked'])
+    return
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""# **Let's plot top and bottom county numbers and then dive deeper and uncover insights**""")
+    return
+
+
+@app.cell
+def _(figures, mo):
+    # plotting top 10 counties
+    mo.image(figures['top_counties'])
     return
 
 
@@ -634,17 +721,9 @@ def _(mo):
 
 
 @app.cell
-def _(bottom_10_counties, plt):
+def _(figures, mo):
     # bottom 10 plot
-    fig8, ax8 = plt.subplots(figsize=(10,6))
-    ax8.barh(bottom_10_counties['County'][:: -1], bottom_10_counties['total_stocked'][:: -1], color='red') # reversed for better order
-
-    # setting titles
-    ax8.set_title("Bottom 10 Counties By Total Fish Stocked (2000 - 2025)")
-    ax8.set_xlabel("Total Fish Stocked")
-
-    # show plot
-    fig8
+    mo.image(figures['bottom_counties'])
     return
 
 
@@ -666,22 +745,16 @@ def _(mo):
 
 
 @app.cell
-def _(df_clean):
-    # count number of stocking efforts per water body
-    waterbody_efforts = (
-        df_clean.groupby('Water Body')
-        .size()
-        .reset_index(name="Stocking Efforts")
-    )
+def _(stocking, trace):
+    from fish_stocking.pipeline import waterbody_tables
 
-    # Identify top and bottom 10 water bodies
-    top_10_waterbodies = (
-        waterbody_efforts.sort_values(by="Stocking Efforts", ascending=False).head(10)
-    )
-
-    bottom_10_waterbodies = (
-        waterbody_efforts.sort_values(by="Stocking Efforts", ascending=False).tail(10)
-    )
+    # count number of stocking efforts per water body, and the top and bottom 10 (most to least)
+    with trace.stage('waterbody_ranking') as _stage:
+        _waterbodies = waterbody_tables(stocking)
+        waterbody_efforts = _waterbodies['waterbody_efforts']
+        top_10_waterbodies = _waterbodies['top_10_waterbodies']
+        bottom_10_waterbodies = _waterbodies['bottom_10_waterbodies']
+        _stage['rows_out'] = len(waterbody_efforts)
 
     # show top and bottom 10 waterbodies by stocking effort.
     print(top_10_waterbodies)
@@ -703,68 +776,260 @@ def _(mo):
 
 
 @app.cell
-def _(df_clean):
+def _(cuboids, memo, top_k, trace):
     from tabulate import tabulate # ALIGN TEXT BETTER WHEN PRINTING
+    from fish_stocking.pipeline import waterbody_leaders
 
     # Count total number of fish stocked per water body and species
-    species_totals_report = (
-        df_clean.groupby(['Water Body', 'Species'], as_index=False)['Number']
-        .sum()
-    )
+    species_totals_top10 = cuboids['waterbody_species']
 
     # count number of stocking efforts per water body
-    waterbody_efforts_report = (
-        df_clean.groupby('Water Body')
-        .size()
-        .reset_index(name='Stocking Efforts')
-    )
+    waterbody_efforts_report = cuboids['waterbody']
 
     # get the top 10 water bodies by stocking effort
-    top_10_waterbodies_report = (
-        waterbody_efforts_report.sort_values(by='Stocking Efforts', ascending=False)
-        .head(10)
-    )
-    # count total number of fish stocked per water body and species
-    species_totals_top10 = (
-        df_clean.groupby(['Water Body', 'Species'], as_index=False)['Number']
-        .sum()
+    top_10_waterbodies_report = top_k(waterbody_efforts_report, 'Stocking Efforts', 10)
+
+    with trace.stage('report', rows_in=len(species_totals_top10)) as _stage:
+        # top 3 species for every water body in one pass, formatted as "Species (count)"
+        # and padded with "(-- NONE --)" when a water body has fewer than 3 species,
+        # next to the top 10 water bodies in a "Top 3 Species" column
+        top_species_by_waterbody, top_10_waterbodies_top10 = memo(waterbody_leaders)(
+            species_totals_top10, waterbody_efforts_report
+        )
+        top_species_summary_top10 = top_10_waterbodies_top10['Top 3 Species'].tolist()
+
+        # using tabulate to show clean output
+        print(tabulate(top_10_waterbodies_top10, headers='keys', tablefmt='fancy_grid', showindex=False, maxcolwidths=[30, None, 70]))
+        _stage['rows_out'] = len(top_species_by_waterbody)
+    return (
+        top_10_waterbodies_report,
+        top_10_waterbodies_top10,
+        top_species_by_waterbody,
+        top_species_summary_top10,
+        waterbody_efforts_report,
     )
 
-    # get the top 10 water bodies by stocking effort
-    top_10_waterbodies_top10 = (
-        waterbody_efforts_report.sort_values(by='Stocking Efforts', ascending=False)
-        .head(10)
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""# **Explore the data by year range, species, county & water body**""")
+    return
+
+
+@app.cell
+def _(df_clean):
+    from fish_stocking.cube import StockingCube
+
+    # pre-aggregated cube with running sums along Year, so the filters below
+    # are answered from the cube instead of re-filtering df_clean
+    stocking_cube = StockingCube(df_clean)
+    return (stocking_cube,)
+
+
+@app.cell
+def _(dimensions, mo, stocking_cube):
+    # filters for the explorer
+    year_range = mo.ui.range_slider(
+        start=int(stocking_cube.years.min()),
+        stop=int(stocking_cube.years.max()),
+        step=1,
+        value=[int(stocking_cube.years.min()), int(stocking_cube.years.max())],
+        label="Years",
+        show_value=True,
     )
+    family_filter = mo.ui.dropdown(options=dimensions.tag_names('Species'), label="Species group")
+    species_filter = mo.ui.multiselect(options=stocking_cube.options('Species'), label="Species")
+    county_filter = mo.ui.multiselect(options=stocking_cube.options('County'), label="County")
+    waterbody_filter = mo.ui.multiselect(options=stocking_cube.options('Water Body'), label="Water Body")
 
-    # create a column with the top 3 species as a comma-separated string
-    top_species_summary_top10 = []
-    for wb in top_10_waterbodies_top10['Water Body']:
-        subset_top10 = (
-            species_totals_top10[species_totals_top10['Water Body'] == wb]
-            .sort_values('Number', ascending=False)
-            .head(3)  # top 3 species
-        )
-        # convert to list of formatted strings 
-        species_list_top10 = [f"{sp} ({num:,})" for sp, num in
-                              zip(subset_top10['Species'], subset_top10['Number'])]
+    mo.vstack([year_range, mo.hstack([family_filter, species_filter, county_filter, waterbody_filter])])
+    return county_filter, family_filter, species_filter, waterbody_filter, year_range
 
-        # if fewer than 3, fill remaining with None
-        while len(species_list_top10) < 3:
-            species_list_top10.append('(-- NONE --)')
 
-        # joining into one string
-        top_species_summary_top10.append(", ".join(species_list_top10))
+@app.cell
+def _(
+    county_filter,
+    dimensions,
+    family_filter,
+    charts,
+    line,
+    mo,
+    species_filter,
+    stocking_cube,
+    top_bottom,
+    waterbody_filter,
+    year_range,
+):
+    # every table & chart below is answered from the cube for the selected filters
+    explorer_years = tuple(year_range.value)
+    explorer_species_selected = list(species_filter.value)
+    if family_filter.value:
+        # a species group narrows the picked species (or stands in for them if none are picked)
+        family_species = dimensions.labels_with_tag('Species', family_filter.value)
+        explorer_species_selected = [
+            s for s in explorer_species_selected or family_species if s in family_species
+        ] or family_species
+    explorer_where = {
+        'Species': explorer_species_selected,
+        'County': county_filter.value,
+        'Water Body': waterbody_filter.value,
+    }
 
-    top_10_waterbodies_top10['Top 3 Species'] = top_species_summary_top10
+    explorer_species = stocking_cube.query('Species', explorer_years, explorer_where)
+    explorer_counties = stocking_cube.query('County', explorer_years, explorer_where)
+    explorer_waterbodies = stocking_cube.query('Water Body', explorer_years, explorer_where)
+    explorer_months = stocking_cube.query('month', explorer_years, explorer_where)
+    explorer_yearly = stocking_cube.query('Year', explorer_years, explorer_where)
+
+    # top and bottom 10 for the selection
+    explorer_top_species, explorer_bottom_species = top_bottom(explorer_species, 'Number', 10)
+    explorer_top_counties, explorer_bottom_counties = top_bottom(explorer_counties, 'Number', 10)
+    explorer_top_waterbodies, explorer_bottom_waterbodies = top_bottom(explorer_waterbodies, 'Stocking Efforts', 10)
+
+    # yearly totals for the selection (a selection seen before comes from the chart cache)
+    explorer_chart = charts.render(
+        line, explorer_yearly, name='explorer', x='Year', y='Number', grid=True,
+        title=f'Total Fish Stocked Per Year {explorer_years[0]} - {explorer_years[1]} (selection)',
+        xlabel='Year', ylabel='Total Fish Stocked',
+    )
 
-    # using tabulate to show clean output
-    print(tabulate(top_10_waterbodies_top10, headers='keys', tablefmt='fancy_grid', showindex=False, maxcolwidths=[30, None, 70]))
-    return (
-        top_10_waterbodies_report,
-        top_10_waterbodies_top10,
-        top_species_summary_top10,
-        waterbody_efforts_report,
+    mo.vstack([
+        mo.image(explorer_chart),
+        mo.md("### Top 10 & bottom 10 species"),
+        mo.hstack([explorer_top_species, explorer_bottom_species]),
+        mo.md("### Top 10 & bottom 10 counties"),
+        mo.hstack([explorer_top_counties, explorer_bottom_counties]),
+        mo.md("### Top 10 & bottom 10 water bodies by stocking efforts"),
+        mo.hstack([explorer_top_waterbodies, explorer_bottom_waterbodies]),
+        mo.md("### Fish stocked per month"),
+        explorer_months,
+    ])
+    return
+
+
+@app.cell
+def _(
+    bar,
+    barh,
+    bottom_10_consistent,
+    bottom_10_counties,
+    charts,
+    focus_species,
+    line,
+    monthly_stocked,
+    pd,
+    shift_anomalies,
+    shift_points,
+    shifts,
+    sts_rolling,
+    times_per_year,
+    top_10_consistent,
+    top_10_counties,
+    top_decreasing,
+    top_increasing,
+    trace,
+    yearly_species,
+    yearly_totals,
+):
+    # every chart of the notebook, drawn from its table with the object-oriented API:
+    # charts whose table & style didn't change come from the chart cache,
+    # the rest are drawn together in a process pool instead of one after the other
+    # (the cells above show them where they belong)
+
+    # numbers back from the comma formatted strings, in millions for the top 10
+    _top_10_plot = top_10_consistent.copy()
+    _top_10_plot['Stocked (M)'] = (
+        _top_10_plot['Total Fish Stocked'].replace({',': ''}, regex=True).astype(int) / 1_000_000
+    )
+    _bottom_10_plot = bottom_10_consistent.copy()
+    _bottom_10_plot['Total Fish Stocked'] = (
+        _bottom_10_plot['Total Fish Stocked'].replace({',': ''}, regex=True).astype(int)
     )
+    _bottom_10_plot = _bottom_10_plot.sort_values(by='Total Fish Stocked', ascending=True).head(10)
+
+    # walleye with its change points & anomalous years
+    _is_walleye = lambda table: (
+        (table['Dimension'] == 'Species') & (table['Grain'] == 'Yearly') & (table['Group'] == 'Walleye')
+    )
+    _walleye = {
+        'series': yearly_species[yearly_species['Species'] == 'Walleye'].sort_values('Year')[['Year', 'Number']],
+        'changes': shift_points[_is_walleye(shift_points)][['Period']],
+        'anomalies': shift_anomalies[_is_walleye(shift_anomalies)][['Period', 'Number']],
+    }
+
+    _times = pd.DataFrame({
+        'Times': [str(t) if t < 6 else '6+' for t in times_per_year.index],
+        'Pairs': times_per_year.to_numpy(),
+    })
+
+    _jobs = {
+        'top_consistent': (barh, _top_10_plot, dict(
+            x='Stocked (M)', y=None, reverse=True, grid=True, value_format='{:.2f} M',
+            title='Top 10 Consistently Stocked Fish Species in Michigan (2000 - 2025)',
+            xlabel='Total Fish Stocked (Millions)', footnote='Figures shown in millions',
+        )),
+        'bottom_consistent': (barh, _bottom_10_plot, dict(
+            x='Total Fish Stocked', y=None, invert=True, value_format='{:,.0f}',
+            title='Bottom 10 Fish Stocked Fish Species (2000-2025', xlabel='Total Fish Stocked',
+            footnote='Figures shown in raw totals',
+        )),
+        'yearly_totals': (line, yearly_totals[['Year', 'Number']], dict(
+            x='Year', y='Number', grid=True, title='Total Fish Stocked Per Year in Michigan 2000 - 2025',
+            xlabel='Year', ylabel='Total Fish Stocked',
+        )),
+        'top_increasing': (barh, top_increasing[['Species', 'Slope']], dict(
+            x='Slope', y='Species', title='Top 10 Increasing Fish Stocked (2000-2025',
+            xlabel='Trend Slope (Fish per Year)',
+        )),
+        'top_decreasing': (barh, top_decreasing[['Species', 'Slope']], dict(
+            x='Slope', y='Species', color='red', title='Top 10 Decreasing Fish Stocked (2000 - 2025)',
+            xlabel='Trend Slope (Fish Per Year',
+        )),
+        'focus_species': (barh, focus_species[['Species', 'Slope']], dict(
+            x='Slope', y='Species', colors=('green', 'red'), title='Salmon, Steelhead, Trout Trend 2000 - 2025',
+            xlabel='Trend Slope (Fish per Year)',
+        )),
+        'sts_rolling': (line, sts_rolling[['Species', 'Year', 'Rolling Slope']], dict(
+            x='Year', y='Rolling Slope', by='Species', zero_line=True,
+            title='5 Year Rolling Trend, Salmon, Steelhead & Trout',
+            xlabel='Year (end of the 5 year window)', ylabel='Trend Slope (Fish per Year)',
+        )),
+        'walleye_shifts': (shifts, _walleye, dict(
+            label='Walleye', title='Walleye Stocked per Year, Change Points (dashed) & Anomalies',
+        )),
+        'monthly': (barh, monthly_stocked, dict(
+            x='total_stocked', y='month', color='green', value_format='{:,.0f}',
+            title='Total Fish Stocked per Month (2000-2025', xlabel='Total Fish Stocked', ylabel='Month',
+        )),
+        'times_stocked': (bar, _times, dict(
+            x='Times', y='Pairs', title='Times Stocked Per Year (water body & species, 2000-2025)',
+            xlabel='Times stocked in the year', ylabel='Water body & species years',
+        )),
+        'top_counties': (barh, top_10_counties, dict(
+            x='total_stocked', y='County', reverse=True, color='green',
+            title='Top 10 Counties by Total Fish Stocked (2000 - 2025)', xlabel='Fish Stocked',
+        )),
+        'bottom_counties': (barh, bottom_10_counties, dict(
+            x='total_stocked', y='County', reverse=True, color='red',
+            title='Bottom 10 Counties By Total Fish Stocked (2000 - 2025)', xlabel='Total Fish Stocked',
+        )),
+    }
+    with trace.stage('figures', rows_in=len(_jobs)) as _stage:
+        figures = charts.render_all(_jobs)
+        _stage['rows_out'] = len(figures)
+
+    # hits & misses of the chart cache for this run
+    charts.stats()
+    return (figures,)
+
+
+@app.cell
+def _(cuboids, memo, top_species_by_waterbody, trend_df):
+    # hits & misses of the on-disk cache for this run
+    # (referencing the cached outputs makes this cell run after them)
+    _cached_outputs = (cuboids, trend_df, top_species_by_waterbody)
+    memo.stats()
+    return
 
 
 @app.cell
@@ -775,11 +1040,22 @@ def _(
     county_stocked,
     df_clean,
     df_raw,
+    duplicate_summary,
+    duplicates,
     focus_species,
     missing_summary,
     monthly_stocked,
     pd,
+    rolling_species,
+    shift_anomalies,
+    shift_points,
+    shift_summary,
+    species_flips,
+    site_stocking_per_year,
+    site_stocking_summary,
     species_stats,
+    stocking_per_year,
+    stocking_summary,
     top_10_consistent,
     top_10_counties,
     top_10_waterbodies,
@@ -787,13 +1063,21 @@ def _(
     top_10_waterbodies_top10,
     top_decreasing,
     top_increasing,
+    top_species_by_waterbody,
     top_species_summary_top10,
+    trace,
     trend_df,
+    trend_shifts,
+    validation_report,
+    validation_samples,
+    quarantine,
     waterbody_efforts,
     waterbody_efforts_report,
     yearly_species,
     yearly_totals,
 ):
+    from fish_stocking.export import export_workbook
+
     # dictionary of datasets with sheet names
     datasets = {
         "RawData": df_raw,
@@ -818,15 +1102,59 @@ def _(
         "WaterbodyEffortsReport": waterbody_efforts_report,
         "Top10WaterbodiesReport": top_10_waterbodies_report,
         "Top10WaterbodiesTop10": top_10_waterbodies_top10,
-        "TopSpeciesSummaryTop10": pd.DataFrame({"Top3Species": top_species_summary_top10})
+        "TopSpeciesSummaryTop10": pd.DataFrame({"Top3Species": top_species_summary_top10}),
+        "TopSpeciesByWaterbody": top_species_by_waterbody.reset_index(name="Top 3 Species"),
+        "StockingPerYear": stocking_per_year,
+        "StockingFrequency": stocking_summary,
+        "SiteStockingPerYear": site_stocking_per_year,
+        "SiteStockingFrequency": site_stocking_summary,
+        "RollingSpecies": rolling_species,
+        "TrendFlips": species_flips,
+        "TrendShifts": trend_shifts,
+        "ShiftSummary": shift_summary,
+        "ChangePoints": shift_points,
+        "Anomalies": shift_anomalies,
+        "ValidationReport": validation_report,
+        "ValidationSamples": validation_samples,
+        "Quarantine": quarantine.reset_index(),
+        "Duplicates": duplicates,
+        "DuplicateSummary": duplicate_summary,
     }
 
     # save all datasets to a single Excel file with multiple sheets
-    with pd.ExcelWriter("Michigan_Fish_Stocking_Data.xlsx", engine="xlsxwriter") as writer:
-        for sheet_name, df in datasets.items():
-            # Save each dataframe to its own sheet
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-    print("!!-- SAVED 'Michigan_Fish_Stocking_Data.xlsx' IN CURRENT WORKING DIRECTORY--!!")
+    # skipped when no table changed since the last export,
+    # raw_mode="sample" or "skip" keeps the RawData / CleanedData sheets small
+    with trace.stage('export', rows_in=sum(len(_df) for _df in datasets.values())):
+        export_report = export_workbook(datasets, "Michigan_Fish_Stocking_Data.xlsx", raw_mode="full")
+    if export_report['written']:
+        print("!!-- SAVED 'Michigan_Fish_Stocking_Data.xlsx' IN CURRENT WORKING DIRECTORY--!!")
+    else:
+        print("!!-- 'Michigan_Fish_Stocking_Data.xlsx' IS UP TO DATE, NOTHING CHANGED --!!")
+    return (export_report,)
+
+
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(r"""# **Where the time goes: per-stage trace of this run**""")
+    return
+
+
+@app.cell
+def _(export_report, mo, trace):
+    import json
+
+    # (referencing export_report makes this cell run after the last stage)
+    _last_stage = export_report
+
+    # chrome://tracing or https://ui.perfetto.dev can open the downloaded trace
+    mo.vstack([
+        trace.table(),
+        mo.download(
+            data=json.dumps(trace.chrome_trace()).encode(),
+            filename="fish_stocking_trace.json",
+            label="Download Chrome trace",
+        ),
+    ])
     return
 
 
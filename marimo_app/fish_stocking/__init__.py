@@ -0,0 +1 @@
+"""Helpers shared by the Michigan fish stocking notebook (analysis_app.py)."""
@@ -0,0 +1,304 @@
+"""Benchmark the analysis stages on synthetic exports of growing size.
+
+Run from the ``marimo_app`` folder::
+
+    python -m fish_stocking.bench --rows 1e5 1e6 --out bench.json
+    python -m fish_stocking.bench --rows 1e5 1e6 --baseline bench.json --threshold 0.2
+
+Every stage of the notebook (load, cache, dedup, validate, clean, yearly
+rollup, trend fit, rankings in pandas and in DuckDB, report table, export) is
+timed and its peak memory recorded. The results go to a JSON file; with
+``--baseline`` they are compared against an earlier results file and the exit
+code is 1 if any stage got slower (or bigger) by more than the threshold.
+
+The pandas stages hold the whole export in memory (several times over while
+it is cleaned), which tops out around 1e7 rows on a 16GB machine. Sizes past
+that are run with ``--duckdb-rows``: the synthetic export is written straight
+to a Parquet cache entry chunk by chunk and only the DuckDB stages (rollups,
+rankings, report) are timed, e.g. ``--rows 1e6 --duckdb-rows 1e7 1e8``.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from . import pipeline
+from .cache import FINGERPRINT_FILE, write_cache, write_cache_chunks
+from .dates import with_calendar
+from .dedup import deduplicate
+from .dimensions import DimensionRegistry
+from .export import export_workbook
+from .loader import load_stocking_csv, typed
+from .query import Stocking
+from .rollup import compute_cuboids
+from .synthetic import Generator, default_water_bodies, write_synthetic_csv
+from .trace import Trace
+from .validation import validate
+
+STAGES = (
+    "load", "cache", "dedup", "validate", "clean", "yearly_rollup", "trend_fit", "rankings", "rankings_duckdb",
+    "report", "export",
+)
+
+# the stages of a --duckdb-rows run, over a cache entry that is never loaded into pandas
+DUCKDB_STAGES = ("yearly_rollup_duckdb", "rankings_duckdb", "report_duckdb")
+
+# differences below these are noise, whatever the ratio
+MIN_SECONDS = 0.1
+MIN_MB = 16
+
+
+def _measurements(trace):
+    return {
+        e["name"]: {
+            "seconds": e["wall_s"],
+            "cpu_seconds": e["cpu_s"],
+            "peak_mb": e["peak_mb"],
+            "peak_delta_mb": e["peak_delta_mb"],
+            "rows": e["rows_out"],
+        }
+        for e in trace.events
+    }
+
+
+def _report(species_totals, waterbody_efforts):
+    from tabulate import tabulate
+
+    top_species_by_waterbody, top_10 = pipeline.waterbody_leaders(species_totals, waterbody_efforts)
+    tabulate(top_10, headers="keys", tablefmt="fancy_grid", showindex=False, maxcolwidths=[30, None, 70])
+    return top_species_by_waterbody, top_10
+
+
+def run_stages(source, workdir):
+    """Run every stage once on the csv at ``source``; returns stage -> measurements."""
+    trace = Trace()
+
+    with trace.stage("load") as record:
+        df_raw = load_stocking_csv(source)
+        dimensions = DimensionRegistry(df_raw)
+        record["rows_out"] = len(df_raw)
+
+    with trace.stage("cache") as record:
+        entry = Path(workdir) / "cache"
+        write_cache(df_raw, entry, {"source": str(source)})
+        record["rows_out"] = len(df_raw)
+
+    with trace.stage("dedup") as record:
+        df_deduped, _, _ = deduplicate(df_raw)
+        record["rows_out"] = len(df_deduped)
+
+    with trace.stage("validate") as record:
+        df_valid, quarantine, _, _ = validate(df_deduped)
+        record["rows_out"] = len(df_valid)
+
+    with trace.stage("clean") as record:
+        df_clean = with_calendar(df_valid)
+        record["rows_out"] = len(df_clean)
+
+    with trace.stage("yearly_rollup") as record:
+        cuboids = compute_cuboids(df_clean, {**pipeline.CUBOIDS, **pipeline.PLACE_CUBOIDS})
+        yearly_species = cuboids["year_species"]
+        record["rows_out"] = len(yearly_species)
+
+    with trace.stage("trend_fit") as record:
+        tables = pipeline.trend_tables(yearly_species, dimensions=dimensions)
+        record["rows_out"] = len(tables["trend_df"])
+
+    with trace.stage("rankings") as record:
+        tables.update(pipeline.species_tables(yearly_species))
+        tables.update(pipeline.place_tables(cuboids))
+        record["rows_out"] = len(cuboids["waterbody"])
+
+    # the same rankings the way the notebook runs them, in DuckDB over the cache
+    stocking = Stocking(entry, exclude_rows=pipeline.excluded_rows(df_raw, df_deduped, quarantine))
+    try:
+        with trace.stage("rankings_duckdb") as record:
+            ranked = pipeline.species_tables(yearly_species, stocking)
+            ranked.update(pipeline.place_tables(stocking))
+            record["rows_out"] = len(ranked["waterbody_efforts"])
+    finally:
+        stocking.close()
+
+    with trace.stage("report") as record:
+        top_species_by_waterbody, tables["top_10_waterbodies_top10"] = _report(
+            cuboids["waterbody_species"], tables["waterbody_efforts"]
+        )
+        record["rows_out"] = len(top_species_by_waterbody)
+
+    with trace.stage("export") as record:
+        export_workbook(tables, Path(workdir) / "bench.xlsx", force=True)
+        record["rows_out"] = sum(len(df) for df in tables.values())
+
+    return _measurements(trace)
+
+
+def run_duckdb_stages(entry):
+    """The rollups, rankings and report of ``run_stages`` in DuckDB over the cache ``entry`` only."""
+    trace = Trace()
+    stocking = Stocking(entry)
+    try:
+        with trace.stage("yearly_rollup_duckdb") as record:
+            cuboids = {
+                name: stocking.query(measures, by=keys)
+                for name, (keys, measures) in pipeline.CUBOIDS.items()
+                if name in ("year_species", "waterbody_species")
+            }
+            record["rows_out"] = len(cuboids["year_species"])
+
+        with trace.stage("rankings_duckdb") as record:
+            tables = pipeline.species_tables(cuboids["year_species"], stocking)
+            tables.update(pipeline.place_tables(stocking))
+            record["rows_out"] = len(tables["waterbody_efforts"])
+
+        with trace.stage("report_duckdb") as record:
+            top_species_by_waterbody, _ = _report(cuboids["waterbody_species"], tables["waterbody_efforts"])
+            record["rows_out"] = len(top_species_by_waterbody)
+    finally:
+        stocking.close()
+    return _measurements(trace)
+
+
+def write_synthetic_cache(entry, rows, seed=0, chunk_rows=1_000_000):
+    """Write a ``rows``-row synthetic export straight to a cache entry, ``chunk_rows`` rows in memory at a time."""
+    generator = Generator(default_water_bodies(rows), seed)
+    frames = (typed(chunk) for chunk in generator.chunks(rows, chunk_rows))
+    write_cache_chunks(frames, entry, {"rows": rows, "seed": seed})
+    return entry
+
+
+def _best(attempts, stages):
+    best = {}
+    for stage in stages:
+        seconds = [attempt[stage]["seconds"] for attempt in attempts]
+        best[stage] = {**attempts[int(np.argmin(seconds))][stage], "all_seconds": seconds}
+    return best
+
+
+def benchmark(sizes, data_dir, repeat=3, seed=0, duckdb_sizes=()):
+    """Time every stage for each row count in ``sizes``, keeping the best of ``repeat`` runs.
+
+    ``duckdb_sizes`` are row counts only the DuckDB stages are run for (see the module docstring).
+    """
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    # one small untimed run first, so lazy imports (scipy, xlsxwriter) aren't billed to a stage
+    warmup = data_dir / f"synthetic_10000_{seed}.csv"
+    if not warmup.exists():
+        write_synthetic_csv(warmup, 10_000, seed=seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        run_stages(warmup, workdir)
+
+    runs = []
+    for rows in sizes:
+        source = data_dir / f"synthetic_{rows}_{seed}.csv"
+        if not source.exists():
+            write_synthetic_csv(source, rows, seed=seed)
+
+        with tempfile.TemporaryDirectory() as workdir:
+            attempts = [run_stages(source, workdir) for _ in range(repeat)]
+        runs.append({"rows": rows, "stages": _best(attempts, STAGES)})
+
+    for rows in duckdb_sizes:
+        # kept between runs like the csvs, writing 1e8 rows takes a while
+        entry = data_dir / f"synthetic_{rows}_{seed}.parquet"
+        if not (entry / FINGERPRINT_FILE).exists():
+            write_synthetic_cache(entry, rows, seed=seed)
+
+        attempts = [run_duckdb_stages(entry) for _ in range(repeat)]
+        runs.append({"rows": rows, "stages": _best(attempts, DUCKDB_STAGES)})
+    return {
+        "created": pd.Timestamp.now(tz="UTC").isoformat(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "seed": seed,
+        "repeat": repeat,
+        "runs": runs,
+    }
+
+
+def results_table(results):
+    """One row per (rows, stage)."""
+    return pd.DataFrame([
+        {"Rows": run["rows"], "Stage": stage, **{k: v for k, v in m.items() if k != "all_seconds"}}
+        for run in results["runs"]
+        for stage, m in run["stages"].items()
+    ])
+
+
+def compare(results, baseline, threshold=0.2, min_seconds=MIN_SECONDS, min_mb=MIN_MB):
+    """Stages of ``results`` slower or bigger than ``baseline`` by more than ``threshold``.
+
+    Only row counts and stages in both files are compared. Returns the
+    comparison table with a ``Regression`` column.
+    """
+    new = results_table(results).set_index(["Rows", "Stage"])
+    old = results_table(baseline).set_index(["Rows", "Stage"])
+    both = new.index.intersection(old.index)
+    table = pd.DataFrame({
+        "Seconds": new.loc[both, "seconds"],
+        "Baseline Seconds": old.loc[both, "seconds"],
+        "Peak Delta MB": new.loc[both, "peak_delta_mb"],
+        "Baseline Peak Delta MB": old.loc[both, "peak_delta_mb"],
+    })
+    table["Time Ratio"] = table["Seconds"] / table["Baseline Seconds"]
+    table["Memory Ratio"] = table["Peak Delta MB"] / table["Baseline Peak Delta MB"].clip(lower=1)
+    slower = (table["Time Ratio"] > 1 + threshold) & (table["Seconds"] - table["Baseline Seconds"] > min_seconds)
+    bigger = (table["Memory Ratio"] > 1 + threshold) & (
+        table["Peak Delta MB"] - table["Baseline Peak Delta MB"] > min_mb
+    )
+    table["Regression"] = np.select([slower & bigger, slower, bigger], ["time, memory", "time", "memory"], "")
+    return table.reset_index()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fish_stocking.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", nargs="+", type=lambda v: int(float(v)),
+                        help="synthetic row counts to run, e.g. 1e5 1e6 1e7 (default: 1e5 1e6, none with --duckdb-rows)")
+    parser.add_argument("--duckdb-rows", nargs="+", type=lambda v: int(float(v)), default=[],
+                        help="row counts to run the DuckDB stages only for, e.g. 1e8 (too big for the pandas stages)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per size, the fastest is kept (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="synthetic data seed (default: %(default)s)")
+    parser.add_argument("--data-dir", default=".bench_data",
+                        help="where the synthetic csvs are kept between runs (default: %(default)s)")
+    parser.add_argument("--out", default="bench_results.json", help="results file (default: %(default)s)")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown/growth before a stage counts as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if args.rows is None:
+        args.rows = [] if args.duckdb_rows else [100_000, 1_000_000]
+    return args
+
+
+def main(argv=None):
+    from tabulate import tabulate
+
+    args = parse_args(argv)
+    results = benchmark(
+        args.rows, args.data_dir, repeat=args.repeat, seed=args.seed, duckdb_sizes=args.duckdb_rows,
+    )
+    Path(args.out).write_text(json.dumps(results, indent=2))
+    print(tabulate(results_table(results).drop(columns="peak_mb"), headers="keys", showindex=False, floatfmt=".3f"))
+
+    if not args.baseline:
+        return 0
+    table = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+    print()
+    print(tabulate(table, headers="keys", showindex=False, floatfmt=".3f"))
+    regressions = table[table["Regression"] != ""]
+    if len(regressions):
+        print(f"\n{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Parquet cache of the cleaned stocking data.
+
+The cache is keyed by the source file's size, mtime and content hash (plus the
+loader schema), so a changed export is re-parsed and an unchanged one is read
+back from a year-partitioned Parquet dataset through memory mapping.
+
+Run ``python -m fish_stocking.cache path/to/fish_stocking_data.csv`` to see the
+cold vs warm load times.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+
+from .loader import DATE_COLUMN, SCHEMA, load_stocking_csv
+
+CACHE_DIR_NAME = ".stocking_cache"
+FINGERPRINT_FILE = "_fingerprint.json"
+
+# hive partition column, derived from Date and dropped again on read
+PARTITION_COLUMN = "Year"
+
+# original row position so the frame comes back in csv order
+ROW_COLUMN = "__row"
+
+# bumped when the file layout changes, so older entries are rewritten (2: categoricals stored as strings)
+FORMAT_VERSION = 2
+
+
+def source_fingerprint(path, chunk_size=1 << 20):
+    """Size, mtime and sha256 of the source file."""
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest.hexdigest(),
+        # a schema or layout change should invalidate the cache too
+        "schema": SCHEMA,
+        "format": FORMAT_VERSION,
+    }
+
+
+def cache_key(fingerprint):
+    encoded = json.dumps(fingerprint, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def default_cache_dir(path):
+    return Path(path).resolve().parent / CACHE_DIR_NAME
+
+
+def write_cache(df, entry, fingerprint):
+    """Write ``df`` as a year-partitioned Parquet dataset at ``entry``."""
+    write_cache_chunks([df], entry, fingerprint)
+
+
+def write_cache_chunks(frames, entry, fingerprint):
+    """``write_cache`` for a frame that comes as consecutive ``frames``, only one of them in memory at a time."""
+    entry = Path(entry)
+    tmp = entry.with_name(entry.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    offset = 0
+    for i, df in enumerate(frames):
+        table = pa.Table.from_pandas(
+            df.assign(**{
+                ROW_COLUMN: np.arange(offset, offset + len(df), dtype="int64"),
+                PARTITION_COLUMN: df[DATE_COLUMN].dt.year.astype("Int16"),
+            }),
+            preserve_index=False,
+        )
+        # categoricals go in as plain strings: every year file would get a copy of the
+        # whole dictionary (all the sites of every year), parquet dictionary-encodes them per file anyway
+        table = table.cast(pa.schema(
+            [f.with_type(f.type.value_type) if pa.types.is_dictionary(f.type) else f for f in table.schema],
+            metadata=table.schema.metadata,
+        ))
+        ds.write_dataset(
+            table,
+            tmp,
+            format="parquet",
+            partitioning=[PARTITION_COLUMN],
+            partitioning_flavor="hive",
+            # a file per chunk and year, next to the earlier chunks' files
+            basename_template=f"part-{i}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        offset += len(df)
+
+    # the fingerprint file goes in last and marks the entry as complete
+    (tmp / FINGERPRINT_FILE).write_text(json.dumps(fingerprint, sort_keys=True))
+    shutil.rmtree(entry, ignore_errors=True)
+    os.replace(tmp, entry)
+
+
+def read_cache(entry):
+    """Read a cache entry back into the cleaned frame (memory mapped)."""
+    dataset = ds.dataset(
+        entry,
+        format="parquet",
+        partitioning="hive",
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+        exclude_invalid_files=True,
+    )
+    table = dataset.to_table(columns=[c for c in dataset.schema.names if c != PARTITION_COLUMN])
+    categorical = [col for col, dtype in SCHEMA.items() if dtype == "category" and col in table.column_names]
+    df = table.to_pandas(categories=categorical)
+    # categories sorted like the csv loader's, not in the order the year files list them
+    for col in categorical:
+        df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+    return (
+        df.sort_values(ROW_COLUMN, kind="stable")
+        .drop(columns=[ROW_COLUMN])
+        .reset_index(drop=True)
+    )
+
+
+def load_stocking_cached(path, cache_dir=None):
+    """Load the cleaned stocking data, going through the Parquet cache.
+
+    Returns ``(df, report)`` where ``report`` says whether it was a cold
+    (csv parsed, cache written) or warm (cache read) load and how long it took.
+    """
+    start = time.perf_counter()
+    cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir(path)
+    fingerprint = source_fingerprint(path)
+    entry = cache_dir / f"{Path(path).stem}-{cache_key(fingerprint)}"
+
+    if (entry / FINGERPRINT_FILE).exists():
+        df = read_cache(entry)
+        status = "warm"
+    else:
+        df = load_stocking_csv(path)
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        # drop stale entries for the same source before writing the new one
+        for old in cache_dir.glob(f"{Path(path).stem}-*"):
+            shutil.rmtree(old, ignore_errors=True)
+        write_cache(df, entry, fingerprint)
+        status = "cold"
+
+    report = {
+        "status": status,
+        "seconds": round(time.perf_counter() - start, 3),
+        "rows": len(df),
+        "cache": str(entry),
+        # cheap stand-in for the content of df, see memo.DiskMemo.remember
+        "fingerprint": cache_key(fingerprint),
+    }
+    return df, report
+
+
+def clear_cache(path, cache_dir=None):
+    cache_dir = Path(cache_dir) if cache_dir is not None else default_cache_dir(path)
+    for old in cache_dir.glob(f"{Path(path).stem}-*"):
+        shutil.rmtree(old, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "../data/fish_stocking_data.csv"
+    clear_cache(source)
+    _, cold = load_stocking_cached(source)
+    _, warm = load_stocking_cached(source)
+    print(f"cold load: {cold['seconds']:.3f}s ({cold['rows']:,} rows)")
+    print(f"warm load: {warm['seconds']:.3f}s ({warm['rows']:,} rows)")
+    print(f"speedup:   {cold['seconds'] / max(warm['seconds'], 1e-9):.1f}x")
@@ -0,0 +1,257 @@
+"""Change points and anomalies in the yearly / monthly stocking series of every group.
+
+All series of a grouping (every species, county or water body) are laid
+out as one groups x periods matrix and processed together:
+
+- change points: PELT (optimal partitioning with pruning) on a shift in
+  the mean of ``log1p(fish)``, with the series scaled by their noise
+  level so one penalty fits every series. The dynamic program steps over
+  the periods once, each step handling every series at once. Split
+  candidates pruned in every series are dropped from the candidate array,
+  so a step only looks at the splits still alive;
+- anomalies: robust z-scores (median / MAD) of the same values; monthly
+  series are compared with their usual level for the calendar month first.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .rolling import yearly_matrix
+
+# |robust z| above this is an anomaly (Iglewicz & Hoaglin)
+ANOMALY_Z = 3.5
+
+# scale of MAD to a normal standard deviation, and of the mean absolute deviation
+MAD_SCALE = 1.4826
+MEAN_AD_SCALE = 1.2533
+
+# smallest spread of log1p(fish) scored against: series restocked with the same
+# numbers every time would otherwise make a 5% change look extreme
+MIN_LOG_SCALE = 0.1
+
+
+def robust_z(values, min_scale=0.0):
+    """Row-wise robust z-scores, NaN cells ignored (and scored NaN).
+
+    The mean absolute deviation stands in for rows whose MAD is 0, and the
+    scale is at least ``min_scale``.
+    """
+    with warnings.catch_warnings():
+        # all-NaN rows just score NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(values, axis=1, keepdims=True)
+        deviation = np.abs(values - median)
+        scale = MAD_SCALE * np.nanmedian(deviation, axis=1, keepdims=True)
+        mean_scale = MEAN_AD_SCALE * np.nanmean(deviation, axis=1, keepdims=True)
+    scale = np.maximum(np.where(scale > 0, scale, mean_scale), min_scale)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(scale > 0, (values - median) / scale, 0.0)
+
+
+def _noise(values):
+    # robust noise level from first differences (a level shift only moves one of them)
+    steps = np.diff(values, axis=1)
+    scale = MAD_SCALE * np.median(np.abs(steps - np.median(steps, axis=1, keepdims=True)), axis=1) / np.sqrt(2)
+    fallback = values.std(axis=1)
+    return np.where(scale > 0, scale, fallback)
+
+
+def pelt(values, penalty=None, min_size=2, noise=None):
+    """Change points of every row of ``values`` (a 2D array), as a boolean matrix.
+
+    ``out[i, t]`` is True when a new segment of row ``i`` starts at column
+    ``t``; segments are at least ``min_size`` long. The cost is the squared
+    error around each segment's mean, rows are scaled by their ``noise``
+    level first (by default estimated from first differences), and
+    ``penalty`` defaults to ``5 * log(periods)``.
+    """
+    n_series, n = values.shape
+    penalty = 5 * np.log(max(n, 2)) if penalty is None else penalty
+    if noise is None:
+        noise = _noise(values) if n > 1 else np.ones(n_series)
+    scaled = np.divide(values, noise[:, None], out=np.zeros_like(values, dtype="float64"), where=noise[:, None] > 0)
+
+    zeros = np.zeros((n_series, 1))
+    prefix = np.hstack([zeros, np.cumsum(scaled, axis=1)])
+    prefix_sq = np.hstack([zeros, np.cumsum(scaled**2, axis=1)])
+
+    best = np.full((n_series, n + 1), np.inf)
+    best[:, 0] = -penalty
+    last = np.zeros((n_series, n + 1), dtype="int64")
+    # the splits still alive in some series, and which series they're alive in
+    starts = np.zeros(1, dtype="int64")
+    alive = np.ones((n_series, 1), dtype=bool)
+    fresh = np.ones((n_series, 1), dtype=bool)
+
+    for t in range(min_size, n + 1):
+        # every candidate split s (segment s..t-1) of every series at once
+        total = prefix[:, [t]] - prefix[:, starts]
+        cost = prefix_sq[:, [t]] - prefix_sq[:, starts] - total**2 / (t - starts)
+        candidate = np.where(alive, best[:, starts] + cost + penalty, np.inf)
+        choice = candidate.argmin(axis=1)
+        best[:, t] = candidate[np.arange(n_series), choice]
+        last[:, t] = starts[choice]
+
+        # PELT pruning: a split that can't beat the best now never will,
+        # and one pruned in every series is dropped for good
+        alive &= best[:, starts] + cost <= best[:, [t]]
+        keep = alive.any(axis=0)
+        starts = np.append(starts[keep], t - min_size + 1)
+        alive = np.hstack([alive[:, keep], fresh])
+
+    # walk the chosen splits back from the end, all series together
+    changes = np.zeros((n_series, n), dtype=bool)
+    position = np.full(n_series, n)
+    rows = np.arange(n_series)
+    while (position > 0).any():
+        position = np.where(position > 0, last[rows, position], 0)
+        inner = position > 0
+        changes[rows[inner], position[inner]] = True
+    return changes
+
+
+def _segment_levels(values, changes):
+    # mean of the segment every cell belongs to
+    segment = np.cumsum(changes, axis=1)
+    offsets = segment + (np.arange(len(values)) * (values.shape[1] + 1))[:, None]
+    sums = np.bincount(offsets.ravel(), weights=values.ravel(), minlength=offsets.max() + 1)
+    counts = np.bincount(offsets.ravel(), minlength=offsets.max() + 1)
+    return (sums / np.maximum(counts, 1))[offsets]
+
+
+def _series(df, by, period, value, min_active):
+    matrix, periods = yearly_matrix(df, by, value, period)
+    matrix = matrix[(matrix > 0).sum(axis=1) >= min_active]
+    return matrix, periods
+
+
+def detect(df, by, period="Year", value="Number", seasonal=False, min_active=5, penalty=None, z=ANOMALY_Z):
+    """``(changes, anomalies, summary)`` for the ``period`` series of each ``by`` group.
+
+    ``df`` holds one row per group and period (e.g. Year x Species totals).
+    Series stocked in fewer than ``min_active`` periods are skipped. The
+    ``Level`` columns of the changes are geometric means of the segments.
+
+    With ``seasonal`` the periods are months (``Year * 12 + month - 1``).
+    Each series' median for the calendar month is taken out, a level shift
+    has to last a year and, as month to month stocking is far noisier than
+    a shift between years, rows are scaled by their spread and ``penalty``
+    defaults to ``2 * log(periods)``. Only stocked months get anomaly scores.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    matrix, periods = _series(df, by, period, value, min_active)
+    raw = matrix.to_numpy(dtype="float64")
+    values = np.log1p(np.clip(raw, 0, None))
+
+    level = values
+    if seasonal and len(values):
+        # shifts in level, not the season: take out each series' median for the calendar month
+        month_of = periods % 12
+        usual = np.stack([np.median(values[:, month_of == m], axis=1) for m in range(12)], axis=1)
+        level = values - usual[:, month_of]
+    if not len(values):
+        changes = np.zeros(values.shape, dtype=bool)
+    elif seasonal:
+        penalty = 2 * np.log(max(len(periods), 2)) if penalty is None else penalty
+        changes = pelt(level, penalty, min_size=12, noise=level.std(axis=1))
+    else:
+        changes = pelt(level, penalty)
+    levels = np.expm1(_segment_levels(values, changes)) if len(values) else values
+
+    residual = values
+    if seasonal and len(values):
+        # most months of a series are off season, so only stocked months are
+        # scored, against the series' usual stocked level for that calendar month
+        stocked = np.where(raw > 0, values, np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            usual = np.stack([np.nanmedian(stocked[:, month_of == m], axis=1) for m in range(12)], axis=1)
+        residual = stocked - usual[:, month_of]
+    scores = robust_z(residual, MIN_LOG_SCALE) if len(values) else values
+
+    labels = matrix.index.to_frame(index=False)
+    label = "Period" if seasonal else period
+
+    def _cells(mask, **columns):
+        rows, cols = np.nonzero(mask)
+        out = labels.iloc[rows].reset_index(drop=True)
+        out[label] = _period_labels(periods[cols], seasonal)
+        for name, array in columns.items():
+            out[name] = array[rows, cols]
+        return out
+
+    previous_level = np.hstack([levels[:, :1], levels[:, :-1]]) if len(values) else levels
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shift = np.where(previous_level > 0, (levels / previous_level - 1) * 100, np.nan)
+    change_table = _cells(changes, **{"Level Before": previous_level, "Level After": levels, "Shift %": shift})
+    anomaly_table = _cells(np.abs(scores) > z, **{value: raw, "Robust Z": scores})
+
+    summary = labels.copy()
+    summary["Change Points"] = changes.sum(axis=1)
+    summary["Anomalies"] = (np.abs(scores) > z).sum(axis=1)
+    has_change = changes.any(axis=1)
+    last_change = np.where(has_change, periods[(changes.shape[1] - 1) - changes[:, ::-1].argmax(axis=1)], -1)
+    summary["Last Change"] = pd.array(
+        np.where(has_change, _period_labels(last_change, seasonal), None), dtype="object"
+    )
+    summary["Shifted"] = has_change
+    return change_table, anomaly_table, summary
+
+
+def _period_labels(periods, seasonal):
+    if not seasonal:
+        return periods
+    return np.array([f"{p // 12}-{p % 12 + 1:02d}" for p in periods], dtype=object)
+
+
+def monthly_periods(df):
+    """``df`` with an integer ``Period`` (``Year * 12 + month - 1``) for ``detect(..., seasonal=True)``."""
+    return df.assign(Period=df["Year"].astype("int64") * 12 + df["month"].astype("int64") - 1)
+
+
+def _long(table, dimension, grain):
+    # one label column per dimension -> shared Dimension / Group / Grain columns
+    table = table.rename(columns={dimension: "Group", "Year": "Period"})
+    table.insert(0, "Grain", grain)
+    table.insert(0, "Dimension", dimension)
+    table["Group"] = table["Group"].astype("object")
+    # years and "YYYY-MM" months share the column, so both as text
+    for column in ("Period", "Last Change"):
+        if column in table:
+            table[column] = table[column].map(lambda period: None if period is None else str(period))
+    return table
+
+
+def pattern_shifts(yearly, monthly=None, min_years=5, min_months=12):
+    """Change points, anomalies and a per series summary for many dimensions at once.
+
+    ``yearly`` maps a dimension (e.g. "Species") to its Year x dimension
+    totals, ``monthly`` to its Year x month x dimension totals; series
+    stocked in fewer than ``min_years`` years / ``min_months`` months are
+    skipped. The three
+    tables are long, with ``Dimension``, ``Group`` and ``Grain`` ("Yearly"
+    or "Monthly") columns, so every dimension lands in the same table.
+    """
+    found = {"changes": [], "anomalies": [], "summary": []}
+    runs = [(dimension, "Yearly", frame, {"min_active": min_years}) for dimension, frame in yearly.items()]
+    runs += [
+        (dimension, "Monthly", monthly_periods(frame), {"period": "Period", "seasonal": True, "min_active": min_months})
+        for dimension, frame in (monthly or {}).items()
+    ]
+    for dimension, grain, frame, options in runs:
+        tables = detect(frame, dimension, **options)
+        for key, table in zip(found, tables):
+            found[key].append(_long(table, dimension, grain))
+    return tuple(pd.concat(tables, ignore_index=True) for tables in found.values())
+
+
+def with_shifts(table, summary, dimension, grain="Yearly"):
+    """``table`` (e.g. ``trend_df``) with each ``dimension`` group's change points / anomalies joined on."""
+    rows = summary[(summary["Dimension"] == dimension) & (summary["Grain"] == grain)].set_index("Group")
+    keys = table[dimension].astype("object")
+    table = table.copy()
+    for column in ("Change Points", "Last Change", "Anomalies", "Shifted"):
+        table[column] = keys.map(rows[column]).to_numpy()
+    return table
@@ -0,0 +1,252 @@
+"""Cached, parallel rendering of the notebook's charts.
+
+Charts are drawn with matplotlib's object-oriented API on a fresh
+``Figure`` (no pyplot, so no global figure state) by small ``draw(fig,
+data, **style)`` functions. ``ChartCache`` keys every rendered PNG / SVG by
+the draw function's code, a content hash of its data and the style, so an
+unchanged chart is read back from disk instead of redrawn, and renders the
+stale ones concurrently in a process pool::
+
+    charts = ChartCache(".stocking_cache/charts")
+    images = charts.render_all({
+        "yearly": (line, yearly_totals, {"x": "Year", "y": "Number", "title": "Fish Stocked Per Year"}),
+    })
+    mo.image(images["yearly"])
+"""
+
+import hashlib
+import io
+import os
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.ticker import FuncFormatter
+
+from .memo import code_hash, evict_lru, fingerprint
+
+DEFAULT_MAX_BYTES = 128 * 1_000_000
+
+# applied under every chart's own style
+BASE_STYLE = {"figsize": (10, 6), "dpi": 100}
+
+FORMATS = ("png", "svg")
+
+
+def thousands(axis):
+    """Label ``axis`` ticks as whole numbers with thousands separators."""
+    axis.set_major_formatter(FuncFormatter(lambda x, _: f"{int(x):,}"))
+
+
+def barh(fig, table, x, y, title, xlabel, ylabel=None, color="mediumseagreen", colors=None,
+         value_format=None, reverse=False, invert=False, grid=False, footnote=None):
+    """Horizontal bars of ``x`` per ``y`` (``y=None`` uses the index).
+
+    ``colors`` is a (positive, negative) pair to color bars by the sign of
+    ``x``; ``value_format`` (e.g. ``"{:,.0f}"``) labels the end of each bar.
+    """
+    ax = fig.subplots()
+    labels = table.index if y is None else table[y]
+    values = table[x]
+    if reverse:
+        labels, values = labels[::-1], values[::-1]
+    if colors is not None:
+        color = [colors[0] if value > 0 else colors[1] for value in values]
+    bars = ax.barh([str(label) for label in labels], values, color=color)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    if ylabel:
+        ax.set_ylabel(ylabel)
+    if invert:
+        ax.invert_yaxis()
+    if grid:
+        ax.grid(axis="x", linestyle="--", alpha=0.6)
+    if value_format:
+        offset = max(values.max(), 0) * 0.01 if len(values) else 0
+        for bar in bars:
+            ax.text(bar.get_width() + offset, bar.get_y() + bar.get_height() / 2,
+                    value_format.format(bar.get_width()), va="center", fontsize=9)
+    if footnote:
+        fig.text(0.95, 0.01, footnote, ha="right", fontsize=8, style="italic")
+
+
+def bar(fig, table, x, y, title, xlabel, ylabel=None, color="mediumseagreen"):
+    """Vertical bars of ``y`` per ``x``."""
+    ax = fig.subplots()
+    ax.bar([str(label) for label in table[x]], table[y], color=color)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    if ylabel:
+        ax.set_ylabel(ylabel)
+
+
+def line(fig, table, x, y, title, xlabel, ylabel, by=None, color="mediumseagreen", grid=False, zero_line=False):
+    """``y`` over ``x``, one line per ``by`` group (with a legend) when given."""
+    ax = fig.subplots()
+    if by is None:
+        ax.plot(table[x], table[y], marker="o", linestyle="-", color=color)
+    else:
+        for group, rows in table.groupby(by, observed=True, sort=True):
+            ax.plot(rows[x], rows[y], marker="o", label=group)
+        ax.legend()
+    if zero_line:
+        ax.axhline(0, color="black", linewidth=0.8)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    if grid:
+        ax.grid(True, linestyle="--", alpha=0.5)
+    thousands(ax.yaxis)
+
+
+def shifts(fig, data, title, label, color="steelblue"):
+    """A yearly series with its change points (dashed, between the years) and anomalies.
+
+    ``data`` is ``{"series": Year/Number, "changes": Period, "anomalies": Period/Number}``.
+    """
+    ax = fig.subplots()
+    series = data["series"]
+    ax.plot(series["Year"], series["Number"], marker="o", color=color, label=label)
+    for year in data["changes"]["Period"].astype(int):
+        ax.axvline(year - 0.5, color="orange", linestyle="--")
+    anomalies = data["anomalies"]
+    ax.scatter(anomalies["Period"].astype(int), anomalies["Number"], color="red", zorder=3, label="Anomaly")
+    ax.set_title(title)
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Fish Stocked")
+    thousands(ax.yaxis)
+    ax.legend()
+
+
+def render(draw, data, fmt="png", **style):
+    """Bytes of ``draw(fig, data, **style)`` saved as ``fmt``, drawn on its own ``Figure``."""
+    style = {**BASE_STYLE, **style}
+    fig = Figure(figsize=style.pop("figsize"), dpi=style.pop("dpi"))
+    FigureCanvasAgg(fig)
+    draw(fig, data, **style)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class ChartCache:
+    """Size bounded on-disk cache of rendered charts with a process pool for the misses.
+
+    ``workers`` defaults to the number of cores; with 0 every miss is drawn
+    in the calling process.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, workers=None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.hits = Counter()
+        self.misses = Counter()
+        self._pool = None
+
+    def key(self, draw, data, fmt, style):
+        parts = [code_hash(draw), fingerprint(data), fingerprint(sorted(style.items())), fmt]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def _path(self, draw, data, fmt, style):
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {FORMATS}, got {fmt!r}")
+        return self.directory / f"{self.key(draw, data, fmt, {**BASE_STYLE, **style})}.{fmt}"
+
+    def _read(self, path, name):
+        try:
+            image = path.read_bytes()
+        except OSError:
+            self.misses[name] += 1
+            return None
+        # bump the mtime, it is what the LRU eviction goes by
+        os.utime(path)
+        self.hits[name] += 1
+        return image
+
+    def _store(self, path, image):
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(image)
+        os.replace(tmp, path)
+
+    def _store_when_done(self, path):
+        def store(future):
+            if future.exception() is None:
+                self._store(path, future.result())
+        return store
+
+    def render(self, draw, data, fmt="png", name=None, **style):
+        """The chart's bytes, from the cache or drawn here (for interactive one-offs)."""
+        path = self._path(draw, data, fmt, style)
+        image = self._read(path, name or draw.__name__)
+        if image is None:
+            image = render(draw, data, fmt, **style)
+            self._store(path, image)
+            self.evict()
+        return image
+
+    def submit(self, jobs, fmt="png"):
+        """``{name: Future}`` for ``jobs`` (``{name: (draw, data, style)}``).
+
+        Cached charts come back as finished futures; the rest are drawn in the
+        pool and written to the cache as they finish.
+        """
+        futures = {}
+        for name, (draw, data, style) in jobs.items():
+            path = self._path(draw, data, fmt, style)
+            image = self._read(path, name)
+            if image is not None:
+                futures[name] = _done(image)
+            elif self.workers:
+                future = self._executor().submit(render, draw, data, fmt, **style)
+                future.add_done_callback(self._store_when_done(path))
+                futures[name] = future
+            else:
+                image = render(draw, data, fmt, **style)
+                self._store(path, image)
+                futures[name] = _done(image)
+        return futures
+
+    def render_all(self, jobs, fmt="png"):
+        """``{name: bytes}`` of every job, stale charts drawn concurrently."""
+        images = {name: future.result() for name, future in self.submit(jobs, fmt).items()}
+        self.evict()
+        return images
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def evict(self):
+        """Drop least recently used charts until the directory fits ``max_bytes``."""
+        evict_lru(self.directory, [f"*.{fmt}" for fmt in FORMATS], self.max_bytes)
+
+    def clear(self):
+        for fmt in FORMATS:
+            for path in self.directory.glob(f"*.{fmt}"):
+                path.unlink(missing_ok=True)
+
+    def stats(self):
+        """Hit/miss counts per chart."""
+        names = sorted(set(self.hits) | set(self.misses))
+        return pd.DataFrame({
+            "Chart": names,
+            "Hits": [self.hits[name] for name in names],
+            "Misses": [self.misses[name] for name in names],
+        })
@@ -0,0 +1,186 @@
+"""``fish-stocking``: run the analysis headless and write the tables to files.
+
+Only pandas/numpy (and scipy for the trend p-values) are imported; marimo and
+matplotlib are never loaded on this path.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+FORMATS = ("csv", "parquet", "xlsx")
+
+# the stages recorded here, around the ones of pipeline.run_analysis
+CLI_STAGES = ("load", "dedup", "validate", "streaming_aggregates", "write")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="fish-stocking",
+        description="Compute the Michigan fish stocking summary tables without the marimo UI.",
+    )
+    parser.add_argument("source", nargs="?", default="../data/fish_stocking_data.csv",
+                        help="MDNR stocking csv export (default: %(default)s)")
+    parser.add_argument("-o", "--out", default="fish_stocking_output",
+                        help="output directory, or workbook path for xlsx (default: %(default)s)")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="csv",
+                        help="output format (default: %(default)s); xlsx is written cell by cell "
+                             "and is much slower than csv or parquet (10-25s for the full export)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="parse the csv instead of going through the parquet cache")
+    parser.add_argument("--collapse-duplicates", choices=("exact", "near"),
+                        help="drop repeated rows of a stocking event (exact, or exact & near) before aggregating")
+    parser.add_argument("--no-validate", action="store_true",
+                        help="keep the rows failing the data quality rules instead of quarantining them (--streaming never validates)")
+    parser.add_argument("--counties", metavar="PATH",
+                        help="file of the allowed County names, one per line (default: Michigan's 83), "
+                             "or 'any' to skip the county check (e.g. for a multi-state export)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes building the rollups, per Year partition (default: %(default)s, in process)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="aggregate the csv in bounded chunks (for exports larger than RAM)")
+    parser.add_argument("--max-memory-mb", type=float, default=256,
+                        help="chunk memory ceiling for --streaming (default: %(default)s)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="write a per-stage trace (Chrome trace format) and print it as a table")
+    parser.add_argument("--profile", metavar="STAGE", action="append", default=[],
+                        help="sample python stacks during STAGE, written next to --trace as folded stacks")
+    args = parser.parse_args(argv)
+    if args.profile:
+        if not args.trace:
+            parser.error("--profile needs --trace, the folded stacks are written next to it")
+        from .pipeline import STAGES
+
+        stages = CLI_STAGES + STAGES
+        unknown = [stage for stage in args.profile if stage not in stages]
+        if unknown:
+            parser.error(f"unknown --profile stage {', '.join(unknown)} (choose from {', '.join(stages)})")
+    return args
+
+
+def compute_tables(args, trace):
+    from . import pipeline
+    from .dimensions import DimensionRegistry
+
+    if args.streaming:
+        from .streaming import stream_aggregates
+
+        with trace.stage("streaming_aggregates"):
+            aggregates = stream_aggregates(args.source, max_memory_mb=args.max_memory_mb)
+        return pipeline.run_from_aggregates(aggregates)
+
+    with trace.stage("load") as stage:
+        if args.no_cache:
+            from .loader import load_stocking_csv
+
+            df, cache_entry = load_stocking_csv(args.source), None
+        else:
+            from .cache import load_stocking_cached
+
+            df, report = load_stocking_cached(args.source)
+            cache_entry = report["cache"]
+        dimensions = DimensionRegistry(df)
+        stage["rows_out"] = len(df)
+    df_raw, quarantine = df, None
+
+    from .dedup import deduplicate
+
+    with trace.stage("dedup", rows_in=len(df)) as stage:
+        df, duplicates, duplicate_summary = deduplicate(df, collapse=args.collapse_duplicates)
+        stage["rows_out"] = len(df)
+    df_deduped = df
+    checks = {"duplicates": duplicates, "duplicate_summary": duplicate_summary}
+
+    if not args.no_validate:
+        from .validation import MICHIGAN_COUNTIES, validate
+
+        counties = MICHIGAN_COUNTIES
+        if args.counties == "any":
+            counties = None
+        elif args.counties:
+            counties = [line.strip() for line in Path(args.counties).read_text().splitlines() if line.strip()]
+        with trace.stage("validate", rows_in=len(df)) as stage:
+            df, quarantine, validation_report, validation_samples = validate(df, counties=counties)
+            stage["rows_out"] = len(df)
+        checks.update({
+            "validation_report": validation_report,
+            "validation_samples": validation_samples,
+            "quarantine": quarantine.reset_index(),
+        })
+
+    # the rankings go through the query layer like in the notebook when there is a cache entry
+    stocking = None
+    if cache_entry is not None:
+        from .query import Stocking
+
+        stocking = Stocking(cache_entry, exclude_rows=pipeline.excluded_rows(df_raw, df_deduped, quarantine))
+    try:
+        # run_analysis takes a fresh 0..n index
+        tables = pipeline.run_analysis(
+            df.reset_index(drop=True), trace=trace, stocking=stocking, df_raw=df_raw, workers=args.workers,
+            dimensions=dimensions,
+        )
+    finally:
+        if stocking is not None:
+            stocking.close()
+    tables.update(checks)
+    return tables
+
+
+def write_tables(tables, out, fmt):
+    out = Path(out)
+    if fmt == "xlsx":
+        from .export import export_workbook
+
+        path = out if out.suffix == ".xlsx" else out / "fish_stocking_tables.xlsx"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        export_workbook(tables, path)
+        return [path]
+
+    if fmt == "parquet":
+        from .export import export_parquet_bundle
+
+        export_parquet_bundle(tables, out)
+        return [out / f"{name}.parquet" for name in tables]
+
+    out.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, df in tables.items():
+        path = out / f"{name}.csv"
+        # keep named indexes (e.g. Species on species_stats) as a column
+        df.to_csv(path, index=df.index.name is not None)
+        paths.append(path)
+    return paths
+
+
+def main(argv=None):
+    from .trace import Trace
+
+    args = parse_args(argv)
+    trace = Trace(profile=args.profile)
+    start = time.perf_counter()
+    tables = compute_tables(args, trace)
+    with trace.stage("write", rows_in=sum(len(df) for df in tables.values())):
+        write_tables(tables, args.out, args.format)
+    # the trace's peak, the stages reset the one getrusage reports
+    peak = trace.peak_mb()
+    print(
+        f"wrote {len(tables)} tables to {args.out} in {time.perf_counter() - start:.2f}s"
+        + (f" (peak RSS {peak:.0f} MB)" if peak == peak else ""),
+        file=sys.stderr,
+    )
+    if args.trace:
+        print(trace.table().to_string(index=False, float_format="{:.3f}".format), file=sys.stderr)
+        trace.write_chrome_trace(args.trace)
+        for stage in args.profile:
+            # e.g. validate with --no-validate
+            if stage not in trace:
+                print(f"stage {stage} didn't run, no profile written", file=sys.stderr)
+                continue
+            trace.write_profile(stage, f"{args.trace}.{stage}.folded")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Pre-aggregated cube for the interactive filters.
+
+The cleaned data is rolled up once to (Year, month, Species, County,
+Water Body) with the fish total and number of stocking events. Rows are kept
+sorted by (cell, Year), where a cell is one (month, Species, County,
+Water Body) combination, next to running sums. The total of any cell over any
+year range is then two binary searches and a subtraction, so a
+year range x species/county/water body query never touches the row level data.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .dates import calendar_features
+from .rollup import COUNT_COLUMN, build_base
+
+CELL_DIMENSIONS = ["month", "Species", "County", "Water Body"]
+MEASURES = ["Number", "Stocking Efforts"]
+
+
+class StockingCube:
+    """Year-indexed prefix sums over every (month, Species, County, Water Body) cell.
+
+    Rows without a Date can't be placed on the year axis and are left out.
+    """
+
+    def __init__(self, df_clean):
+        if "Year" in df_clean and "month" in df_clean:
+            # calendar columns from dates.with_calendar
+            base = build_base(df_clean, ["Year", "month", "Species", "County", "Water Body"], ["Number"])
+            base = base[base["Year"].notna()]
+        else:
+            base = build_base(df_clean, ["Date", "Species", "County", "Water Body"], ["Number"])
+            base = base[base["Date"].notna()]
+            base = base.join(calendar_features(base["Date"])[["Year", "month"]])
+
+        # missing species/county/water body are kept as cells of their own
+        base = (
+            base.groupby(["Year"] + CELL_DIMENSIONS, observed=True, dropna=False)[["Number", COUNT_COLUMN]]
+            .sum()
+            .reset_index()
+            .rename(columns={COUNT_COLUMN: "Stocking Efforts"})
+        )
+
+        self.years = np.sort(base["Year"].unique()).astype("int64")
+        year_index = np.searchsorted(self.years, base["Year"].to_numpy())
+
+        # one code per cell, with the labels of each dimension for the cells
+        cell_codes = (
+            base.groupby(CELL_DIMENSIONS, observed=True, dropna=False, sort=True).ngroup().to_numpy()
+        )
+        first_rows = np.zeros(cell_codes.max() + 1 if len(cell_codes) else 0, dtype="int64")
+        first_rows[cell_codes[::-1]] = np.arange(len(cell_codes))[::-1]
+        self.cells = base[CELL_DIMENSIONS].iloc[first_rows].reset_index(drop=True)
+        self.cell_codes = {
+            dim: pd.factorize(self.cells[dim], sort=True, use_na_sentinel=False)
+            for dim in CELL_DIMENSIONS
+        }
+
+        # rows sorted by (cell, year) and the running sums over them
+        self.key = cell_codes.astype("int64") * len(self.years) + year_index
+        order = np.argsort(self.key, kind="stable")
+        self.key = self.key[order]
+        self.year_index = year_index[order]
+        self.row_cells = cell_codes[order]
+        self.values = {m: base[m].to_numpy(dtype="int64")[order] for m in MEASURES}
+        self.prefix = {m: np.r_[0, np.cumsum(v)] for m, v in self.values.items()}
+
+    def options(self, dim):
+        """Values a ``where`` filter on ``dim`` can take."""
+        return [v for v in self.cell_codes[dim][1] if not pd.isna(v)]
+
+    def _cell_mask(self, where):
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dim, allowed in (where or {}).items():
+            if allowed is None or len(allowed) == 0:
+                continue
+            codes, labels = self.cell_codes[dim]
+            mask &= np.isin(codes, np.flatnonzero(labels.isin(list(allowed))))
+        return mask
+
+    def _year_bounds(self, years):
+        first, last = years if years is not None else (self.years[0], self.years[-1])
+        return np.searchsorted(self.years, first, "left"), np.searchsorted(self.years, last, "right") - 1
+
+    def cell_totals(self, years=None, where=None):
+        """Totals of every cell matching ``where`` over the ``years`` range (inclusive)."""
+        lo, hi = self._year_bounds(years)
+        cells = np.flatnonzero(self._cell_mask(where))
+        start = np.searchsorted(self.key, cells * len(self.years) + lo, "left")
+        stop = np.searchsorted(self.key, cells * len(self.years) + hi, "right")
+
+        totals = self.cells.iloc[cells].reset_index(drop=True)
+        for m in MEASURES:
+            totals[m] = self.prefix[m][stop] - self.prefix[m][start] if hi >= lo else 0
+        return totals[(totals["Stocking Efforts"] > 0)]
+
+    def query(self, by, years=None, where=None):
+        """Fish stocked and stocking events by ``by`` for a year range and filters.
+
+        ``by`` is ``"Year"`` or one of ``CELL_DIMENSIONS``; ``where`` maps
+        dimensions to the allowed values, e.g. ``{"Species": ["Walleye"]}``.
+        """
+        if by == "Year":
+            lo, hi = self._year_bounds(years)
+            rows = self._cell_mask(where)[self.row_cells]
+            rows &= (self.year_index >= lo) & (self.year_index <= hi)
+            result = pd.DataFrame({"Year": self.years})
+            for m in MEASURES:
+                result[m] = np.bincount(
+                    self.year_index[rows], weights=self.values[m][rows], minlength=len(self.years)
+                ).astype("int64")
+            return result.iloc[lo:hi + 1].reset_index(drop=True)
+
+        totals = self.cell_totals(years, where)
+        return totals.groupby(by, observed=True)[MEASURES].sum().reset_index()
@@ -0,0 +1,92 @@
+"""Calendar features of the stocking Date, derived once in one vectorized pass.
+
+``with_calendar(df)`` returns a new frame with compact integer ``Year``,
+``month``, ``iso_week``, ``day_of_year``, ``5yr_bin`` and ``10yr_bin``
+columns next to the (already parsed, datetime64) Date. The features are
+computed once per calendar day with numpy datetime arithmetic and gathered
+by day number, so no python date objects are created and the input frame
+is never modified.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .loader import DATE_COLUMN
+
+CALENDAR_COLUMNS = {
+    "Year": "int16",
+    "month": "int8",
+    "iso_week": "int8",
+    "day_of_year": "int16",
+    "5yr_bin": "int16",
+    "10yr_bin": "int16",
+}
+
+
+def year_bin(years, width):
+    """First year of the ``width``-year bin each year falls in (2003 -> 2000 for 5)."""
+    return (years // width) * width
+
+
+def _day_of_year(days):
+    return (days - days.astype("datetime64[Y]").astype("datetime64[D]")).astype("int64") + 1
+
+
+def _features(days):
+    """The calendar columns for an array of datetime64[D] days."""
+    years = days.astype("datetime64[Y]")
+    year = years.astype("int64") + 1970
+
+    # ISO weeks belong to the year of their Thursday (1970-01-01 was a Thursday)
+    weekday = (days.astype("int64") + 3) % 7
+    thursday = days + (3 - weekday).astype("timedelta64[D]")
+
+    return {
+        "Year": year,
+        "month": (days.astype("datetime64[M]") - years.astype("datetime64[M]")).astype("int64") + 1,
+        "iso_week": (_day_of_year(thursday) - 1) // 7 + 1,
+        "day_of_year": _day_of_year(days),
+        "5yr_bin": year_bin(year, 5),
+        "10yr_bin": year_bin(year, 10),
+    }
+
+
+def calendar_features(dates):
+    """Integer calendar columns for a datetime64 Series, indexed like ``dates``.
+
+    Missing dates give missing values (nullable integer columns); otherwise
+    the columns are plain numpy integers.
+    """
+    missing = dates.isna().to_numpy()
+    days = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype("int64")
+    present = days[~missing]
+    first = present.min() if len(present) else 0
+    offsets = np.where(missing, 0, days - first)
+    span = offsets.max() + 1 if len(offsets) else 0
+
+    if span <= len(days):
+        # stocking dates span a few thousand days: derive each calendar day once and gather
+        table = _features(np.arange(first, first + span).astype("datetime64[D]"))
+        values = {name: column.astype(CALENDAR_COLUMNS[name])[offsets] for name, column in table.items()}
+    else:
+        values = _features((offsets + first).astype("datetime64[D]"))
+
+    columns = {}
+    for name, dtype in CALENDAR_COLUMNS.items():
+        column = values[name].astype(dtype, copy=False)
+        if missing.any():
+            column = pd.arrays.IntegerArray(column, missing)
+        columns[name] = column
+    return pd.DataFrame(columns, index=dates.index)
+
+
+def with_calendar(df, date_column=DATE_COLUMN):
+    """New frame with the calendar columns added after ``df``'s own columns."""
+    features = calendar_features(df[date_column])
+    return pd.concat([df.drop(columns=features.columns, errors="ignore"), features], axis=1)
+
+
+def yearly(frame, by, values, date_column=DATE_COLUMN):
+    """Sum ``values`` of a Date-grained frame up to ``Year`` x ``by``."""
+    years = calendar_features(frame[date_column])["Year"]
+    return frame.groupby([years, *by], observed=True)[values].sum().reset_index()
@@ -0,0 +1,163 @@
+"""Duplicate and near duplicate stocking events.
+
+The export sometimes repeats the row of one stocking event, which inflates
+both the effort counts and the fish totals.
+
+- exact duplicates: rows with the same event key (``KEY_COLUMNS``). Every
+  row's key is hashed to one 64 bit value (categorical columns are hashed
+  per category, not per row) and repeats are found through a hash table,
+  so it is O(n). A flagged row's key columns are compared with its first
+  copy, so a hash collision is never dropped as a duplicate;
+- near duplicates: the same species & strain at the same site, a few
+  days apart, with about the same number of fish (a re-entered event with
+  a typo in the date or count). Rows are only compared within their block
+  (water body) and date window: sorted by block and date, row ``i`` is
+  compared with ``i + 1``, ``i + 2``, ... for as long as they stay in the
+  same block and window, every offset handled for all rows at once. The
+  comparisons stay close to the number of rows instead of all pairs.
+
+``deduplicate`` reports both and can collapse them (keeping the first copy)
+before anything is aggregated.
+"""
+
+import numpy as np
+import pandas as pd
+
+# what makes two rows the same stocking event
+KEY_COLUMNS = ("Date", "Water Body", "Site Name", "Species", "Strain", "Number")
+
+# near duplicates: compared within a block, must agree on match, dates at most WINDOW_DAYS apart
+# and fish counts within TOLERANCE of each other
+BLOCK_COLUMNS = ("Water Body",)
+MATCH_COLUMNS = ("Site Name", "Species", "Strain")
+WINDOW_DAYS = 3
+TOLERANCE = 0.05
+
+COLLAPSE = ("exact", "near")
+
+
+def event_hashes(df, columns=KEY_COLUMNS):
+    """One uint64 hash of ``columns`` per row (missing values hash alike)."""
+    return pd.util.hash_pandas_object(df[list(columns)], index=False).to_numpy()
+
+
+def exact_duplicates(df, columns=KEY_COLUMNS):
+    """``(mask, first)``: rows repeating an earlier row on ``columns``, and each row's first copy (position)."""
+    hashes = event_hashes(df, columns)
+    mask = pd.DataFrame({"hash": hashes}).duplicated().to_numpy()
+    codes, _ = pd.factorize(hashes)
+    # codes are 0..k-1, so the index of every code's first occurrence is its first copy
+    first = np.unique(codes, return_index=True)[1][codes]
+
+    # a 64 bit hash can still collide, only rows equal to their first copy count
+    repeats = np.flatnonzero(mask)
+    if len(repeats):
+        keys = df[list(columns)]
+        mask[repeats] = _same_rows(keys.iloc[repeats], keys.iloc[first[repeats]])
+    return mask, first
+
+
+def _same_rows(a, b):
+    # row by row equality of two frames with the same columns, missing equal to missing
+    a, b = a.reset_index(drop=True), b.reset_index(drop=True)
+    return (a.eq(b) | (a.isna() & b.isna())).all(axis=1).to_numpy()
+
+
+def _group_ids(df, columns, dropna=True):
+    # one integer per distinct combination of columns, -1 when any of them is missing (with dropna)
+    return df.groupby(list(columns), observed=True, sort=False, dropna=dropna).ngroup().to_numpy()
+
+
+def near_duplicates(df, window_days=WINDOW_DAYS, tolerance=TOLERANCE, block=BLOCK_COLUMNS,
+                    match=MATCH_COLUMNS, skip=None):
+    """``(pairs, comparisons)``: near duplicate rows and how many row pairs were compared.
+
+    ``pairs`` has one row per later copy: its position (``Row``), the
+    position of the earlier row it repeats (``Duplicate Of``) and the days
+    between them. ``skip`` masks rows left out (e.g. exact duplicates).
+    """
+    block_ids = _group_ids(df, block)
+    # most species are stocked without a strain (or site), missing matches missing
+    match_ids = _group_ids(df, match, dropna=False)
+    days = df["Date"].to_numpy(dtype="datetime64[D]").astype("int64")
+    number = df["Number"].to_numpy(dtype="float64")
+    candidates = (block_ids >= 0) & ~np.isnat(df["Date"].to_numpy(dtype="datetime64[D]"))
+    if skip is not None:
+        candidates &= ~skip
+
+    rows = np.flatnonzero(candidates)
+    order = rows[np.lexsort((days[rows], block_ids[rows]))]
+    b, d, m, x = block_ids[order], days[order], match_ids[order], number[order]
+
+    found_i, found_j = [], []
+    comparisons = 0
+    # rows still within the window of a row further down; the window only closes as the offset grows
+    alive = np.arange(len(order) - 1)
+    offset = 1
+    while len(alive):
+        partner = alive + offset
+        alive, partner = alive[partner < len(order)], partner[partner < len(order)]
+        within = (b[alive] == b[partner]) & (d[partner] - d[alive] <= window_days)
+        alive, partner = alive[within], partner[within]
+        comparisons += len(alive)
+        close = np.abs(x[alive] - x[partner]) <= tolerance * np.maximum(np.abs(x[alive]), np.abs(x[partner]))
+        hit = (m[alive] == m[partner]) & close
+        found_i.append(alive[hit])
+        found_j.append(partner[hit])
+        offset += 1
+
+    i = np.concatenate(found_i) if found_i else np.array([], dtype="int64")
+    j = np.concatenate(found_j) if found_j else np.array([], dtype="int64")
+    pairs = pd.DataFrame({
+        "Row": order[j],
+        "Duplicate Of": order[i],
+        "Days Apart": d[j] - d[i],
+    })
+    # a row close to several earlier ones is listed once, against the nearest
+    pairs = pairs.sort_values(["Row", "Days Apart", "Duplicate Of"]).drop_duplicates("Row")
+    return pairs.reset_index(drop=True), comparisons
+
+
+def deduplicate(df, collapse=None, near=True, **near_options):
+    """``(df, duplicates, summary)``: ``df`` (collapsed when asked), every duplicate row and the counts.
+
+    ``collapse`` is None (keep every row), ``"exact"`` (drop exact
+    duplicates) or ``"near"`` (drop exact and near duplicates); the first
+    copy is kept and the index isn't touched, so dropped rows can be traced
+    back. ``duplicates`` holds the duplicate rows' event columns with their
+    index as ``Row``, the ``Duplicate Of`` row, the ``Kind`` (exact or near)
+    and the ``Days Apart``. ``near=False`` skips the near duplicate search.
+    """
+    if collapse is not None and collapse not in COLLAPSE:
+        raise ValueError(f"collapse must be None or one of {COLLAPSE}, got {collapse!r}")
+    if collapse == "near" and not near:
+        raise ValueError("collapse='near' needs near=True")
+
+    exact, first = exact_duplicates(df)
+    positions = np.flatnonzero(exact)
+    found = [pd.DataFrame({"Row": positions, "Duplicate Of": first[positions], "Kind": "exact", "Days Apart": 0})]
+    comparisons = 0
+    if near:
+        pairs, comparisons = near_duplicates(df, skip=exact, **near_options)
+        found.append(pairs.assign(Kind="near")[["Row", "Duplicate Of", "Kind", "Days Apart"]])
+    found = pd.concat(found, ignore_index=True).sort_values("Row", kind="stable")
+
+    # positions -> the frame's own index labels
+    labels = df.index.to_numpy()
+    columns = [column for column in df.columns if column in KEY_COLUMNS]
+    duplicates = df.iloc[found["Row"].to_numpy()][columns].reset_index(drop=True)
+    duplicates.insert(0, "Row", labels[found["Row"].to_numpy()])
+    duplicates.insert(1, "Duplicate Of", labels[found["Duplicate Of"].to_numpy()])
+    duplicates.insert(2, "Kind", found["Kind"].to_numpy())
+    duplicates.insert(3, "Days Apart", found["Days Apart"].to_numpy())
+
+    n = len(df)
+    is_near = duplicates["Kind"] == "near"
+    dropped = {None: duplicates[:0], "exact": duplicates[~is_near], "near": duplicates}[collapse]
+    summary = pd.DataFrame({
+        "Measure": ["Rows", "Exact Duplicates", "Near Duplicates", "Near Comparisons", "All Pairs", "Collapsed"],
+        "Value": [n, int((~is_near).sum()), int(is_near.sum()), int(comparisons), n * (n - 1) // 2, len(dropped)],
+    })
+    if len(dropped):
+        df = df.drop(index=dropped["Row"])
+    return df, duplicates, summary
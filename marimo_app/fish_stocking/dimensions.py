@@ -0,0 +1,97 @@
+"""Registry of the dimension values (species, counties, water bodies, sites).
+
+Every distinct value gets a dense integer code once, at load, along with
+per-value tags (species family, the salmon/trout/steelhead focus group).
+Category questions like "is this a salmonid" are then answered once per
+distinct value and looked up by code, instead of running a regex over
+every row.
+"""
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ("Species", "County", "Water Body", "Site Name")
+
+# species family by keyword in the (lowercased) species name, first match wins
+SPECIES_FAMILIES = {
+    "salmonid": ("salmon", "trout", "steelhead", "splake", "grayling", "whitefish", "herring", "cisco"),
+    "percid": ("walleye", "perch", "sauger"),
+    "esocid": ("pike", "muskellunge", "musky", "pickerel"),
+    "centrarchid": ("bass", "bluegill", "crappie", "sunfish", "pumpkinseed"),
+    "ictalurid": ("catfish", "bullhead"),
+    "cyprinid": ("minnow", "shiner", "chub"),
+    "acipenserid": ("sturgeon",),
+    "osmerid": ("smelt",),
+    "catostomid": ("sucker",),
+}
+
+# groups the notebook asks about, matched the same way
+SPECIES_GROUPS = {
+    "salmon_trout_steelhead": ("salmon", "trout", "steelhead"),
+}
+
+
+def species_family(name):
+    name = str(name).lower()
+    for family, keywords in SPECIES_FAMILIES.items():
+        if any(keyword in name for keyword in keywords):
+            return family
+    return "other"
+
+
+def species_tags(species):
+    """Boolean tag table (one row per species, one column per family/group)."""
+    names = pd.Index(species)
+    families = pd.Series([species_family(name) for name in names], index=names)
+    tags = pd.DataFrame({family: families == family for family in [*SPECIES_FAMILIES, "other"]})
+    for group, keywords in SPECIES_GROUPS.items():
+        lowered = names.str.lower()
+        tags[group] = np.logical_or.reduce([lowered.str.contains(k, regex=False) for k in keywords])
+    return tags
+
+
+class DimensionRegistry:
+    """Dense integer codes plus per-code tags for each dimension."""
+
+    def __init__(self, df, dimensions=DIMENSIONS):
+        self.labels = {}
+        for dim in dimensions:
+            if dim not in df:
+                continue
+            values = df[dim]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                self.labels[dim] = values.cat.categories
+            else:
+                self.labels[dim] = pd.Index(values.dropna().unique()).sort_values()
+
+        self.tags = {}
+        if "Species" in self.labels:
+            self.tags["Species"] = species_tags(self.labels["Species"])
+
+    def codes(self, values, dim):
+        """Registry codes of ``values`` for ``dim``, -1 for missing or unseen values.
+
+        A categorical is looked up once per category and gathered by its codes.
+        """
+        labels = self.labels[dim]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            per_category = np.append(labels.get_indexer(values.cat.categories), -1)
+            return per_category[values.cat.codes.to_numpy()]
+        return labels.get_indexer(values)
+
+    def tag_names(self, dim):
+        return list(self.tags[dim].columns) if dim in self.tags else []
+
+    def labels_with_tag(self, dim, tag):
+        table = self.tags[dim]
+        return list(table.index[table[tag].to_numpy()])
+
+    def has_tag(self, values, dim, tag):
+        """Boolean mask of ``values`` whose ``dim`` value carries ``tag``.
+
+        The tag is looked up by registry code (see ``codes``), values the
+        registry hasn't seen are never tagged.
+        """
+        tagged = self.tags[dim][tag].reindex(self.labels[dim], fill_value=False).to_numpy(dtype=bool)
+        # code -1 is a missing or unseen value
+        return pd.Series(np.append(tagged, False)[self.codes(values, dim)], index=values.index)
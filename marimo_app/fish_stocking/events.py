@@ -0,0 +1,151 @@
+"""Stocking events: how many times a year a water body / site / species is stocked.
+
+An event is one stocking day for a group, e.g. one (Water Body, Species):
+several plants of the same group on the same day (different sites or
+trucks) are one event. Keyed on (Water Body, Site Name, Species) the
+events are per site instead. Rows are keyed by ``group code * days + day``,
+sorted once, and everything per group comes from that sorted order:
+events are the distinct keys, and the interval to the previous event is a
+plain ``np.diff`` masked where the group changes, so no per-group python
+loop runs however many pairs there are.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .dates import calendar_features
+from .loader import DATE_COLUMN
+
+# dense group code carried by the events table, what the summaries group on
+GROUP_COLUMN = "__group"
+
+
+def _group_codes(df, by):
+    # one dense code per combination of the ``by`` columns (mixed radix over
+    # each column's factorized codes), -1 where any key is missing
+    codes = np.zeros(len(df), dtype="int64")
+    missing = np.zeros(len(df), dtype=bool)
+    uniques = []
+    for column in by:
+        column_codes, column_uniques = pd.factorize(df[column], sort=True)
+        codes = codes * max(len(column_uniques), 1) + column_codes
+        missing |= column_codes < 0
+        uniques.append(column_uniques)
+    codes[missing] = -1
+    return codes, uniques
+
+
+def _group_labels(codes, uniques, by):
+    # invert the mixed radix codes back into one label column per ``by`` column
+    labels = {}
+    for column, column_uniques in zip(reversed(by), reversed(uniques)):
+        size = max(len(column_uniques), 1)
+        labels[column] = np.asarray(column_uniques).take(codes % size)
+        codes = codes // size
+    return {column: labels[column] for column in by}
+
+
+def stocking_events(df, by=("Water Body", "Species")):
+    """One row per (group, stocking day), sorted by group then date.
+
+    Columns are the ``by`` columns, Date, Year, month, day_of_year, Plants
+    (rows that day), Fish Stocked and Days Since Last (NaN on a group's first
+    event). Rows missing a key or the Date are left out.
+    """
+    by = list(by)
+    codes, uniques = _group_codes(df, by)
+    dates = df[DATE_COLUMN]
+    keep = (codes >= 0) & dates.notna().to_numpy()
+    days = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype("int64")[keep]
+    codes = codes[keep]
+    # a missing count adds no fish, as in a groupby sum
+    fish = df["Number"].to_numpy(dtype="int64", na_value=0)[keep]
+
+    first_day = days.min() if len(days) else 0
+    span = (days.max() - first_day + 1) if len(days) else 1
+    key = codes * span + (days - first_day)
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+
+    # distinct keys are the events
+    starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]]) if len(key) else np.array([], dtype="int64")
+    event_key = key[starts]
+    plants = np.diff(np.r_[starts, len(key)])
+    event_fish = np.add.reduceat(fish[order], starts) if len(starts) else fish[:0]
+    event_group = event_key // span
+    event_day = event_key % span + first_day
+
+    # consecutive events of the same group are adjacent, so their interval is a diff
+    new_group = np.r_[True, event_group[1:] != event_group[:-1]] if len(event_key) else np.array([], dtype=bool)
+    since_last = np.diff(event_day, prepend=event_day[:1]).astype("float64")
+    since_last[new_group] = np.nan
+
+    events = pd.DataFrame(_group_labels(event_group, uniques, by))
+    for column in by:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            events[column] = pd.Categorical(events[column], categories=df[column].cat.categories)
+    events[DATE_COLUMN] = event_day.astype("datetime64[D]").astype("datetime64[ns]")
+    calendar = calendar_features(events[DATE_COLUMN])
+    events["Year"] = calendar["Year"]
+    events["month"] = calendar["month"]
+    events["day_of_year"] = calendar["day_of_year"]
+    events["Plants"] = plants
+    events["Fish Stocked"] = event_fish
+    events["Days Since Last"] = since_last
+    events[GROUP_COLUMN] = event_group
+    return events
+
+
+def stocking_frequency(events, by=("Water Body", "Species")):
+    """Times stocked per group and year, with that year's stocking window.
+
+    ``First Day`` / ``Last Day`` are days of the year, so ``Season Days`` is
+    how long the stocking season of the group ran that year.
+    """
+    by = list(by)
+    grouped = events.groupby([GROUP_COLUMN, "Year"], sort=True)
+    frequency = grouped.agg(**{
+        "Times Stocked": ("Plants", "size"),
+        "Plants": ("Plants", "sum"),
+        "Fish Stocked": ("Fish Stocked", "sum"),
+        "First Day": ("day_of_year", "min"),
+        "Last Day": ("day_of_year", "max"),
+        "Median Days Between": ("Days Since Last", "median"),
+    })
+    frequency["Season Days"] = frequency["Last Day"] - frequency["First Day"]
+    labels = events.groupby(GROUP_COLUMN, sort=True)[by].first()
+    frequency = frequency.reset_index().merge(labels, left_on=GROUP_COLUMN, right_index=True)
+    return frequency[by + ["Year"] + [c for c in frequency.columns if c not in by + [GROUP_COLUMN, "Year"]]]
+
+
+def stocking_intervals(events, by=("Water Body", "Species")):
+    """Whole-history summary per group: events per year, intervals and season.
+
+    ``Events Per Year`` averages over the years the group was stocked at
+    all. The season is the first, last and busiest month over all events.
+    """
+    by = list(by)
+    grouped = events.groupby(GROUP_COLUMN, sort=True)
+    summary = grouped.agg(**{
+        "Events": ("Plants", "size"),
+        "Years Stocked": ("Year", "nunique"),
+        "Fish Stocked": ("Fish Stocked", "sum"),
+        "Median Days Between": ("Days Since Last", "median"),
+        "Min Days Between": ("Days Since Last", "min"),
+        "Max Days Between": ("Days Since Last", "max"),
+    })
+    summary["Events Per Year"] = summary["Events"] / summary["Years Stocked"]
+
+    # events per (group, month) as a dense matrix, then first / last / busiest month
+    groups = summary.index.to_numpy()
+    rows = np.searchsorted(groups, events[GROUP_COLUMN].to_numpy())
+    cells = rows * 12 + events["month"].to_numpy(dtype="int64") - 1
+    months = np.bincount(cells, minlength=len(groups) * 12).reshape(len(groups), 12)
+    stocked = months > 0
+    summary["First Month"] = stocked.argmax(axis=1) + 1
+    summary["Last Month"] = 12 - stocked[:, ::-1].argmax(axis=1)
+    summary["Peak Month"] = months.argmax(axis=1) + 1
+
+    labels = grouped[by].first()
+    summary = labels.join(summary).reset_index(drop=True)
+    return summary
@@ -0,0 +1,154 @@
+"""Export of the notebook's tables to Excel or a Parquet bundle.
+
+Every table is hashed and the hashes are kept in a manifest next to the
+output, so a re-run where nothing changed skips the export entirely. The
+workbook is written row by row with xlsxwriter's constant-memory mode, the
+cells converted to python values ``WRITE_CHUNK_ROWS`` rows at a time, and the
+raw/cleaned data sheets can be sampled or skipped. A Parquet bundle (one file
+per table) rewrites only the tables that changed.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# sheets holding row level data, the ones that can be sampled or skipped
+RAW_SHEETS = ("RawData", "CleanedData")
+
+RAW_MODES = ("full", "sample", "skip")
+
+EXCEL_MAX_ROWS = 1_048_576
+
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"
+
+# rows converted to python values at a time, so only one chunk of a sheet is ever held as objects
+WRITE_CHUNK_ROWS = 10_000
+
+
+def frame_hash(df):
+    """Content hash of a frame: values, index, column names and dtypes."""
+    digest = hashlib.sha256()
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(repr([str(dtype) for dtype in df.dtypes]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def prepare_tables(datasets, raw_mode="full", sample_rows=10_000):
+    """Apply ``raw_mode`` (full, sample or skip) to the row level sheets."""
+    if raw_mode not in RAW_MODES:
+        raise ValueError(f"raw_mode must be one of {RAW_MODES}, got {raw_mode!r}")
+
+    tables = {}
+    for name, df in datasets.items():
+        if name in RAW_SHEETS and raw_mode == "skip":
+            continue
+        if name in RAW_SHEETS and raw_mode == "sample" and len(df) > sample_rows:
+            # fixed seed so an unchanged frame keeps the same sample (and hash)
+            df = df.sample(n=sample_rows, random_state=0).sort_index()
+        tables[name] = df
+    return tables
+
+
+def _manifest_path(target):
+    target = Path(target)
+    if target.suffix:
+        return target.with_name(target.name + ".manifest.json")
+    return target / "manifest.json"
+
+
+def _read_manifest(target):
+    path = _manifest_path(target)
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def _write_manifest(target, hashes):
+    path = _manifest_path(target)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(hashes, indent=1))
+    os.replace(tmp, path)
+
+
+def _cell_values(series):
+    # python values xlsxwriter can write directly, None for missing
+    # datetimes come out as Timestamps, which xlsxwriter treats as datetimes
+    values = series.to_numpy(dtype=object)
+    values[pd.isna(series).to_numpy()] = None
+    return values.tolist()
+
+
+def write_workbook(tables, path):
+    """Write ``tables`` (sheet name -> frame) to ``path`` in constant memory."""
+    import xlsxwriter
+
+    for name, df in tables.items():
+        if len(df) + 1 > EXCEL_MAX_ROWS:
+            raise ValueError(
+                f"sheet {name!r} has {len(df):,} rows, more than Excel allows; "
+                "use raw_mode='sample' or 'skip' or a Parquet bundle"
+            )
+
+    path = Path(path)
+    tmp = path.with_name(path.stem + ".tmp" + path.suffix)
+    workbook = xlsxwriter.Workbook(
+        tmp, {"constant_memory": True, "default_date_format": DATETIME_FORMAT}
+    )
+    header = workbook.add_format({"bold": True, "border": 1, "align": "center"})
+    for name, df in tables.items():
+        sheet = workbook.add_worksheet(name)
+        sheet.write_row(0, 0, [str(col) for col in df.columns], header)
+        for start in range(0, len(df), WRITE_CHUNK_ROWS):
+            chunk = df.iloc[start:start + WRITE_CHUNK_ROWS]
+            columns = [_cell_values(chunk[col]) for col in chunk.columns]
+            for row, values in enumerate(zip(*columns), start=start + 1):
+                sheet.write_row(row, 0, values)
+    workbook.close()
+    os.replace(tmp, path)
+
+
+def export_workbook(datasets, path, raw_mode="full", sample_rows=10_000, force=False):
+    """Export ``datasets`` to an Excel workbook unless nothing changed.
+
+    An .xlsx can't be patched sheet by sheet, so when any table is stale
+    the whole workbook is rewritten. Returns a report of what was stale.
+    """
+    tables = prepare_tables(datasets, raw_mode, sample_rows)
+    hashes = {name: frame_hash(df) for name, df in tables.items()}
+    previous = _read_manifest(path)
+    stale = [name for name in tables if previous.get(name) != hashes[name]]
+
+    # a removed sheet or a different sheet order also means rewriting
+    changed = force or not Path(path).exists() or stale or list(previous) != list(hashes)
+    if changed:
+        write_workbook(tables, path)
+        _write_manifest(path, hashes)
+    return {"written": bool(changed), "stale": stale, "sheets": len(tables)}
+
+
+def export_parquet_bundle(datasets, directory, raw_mode="full", sample_rows=10_000, force=False):
+    """Export ``datasets`` as one Parquet file per table, rewriting only stale ones."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    tables = prepare_tables(datasets, raw_mode, sample_rows)
+    previous = _read_manifest(directory)
+
+    hashes, stale = {}, []
+    for name, df in tables.items():
+        hashes[name] = frame_hash(df)
+        target = directory / f"{name}.parquet"
+        if force or previous.get(name) != hashes[name] or not target.exists():
+            tmp = directory / f"{name}.parquet.tmp"
+            df.to_parquet(tmp)
+            os.replace(tmp, target)
+            stale.append(name)
+
+    # tables that are no longer exported
+    for name in set(previous) - set(hashes):
+        (directory / f"{name}.parquet").unlink(missing_ok=True)
+
+    _write_manifest(directory, hashes)
+    return {"written": bool(stale), "stale": stale, "sheets": len(tables)}
@@ -0,0 +1,239 @@
+"""Incremental refresh of the notebook aggregates.
+
+Instead of rebuilding every aggregate from the full history, new stocking rows
+(the ones past the stored watermark) are aggregated on their own and merged
+into the persisted additive aggregates. Only the small derived views
+(species stats, top/bottom 10s) are recomputed from those aggregates.
+
+The watermark is the latest ingested Date plus the hashes of the rows on that
+date, so rows published later for the same day are still picked up. Rows
+without a parseable Date can't be placed against the watermark and are skipped.
+Rows dated before the watermark (a backfilled correction) can't be merged
+either: the state keeps how many rows were ingested, so ``refresh`` counts
+the rows the input has beyond those and reports them as skipped; rebuild the
+state (delete the directory) to take them in.
+
+Every refresh writes its aggregates to a new directory and then swaps in the
+watermark file, which names that directory, with one atomic replace: a
+refresh that dies half way leaves the previous aggregates and watermark as
+they were, so the same rows are never added twice.
+
+Run ``python -m fish_stocking.incremental path/to/fish_stocking_data.csv`` for
+a refresh from the command line.
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from .loader import DATE_COLUMN, RAW_DATE_COLUMN
+from .dates import yearly
+from .ranking import tail_k, top_bottom, top_k
+
+WATERMARK_FILE = "watermark.json"
+AGGREGATES_PREFIX = "aggregates-"
+
+# persisted additive aggregates: name -> (group keys, summed columns)
+AGGREGATES = {
+    "date_species": (["Date", "Species"], ["Number"]),
+    "county": (["County"], ["Number"]),
+    "month": (["month"], ["Number"]),
+    "waterbody": (["Water Body"], ["Number", "Stocking Efforts"]),
+}
+
+
+def row_hashes(df):
+    """Stable per-row hash, with repeated identical rows told apart by occurrence."""
+    # the raw date text is only there when some date didn't parse, it mustn't change the hashes
+    hashes = pd.util.hash_pandas_object(df.drop(columns=RAW_DATE_COLUMN, errors="ignore"), index=False)
+    occurrence = hashes.groupby(hashes).cumcount()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({"hash": hashes.to_numpy(), "occurrence": occurrence.to_numpy()}),
+        index=False,
+    )
+
+
+def _read_state(state_dir):
+    path = Path(state_dir) / WATERMARK_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def read_watermark(state_dir):
+    state = _read_state(state_dir)
+    if state is None:
+        return None
+    return pd.Timestamp(state["date"]), set(state["row_hashes"])
+
+
+def new_rows(df, watermark):
+    """Rows of ``df`` that are past the watermark."""
+    df = df[df[DATE_COLUMN].notna()]
+    if watermark is None:
+        return df
+
+    date, seen = watermark
+    on_date = df[DATE_COLUMN] == date
+    is_new = df[DATE_COLUMN] > date
+    if on_date.any():
+        is_new[on_date] = ~row_hashes(df[on_date]).isin(seen).to_numpy()
+    return df[is_new]
+
+
+def next_watermark(df, fresh, watermark):
+    """Watermark after ingesting ``fresh``, the new rows of the full input ``df``, on top of ``watermark``."""
+    if fresh.empty:
+        return watermark
+
+    # hashed over every row of df on that date, the same rows new_rows numbers the
+    # repeats over, so a second identical row is remembered as occurrence 1 too
+    date = df[DATE_COLUMN].max()
+    return date, set(row_hashes(df[df[DATE_COLUMN] == date]).tolist())
+
+
+def partial_aggregates(df):
+    """Additive aggregates for a batch of rows."""
+    frame = df.assign(
+        Date=df[DATE_COLUMN].dt.normalize(),
+        month=df[DATE_COLUMN].dt.month,
+        **{"Stocking Efforts": 1},
+    )
+    partials = {}
+    for name, (keys, values) in AGGREGATES.items():
+        partials[name] = frame.groupby(keys, observed=True)[values].sum().reset_index()
+    return partials
+
+
+def merge_aggregates(current, partials):
+    """Add ``partials`` into ``current``; work scales with the aggregate size."""
+    if current is None:
+        return partials
+
+    merged = {}
+    for name, (keys, values) in AGGREGATES.items():
+        both = pd.concat([current[name], partials[name]], ignore_index=True)
+        # categories of the old and new batch can differ, compare as plain values
+        for key in keys:
+            if isinstance(both[key].dtype, pd.CategoricalDtype):
+                both[key] = both[key].astype(both[key].cat.categories.dtype)
+        merged[name] = both.groupby(keys, observed=True)[values].sum().reset_index()
+    return merged
+
+
+def load_aggregates(state_dir):
+    state = _read_state(state_dir)
+    if state is None:
+        return None
+    folder = Path(state_dir) / state["aggregates"]
+    return {name: pd.read_parquet(folder / f"{name}.parquet") for name in AGGREGATES}
+
+
+def save_state(state_dir, aggregates, watermark, rows):
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    folder = Path(tempfile.mkdtemp(prefix=AGGREGATES_PREFIX, dir=state_dir))
+    for name, frame in aggregates.items():
+        frame.to_parquet(folder / f"{name}.parquet", index=False)
+
+    # the aggregates only count once the watermark naming them is swapped in,
+    # both change in this one replace
+    date, hashes = watermark
+    tmp = state_dir / f"{WATERMARK_FILE}.tmp"
+    tmp.write_text(json.dumps({
+        "date": date.isoformat(),
+        "row_hashes": sorted(hashes),
+        "aggregates": folder.name,
+        "rows": int(rows),
+    }))
+    os.replace(tmp, state_dir / WATERMARK_FILE)
+
+    # the previous aggregates and the leftovers of refreshes that died
+    for path in state_dir.glob(f"{AGGREGATES_PREFIX}*"):
+        if path != folder:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def refresh(df, state_dir):
+    """Ingest the rows of ``df`` newer than the watermark in ``state_dir``.
+
+    Returns ``(aggregates, rows_ingested, rows_skipped)``, the skipped rows
+    being the dated rows of ``df`` beyond the ones ingested so far that are
+    too old to be new (dated before the watermark).
+    """
+    state = _read_state(state_dir)
+    watermark = read_watermark(state_dir)
+    current = load_aggregates(state_dir)
+    fresh = new_rows(df, watermark)
+    ingested = state["rows"] if state is not None else 0
+    skipped = max(int(df[DATE_COLUMN].notna().sum()) - len(fresh) - ingested, 0)
+    if fresh.empty:
+        return current, 0, skipped
+
+    aggregates = merge_aggregates(current, partial_aggregates(fresh))
+    save_state(state_dir, aggregates, next_watermark(df, fresh, watermark), ingested + len(fresh))
+    return aggregates, len(fresh), skipped
+
+
+def derived_views(aggregates):
+    """Recompute the notebook's summary tables from the additive aggregates."""
+    yearly_species = yearly(aggregates["date_species"], ["Species"], "Number")
+
+    species_stats = pd.DataFrame({
+        "Years Stocked": yearly_species.groupby("Species", observed=True)["Year"].nunique(),
+        "Total Fish Stocked": yearly_species.groupby("Species", observed=True)["Number"].sum(),
+    })
+    yearly_totals = (
+        yearly_species.groupby("Year")["Number"].sum().reset_index().sort_values("Year")
+    )
+
+    county_stocked = aggregates["county"].rename(columns={"Number": "total_stocked"})
+    monthly_stocked = (
+        aggregates["month"].rename(columns={"Number": "total_stocked"}).sort_values("month")
+    )
+    waterbody_efforts = aggregates["waterbody"][["Water Body", "Stocking Efforts"]]
+
+    top_10_consistent, bottom_10_consistent = top_bottom(
+        species_stats, ["Total Fish Stocked", "Years Stocked"], 10
+    )
+    top_10_counties = top_k(county_stocked, "total_stocked", 10)
+    bottom_10_counties = tail_k(county_stocked, "total_stocked", 10)
+    top_10_waterbodies = top_k(waterbody_efforts, "Stocking Efforts", 10)
+    bottom_10_waterbodies = tail_k(waterbody_efforts, "Stocking Efforts", 10)
+
+    return {
+        "yearly_species": yearly_species,
+        "species_stats": species_stats,
+        "top_10_consistent": top_10_consistent,
+        "bottom_10_consistent": bottom_10_consistent,
+        "yearly_totals": yearly_totals,
+        "county_stocked": county_stocked,
+        "top_10_counties": top_10_counties,
+        "bottom_10_counties": bottom_10_counties,
+        "monthly_stocked": monthly_stocked,
+        "waterbody_efforts": waterbody_efforts,
+        "top_10_waterbodies": top_10_waterbodies,
+        "bottom_10_waterbodies": bottom_10_waterbodies,
+    }
+
+
+if __name__ == "__main__":
+    from .cache import default_cache_dir, load_stocking_cached
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "../data/fish_stocking_data.csv"
+    state = sys.argv[2] if len(sys.argv) > 2 else default_cache_dir(source) / "aggregates"
+
+    df, _ = load_stocking_cached(source)
+    aggregates, ingested, skipped = refresh(df, state)
+    print(f"ingested {ingested:,} new rows into {state}")
+    if skipped:
+        print(f"skipped {skipped:,} rows dated before the watermark, delete {state} to rebuild with them")
+    if aggregates is not None:
+        views = derived_views(aggregates)
+        print(views["top_10_consistent"])
+        print(views["top_10_counties"])
@@ -0,0 +1,170 @@
+"""On-disk memoization for the notebook's expensive steps.
+
+Results are keyed by the function's code and the source of the
+``fish_stocking`` package (so edits to the helpers it calls count too) plus
+a fingerprint of its arguments, so re-opening the notebook or re-running a
+cell with unchanged inputs reads the pickled result back instead of
+recomputing it. DataFrames are hashed with ``export.frame_hash``, except the
+big ones given a cheap fingerprint with ``DiskMemo.remember`` (e.g. the
+source file's, from ``cache.load_stocking_cached``), which would take longer
+to hash than most results take to compute. The directory is bounded by size
+and the least recently used entries are evicted first. Hit/miss counts per
+function are kept on the ``DiskMemo``.
+"""
+
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import weakref
+from collections import Counter
+from pathlib import Path
+
+import pandas as pd
+
+from .export import frame_hash
+
+DEFAULT_MAX_BYTES = 512 * 1_000_000
+
+PACKAGE_DIR = Path(__file__).resolve().parent
+
+
+@functools.lru_cache(maxsize=4)
+def _package_hash(stamps):
+    digest = hashlib.sha256()
+    for name, _, _ in stamps:
+        digest.update(name.encode())
+        digest.update((PACKAGE_DIR / name).read_bytes())
+    return digest.hexdigest()
+
+
+def package_hash():
+    """Hash of the ``fish_stocking`` sources, only re-read when a file's size or mtime changed."""
+    stamps = []
+    for path in sorted(PACKAGE_DIR.glob("*.py")):
+        stat = path.stat()
+        stamps.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return _package_hash(tuple(stamps))
+
+
+def code_hash(func):
+    """Hash of the function's source (or bytecode when the source isn't available) and of the package's."""
+    func = inspect.unwrap(func)
+    try:
+        source = inspect.getsource(func).encode()
+    except (OSError, TypeError):
+        code = func.__code__
+        source = code.co_code + repr(code.co_consts).encode()
+    name = f"{func.__module__}.{func.__qualname__}".encode()
+    return hashlib.sha256(name + source + package_hash().encode()).hexdigest()
+
+
+def fingerprint(value, known=None):
+    """Content fingerprint of an argument; ``known`` maps ``id(frame)`` to a fingerprint used instead of hashing it."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        if known and id(value) in known:
+            return "frame:" + known[id(value)]
+        return "frame:" + frame_hash(value.to_frame() if isinstance(value, pd.Series) else value)
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{fingerprint(k, known)}:{fingerprint(v, known)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(fingerprint(v, known) for v in value) + "]"
+    return repr(value)
+
+
+def evict_lru(directory, patterns, max_bytes):
+    """Delete the least recently modified files matching ``patterns`` until they fit ``max_bytes``.
+
+    Returns how many were deleted.
+    """
+    entries = []
+    for pattern in patterns:
+        for path in Path(directory).glob(pattern):
+            stat = path.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        evicted += 1
+    return evicted
+
+
+class DiskMemo:
+    """Size bounded, least recently used on-disk cache of function results."""
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = 0
+        self._known = {}  # id(frame) -> fingerprint given to remember
+
+    def remember(self, frame, *fingerprint):
+        """Key ``frame`` on ``fingerprint`` (what it was made from) instead of hashing its content.
+
+        E.g. ``memo.remember(df_clean, load_report["fingerprint"], collapse_duplicates)``:
+        the package code that turned the source into the frame is in every key already,
+        its shape, columns & dtypes are added. Holds as long as ``frame`` is alive and unchanged.
+        """
+        layout = (frame.shape, list(map(str, frame.columns)), list(map(str, frame.dtypes)))
+        self._known[id(frame)] = hashlib.sha256(repr((fingerprint, layout)).encode()).hexdigest()
+        weakref.finalize(frame, self._known.pop, id(frame), None)
+        return frame
+
+    def key(self, func, args, kwargs):
+        parts = [code_hash(func), fingerprint(args, self._known), fingerprint(sorted(kwargs.items()), self._known)]
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+    def __call__(self, func):
+        """Memoized version of ``func``."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            name = func.__qualname__
+            path = self.directory / f"{self.key(func, args, kwargs)}.pkl"
+            try:
+                with open(path, "rb") as f:
+                    result = pickle.load(f)
+            except Exception:
+                # missing, half written or stale (a class or module it refers to moved): recomputed
+                pass
+            else:
+                # bump the mtime, it is what the LRU eviction goes by
+                os.utime(path)
+                self.hits[name] += 1
+                return result
+
+            self.misses[name] += 1
+            result = func(*args, **kwargs)
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            self.evict()
+            return result
+
+        return wrapper
+
+    def evict(self):
+        """Drop least recently used entries until the directory fits ``max_bytes``."""
+        self.evictions += evict_lru(self.directory, ["*.pkl"], self.max_bytes)
+
+    def clear(self):
+        for path in self.directory.glob("*.pkl"):
+            path.unlink(missing_ok=True)
+
+    def stats(self):
+        """Hit/miss counts per memoized function."""
+        names = sorted(set(self.hits) | set(self.misses))
+        return pd.DataFrame({
+            "Function": names,
+            "Hits": [self.hits[name] for name in names],
+            "Misses": [self.misses[name] for name in names],
+        })
@@ -0,0 +1,204 @@
+"""Process-pool execution of the aggregations over key partitions.
+
+The frame is sorted by the partition key once and every column is written
+as a flat ``.npy`` buffer (under /dev/shm when available). Workers
+memory-map only the rows of the partitions they are given instead of
+receiving pickled DataFrames. Each partition is mapped through ``func`` and
+the results are combined with ``combine``.
+
+``parallel_cuboids`` is ``rollup.compute_cuboids`` with the base cuboid
+built per Year partition in the pool; ``pipeline.run_analysis(workers=...)``
+(``fish-stocking --workers``) uses it for the rollups.
+
+Run ``python -m fish_stocking.parallel path/to/fish_stocking_data.csv`` to
+compare serial and parallel run times.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .incremental import merge_aggregates, partial_aggregates
+from .rollup import COUNT_COLUMN, DERIVED_DIMENSIONS, base_grain, build_base, rollup_base
+from .trends import trend_table
+
+# tasks per worker, so uneven partitions still keep every core busy
+TASKS_PER_WORKER = 4
+
+
+def _partition_codes(df, key):
+    if key in df:
+        values = df[key]
+    elif key in DERIVED_DIMENSIONS:
+        source, derive = DERIVED_DIMENSIONS[key]
+        values = derive(df[source])
+    else:
+        raise KeyError(f"no column or derived dimension named {key!r}")
+    # missing keys get a partition of their own rather than being dropped
+    codes, _ = pd.factorize(values, sort=True, use_na_sentinel=False)
+    return codes
+
+
+def share_frame(df, directory):
+    """Write every column of ``df`` as a ``.npy`` buffer workers can memory-map.
+
+    Categorical and string columns are stored as integer codes with their
+    categories kept in the returned spec, nullable numbers as their values
+    plus a ``.mask.npy`` of the missing ones (so they come back with their dtype).
+    """
+    spec = []
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        categories = nullable = None
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = values.cat.categories
+            array = values.cat.codes.to_numpy()
+        elif pd.api.types.is_extension_array_dtype(values) and pd.api.types.is_numeric_dtype(values):
+            nullable = str(Path(directory) / f"{i}.mask.npy"), values.dtype
+            np.save(nullable[0], values.isna().to_numpy())
+            array = values.to_numpy(dtype=values.dtype.numpy_dtype, na_value=0)
+        elif pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_dtype(values):
+            array = values.to_numpy()
+        else:
+            codes, categories = pd.factorize(values)
+            array = codes
+        path = Path(directory) / f"{i}.npy"
+        np.save(path, np.ascontiguousarray(array))
+        spec.append((column, str(path), categories, nullable))
+    return spec
+
+
+def attach_frame(spec, start, stop):
+    """Rebuild rows ``start:stop`` of a shared frame from its memory-mapped buffers."""
+    columns = {}
+    for column, path, categories, nullable in spec:
+        array = np.load(path, mmap_mode="r")[start:stop]
+        if categories is not None:
+            columns[column] = pd.Categorical.from_codes(array, categories)
+        elif nullable is not None:
+            mask_path, dtype = nullable
+            mask = np.load(mask_path, mmap_mode="r")[start:stop]
+            columns[column] = dtype.construct_array_type()(np.array(array), np.array(mask))
+        else:
+            columns[column] = array
+    return pd.DataFrame(columns, copy=False)
+
+
+def _run_partition(spec, start, stop, func, args):
+    return func(attach_frame(spec, start, stop), *args)
+
+
+def _batches(bounds, tasks):
+    # group whole partitions into roughly equal row ranges, one per task
+    starts, stops = bounds[:-1], bounds[1:]
+    if len(starts) == 0:
+        return []
+    target = bounds[-1] / max(tasks, 1)
+    batches, batch_start = [], starts[0]
+    for start, stop in zip(starts, stops):
+        if stop - batch_start >= target or stop == bounds[-1]:
+            batches.append((batch_start, stop))
+            batch_start = stop
+    return batches
+
+
+def map_partitions(df, func, key="Year", combine=None, workers=None, args=(), tasks=None):
+    """Run ``func(partition, *args)`` over the ``key`` partitions of ``df`` in a process pool.
+
+    ``key`` is a column or a derived dimension (``Year``, ``month``). Rows of
+    a partition are never split across tasks. Results are folded with
+    ``combine(a, b)``, or returned as a list when ``combine`` is None.
+    """
+    workers = workers or os.cpu_count() or 1
+    codes = _partition_codes(df, key)
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    bounds = np.r_[0, np.flatnonzero(np.diff(sorted_codes)) + 1, len(order)]
+    batches = _batches(bounds, tasks or workers * TASKS_PER_WORKER)
+
+    shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    directory = tempfile.mkdtemp(prefix="fish_stocking_", dir=shm)
+    try:
+        spec = share_frame(df.take(order), directory)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_run_partition, spec, int(start), int(stop), func, args)
+                for start, stop in batches
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    if combine is None:
+        return results
+    return reduce(combine, results) if results else None
+
+
+def _concat(a, b):
+    return pd.concat([a, b], ignore_index=True)
+
+
+def parallel_aggregates(df, key="Year", workers=None):
+    """The additive aggregates of ``incremental.partial_aggregates``, computed per partition."""
+    aggregates = map_partitions(df, partial_aggregates, key, merge_aggregates, workers)
+    if aggregates is None:
+        return None
+    # merge_aggregates compares categorical keys as plain values, give them their categories back
+    return {
+        name: frame.astype({col: df[col].dtype for col in frame if col in df and isinstance(df[col].dtype, pd.CategoricalDtype)})
+        for name, frame in aggregates.items()
+    }
+
+
+def parallel_cuboids(df, specs, key="Year", workers=None):
+    """``rollup.compute_cuboids`` with the base cuboid built per ``key`` partition in the pool.
+
+    Sums and row counts add up across partitions, so the partition bases
+    are concatenated and summed once more per group before the rollups.
+    """
+    dimensions, sum_columns = base_grain(specs, df.columns)
+    bases = map_partitions(df, build_base, key, workers=workers, args=(dimensions, sum_columns))
+    if not bases:
+        return rollup_base(build_base(df, dimensions, sum_columns), specs)
+    base = (
+        pd.concat(bases, ignore_index=True)
+        .groupby(dimensions, observed=True, dropna=False)[[*sum_columns, COUNT_COLUMN]]
+        .sum()
+        .reset_index()
+    )
+    return rollup_base(base, specs)
+
+
+def parallel_trends(species_trends, by="Species", min_years=4, workers=None):
+    """``trends.trend_table`` with the groups spread over the process pool.
+
+    Partitions are taken on the first ``by`` column, which never splits a
+    group (e.g. every Species x County group sits inside its species).
+    """
+    keys = [by] if isinstance(by, str) else list(by)
+    return map_partitions(species_trends, trend_table, keys[0], _concat, workers, args=(keys, min_years))
+
+
+if __name__ == "__main__":
+    from .cache import load_stocking_cached
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "../data/fish_stocking_data.csv"
+    df, _ = load_stocking_cached(source)
+
+    start = time.perf_counter()
+    partial_aggregates(df)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel_aggregates(df)
+    parallel = time.perf_counter() - start
+    print(f"serial:   {serial:.3f}s")
+    print(f"parallel: {parallel:.3f}s on {os.cpu_count()} cores")
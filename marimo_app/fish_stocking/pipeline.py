@@ -0,0 +1,336 @@
+"""The notebook's computations as plain functions, without marimo or matplotlib.
+
+The notebook's cells call these, and ``run_analysis`` strings them together:
+it takes the cleaned frame and returns every summary table the notebook
+shows, keyed by the notebook's variable names. It is what the
+``fish-stocking`` command runs.
+
+The species, county, month and water body rankings take a ``query.Stocking``
+when there is one (the data went through the Parquet cache) and are then
+aggregated in DuckDB; without one the same tables come from the pandas
+rollups.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .changepoints import pattern_shifts, with_shifts
+from .dates import with_calendar, year_bin, yearly
+from .dimensions import DimensionRegistry
+from .events import stocking_events, stocking_frequency, stocking_intervals
+from .ranking import format_leaders, tail_k, top_bottom, top_k, top_n_per_group
+from .rolling import rolling_metrics, trend_flips
+from .rollup import compute_cuboids
+from .trace import Trace
+from .trends import trend_table
+
+FOCUS_SPECIES_TAG = "salmon_trout_steelhead"
+
+ROLLING_WINDOW = 5
+
+EVENT_KEYS = ["Water Body", "Species"]
+# the same events per site of a water body
+SITE_EVENT_KEYS = ["Water Body", "Site Name", "Species"]
+
+# every grouping the analysis reads from the pandas rollups
+CUBOIDS = {
+    "year_species": (["Year", "Species"], {"Number": ("Number", "sum")}),
+    "year_county": (["Year", "County"], {"Number": ("Number", "sum")}),
+    "year_waterbody": (["Year", "Water Body"], {"Number": ("Number", "sum")}),
+    "month_species": (["Year", "month", "Species"], {"Number": ("Number", "sum")}),
+    "month_county": (["Year", "month", "County"], {"Number": ("Number", "sum")}),
+    "month_waterbody": (["Year", "month", "Water Body"], {"Number": ("Number", "sum")}),
+    "waterbody": (["Water Body"], {"Stocking Efforts": ("Number", "count")}),
+    "waterbody_species": (["Water Body", "Species"], {"Number": ("Number", "sum")}),
+}
+
+# ranking measures, as query.Stocking / rollup.rollup measures
+SPECIES_MEASURES = {"Total Fish Stocked": ("Number", "sum"), "Years Stocked": ("Year", "nunique")}
+SPECIES_COLUMNS = ["Years Stocked", "Total Fish Stocked"]
+# the yearly rollup leaves out rows without a date, so the species ranked in DuckDB leave them out too
+SPECIES_WHERE = {"Date": (None, None)}
+TOTAL_STOCKED = {"total_stocked": ("Number", "sum")}
+STOCKING_EFFORTS = {"Stocking Efforts": ("Number", "count")}
+
+# the stages run_analysis records on its trace
+STAGES = (
+    "calendar", "rollups", "species_tables", "trend_fit", "place_tables",
+    "rolling_trends", "change_points", "stocking_events",
+)
+
+# the groupings the query layer answers when there is one
+PLACE_CUBOIDS = {
+    "county": (["County"], TOTAL_STOCKED),
+    "month": (["month"], TOTAL_STOCKED),
+}
+
+
+def missing_summary(df_raw):
+    return pd.DataFrame({
+        "missing count": df_raw.isnull().sum(),
+        "non_missing_count": df_raw.notnull().sum(),
+        "total_rows": len(df_raw),
+        "missing_%": round(df_raw.isnull().mean() * 100, 2),
+    }).sort_values(by="missing_%", ascending=False)
+
+
+def excluded_rows(df_raw, df_deduped, quarantine=None):
+    """Rows of ``df_raw`` collapsed by ``dedup.deduplicate`` or quarantined, to leave out of ``query.Stocking``."""
+    excluded = df_raw.index.difference(df_deduped.index)
+    return excluded.union(quarantine.index) if quarantine is not None else excluded
+
+
+def ranked(source, measures, by, n=10, where=None, ascending_bottom=False):
+    """``(groups, top n, bottom n)`` of ``measures`` per ``by``.
+
+    ``source`` is a ``query.Stocking`` (grouped in DuckDB over the rows
+    matching ``where``, in key order) or the already grouped frame. Either
+    way the groups are ranked by ``ranking``, so ties come out the same: the
+    top n highest first, the bottom n the tail of that ranking
+    (``ranking.tail_k``, highest first) or with ``ascending_bottom`` the n
+    lowest, lowest first.
+    """
+    columns = list(measures)
+    if isinstance(source, pd.DataFrame):
+        groups = source
+    else:
+        groups = source.query(measures, by=by, where=where)
+    top = top_k(groups, columns, n)
+    bottom = top_k(groups, columns, n, ascending=True) if ascending_bottom else tail_k(groups, columns, n)
+    if not isinstance(source, pd.DataFrame):
+        # like the rows of a query result
+        top, bottom = top.reset_index(drop=True), bottom.reset_index(drop=True)
+    return groups, top, bottom
+
+
+def species_tables(yearly_species, stocking=None):
+    """Species stats, top/bottom 10 species (least stocked first), yearly totals and the averages."""
+    if stocking is not None:
+        species_stats, top_10_consistent, bottom_10_consistent = (
+            table.set_index("Species")[SPECIES_COLUMNS]
+            for table in ranked(stocking, SPECIES_MEASURES, "Species", where=SPECIES_WHERE, ascending_bottom=True)
+        )
+    else:
+        species_stats = pd.DataFrame({
+            "Years Stocked": yearly_species.groupby("Species", observed=True)["Year"].nunique(),
+            "Total Fish Stocked": yearly_species.groupby("Species", observed=True)["Number"].sum(),
+        })
+        _, top_10_consistent, bottom_10_consistent = ranked(
+            species_stats, SPECIES_MEASURES, "Species", ascending_bottom=True
+        )
+    yearly_totals = yearly_species.groupby("Year")["Number"].sum().reset_index().sort_values("Year")
+    yearly_totals["5yr_bin"] = year_bin(yearly_totals["Year"], 5)
+    yearly_totals["10yr_bin"] = year_bin(yearly_totals["Year"], 10)
+
+    averages = pd.DataFrame({
+        "Average": ["Yearly", "Semi Decadal (5 years)", "Decadal (10 years)"],
+        "Fish Stocked": [
+            yearly_totals["Number"].mean(),
+            yearly_totals.groupby("5yr_bin")["Number"].sum().mean(),
+            yearly_totals.groupby("10yr_bin")["Number"].sum().mean(),
+        ],
+    })
+    return {
+        "species_stats": species_stats,
+        "top_10_consistent": top_10_consistent,
+        "bottom_10_consistent": bottom_10_consistent,
+        "yearly_totals": yearly_totals,
+        "averages": averages,
+    }
+
+
+def trend_tables(yearly_species, first_year=2000, last_year=2025, dimensions=None):
+    """Per species trend fits, top increasing/decreasing and the focus species.
+
+    ``dimensions`` is the ``DimensionRegistry`` the focus species are tagged
+    in, built from ``yearly_species`` when not given.
+    """
+    species_trends = yearly_species.groupby(["Year", "Species"], observed=True)["Number"].sum().reset_index()
+    species_trends = species_trends[species_trends["Year"].between(first_year, last_year)]
+
+    trend_df = trend_table(species_trends, by="Species", min_years=4)
+    trend_df["Trend"] = np.where(trend_df["Slope"] > 0, "Increasing", "Decreasing")
+    top_increasing, top_decreasing = top_bottom(trend_df, "Slope", 10)
+
+    if dimensions is None:
+        dimensions = DimensionRegistry(yearly_species, dimensions=["Species"])
+    focus_species = trend_df[
+        dimensions.has_tag(trend_df["Species"], "Species", FOCUS_SPECIES_TAG)
+    ].sort_values("Slope", ascending=False)
+    return {
+        "trend_df": trend_df,
+        "top_increasing": top_increasing,
+        "top_decreasing": top_decreasing,
+        "focus_species": focus_species,
+    }
+
+
+def county_tables(source, n=10):
+    """Fish stocked per county with the top/bottom ``n``; ``source`` as in ``ranked``."""
+    county_stocked, top, bottom = ranked(source, TOTAL_STOCKED, "County", n)
+    return {"county_stocked": county_stocked, "top_10_counties": top, "bottom_10_counties": bottom}
+
+
+def monthly_table(source):
+    """Fish stocked per month, January first; ``source`` as in ``ranked``."""
+    if isinstance(source, pd.DataFrame):
+        return source.sort_values("month")
+    return source.query(TOTAL_STOCKED, by="month")
+
+
+def waterbody_tables(source, n=10):
+    """Stocking efforts per water body with the top/bottom ``n``; ``source`` as in ``ranked``."""
+    waterbody_efforts, top, bottom = ranked(source, STOCKING_EFFORTS, "Water Body", n)
+    return {"waterbody_efforts": waterbody_efforts, "top_10_waterbodies": top, "bottom_10_waterbodies": bottom}
+
+
+def waterbody_leaders(species_totals, waterbody_efforts, n=3):
+    """``(top species per water body, top 10 water bodies with them)``.
+
+    The first is a Series of "Species (count)" strings per water body,
+    padded with "(-- NONE --)" when a water body has fewer than ``n`` species.
+    """
+    leaders = top_n_per_group(species_totals, "Water Body", "Number", n)
+    top_species_by_waterbody = format_leaders(leaders, "Water Body", "Species", "Number", n)
+    top_10_waterbodies_top10 = top_k(waterbody_efforts, "Stocking Efforts", 10).copy()
+    top_10_waterbodies_top10[f"Top {n} Species"] = (
+        top_species_by_waterbody.reindex(top_10_waterbodies_top10["Water Body"]).to_numpy()
+    )
+    return top_species_by_waterbody, top_10_waterbodies_top10
+
+
+def place_tables(source, species_totals=None):
+    """County, month and water body rankings (plus top 3 species per water body).
+
+    ``source`` is a ``query.Stocking`` or a dict with the ``county``,
+    ``month`` and ``waterbody`` grouped frames (see ``PLACE_CUBOIDS``).
+    ``species_totals`` is the water body x species fish totals.
+    """
+    pick = (lambda name: source[name]) if isinstance(source, dict) else (lambda name: source)
+    tables = county_tables(pick("county"))
+    tables["monthly_stocked"] = monthly_table(pick("month"))
+    tables.update(waterbody_tables(pick("waterbody")))
+
+    if species_totals is not None:
+        top_species_by_waterbody, top_10_waterbodies_top10 = waterbody_leaders(
+            species_totals, tables["waterbody_efforts"]
+        )
+        tables["top_species_by_waterbody"] = top_species_by_waterbody.reset_index(name="Top 3 Species")
+        tables["top_10_waterbodies_top10"] = top_10_waterbodies_top10
+    return tables
+
+
+def rolling_tables(cuboids, window=ROLLING_WINDOW):
+    """Moving sums, slopes & year over year change per species, county and water body, and the species' trend flips."""
+    rolling_species = rolling_metrics(cuboids["year_species"], "Species", window)
+    return {
+        "rolling_species": rolling_species,
+        "rolling_county": rolling_metrics(cuboids["year_county"], "County", window),
+        "rolling_waterbody": rolling_metrics(cuboids["year_waterbody"], "Water Body", window),
+        "trend_flips": trend_flips(rolling_species, "Species"),
+    }
+
+
+def event_tables(events, site_events=None):
+    """Times stocked per year and the intervals between stockings, from ``events.stocking_events``.
+
+    ``events`` are keyed on ``EVENT_KEYS``; with ``site_events`` (keyed on
+    ``SITE_EVENT_KEYS``) the same two tables per site are added.
+    """
+    tables = {
+        "stocking_per_year": stocking_frequency(events, EVENT_KEYS),
+        "stocking_frequency": stocking_intervals(events, EVENT_KEYS),
+    }
+    if site_events is not None:
+        tables["site_stocking_per_year"] = stocking_frequency(site_events, SITE_EVENT_KEYS)
+        tables["site_stocking_frequency"] = stocking_intervals(site_events, SITE_EVENT_KEYS)
+    return tables
+
+
+def shift_tables(cuboids, trend_df):
+    """Change points & anomalies of the yearly and monthly series of every species, county & water body.
+
+    ``trend_shifts`` is ``trend_df`` with each species' yearly change points next to its slope.
+    """
+    dimensions = {"Species": "species", "County": "county", "Water Body": "waterbody"}
+    changes, anomalies, summary = pattern_shifts(
+        {dimension: cuboids[f"year_{name}"] for dimension, name in dimensions.items()},
+        {dimension: cuboids[f"month_{name}"] for dimension, name in dimensions.items()},
+    )
+    return {
+        "shift_points": changes,
+        "shift_anomalies": anomalies,
+        "shift_summary": summary,
+        "trend_shifts": with_shifts(trend_df, summary, "Species"),
+    }
+
+
+def run_analysis(df_clean, trace=None, stocking=None, df_raw=None, workers=None, dimensions=None):
+    """Every summary table of the notebook, computed from the cleaned frame.
+
+    Pass a ``Trace`` to record each stage, a ``query.Stocking`` over the
+    same rows to rank in DuckDB as the notebook does, and the frame as it
+    was loaded (``df_raw``) for the missing value summary. With ``workers``
+    above 1 the rollups are built per Year in that many processes
+    (``parallel.parallel_cuboids``). ``dimensions`` is the
+    ``DimensionRegistry`` built at load, built from ``df_raw`` (or
+    ``df_clean``) when not given.
+    """
+    trace = trace if trace is not None else Trace()
+    if dimensions is None:
+        dimensions = DimensionRegistry(df_raw if df_raw is not None else df_clean)
+    tables = {"missing_summary": missing_summary(df_raw if df_raw is not None else df_clean)}
+
+    if "Year" not in df_clean:
+        with trace.stage("calendar", rows_in=len(df_clean)):
+            df_clean = with_calendar(df_clean)
+
+    with trace.stage("rollups", rows_in=len(df_clean)) as stage:
+        specs = CUBOIDS if stocking is not None else {**CUBOIDS, **PLACE_CUBOIDS}
+        if workers is not None and workers > 1:
+            from .parallel import parallel_cuboids
+
+            cuboids = parallel_cuboids(df_clean, specs, workers=workers)
+        else:
+            cuboids = compute_cuboids(df_clean, specs)
+        yearly_species = cuboids["year_species"]
+        stage["rows_out"] = sum(len(cuboid) for cuboid in cuboids.values())
+
+    tables["yearly_species"] = yearly_species
+    with trace.stage("species_tables", rows_in=len(yearly_species)):
+        tables.update(species_tables(yearly_species, stocking))
+    with trace.stage("trend_fit", rows_in=len(yearly_species)) as stage:
+        tables.update(trend_tables(yearly_species, dimensions=dimensions))
+        stage["rows_out"] = len(tables["trend_df"])
+    with trace.stage("place_tables", rows_in=len(cuboids["waterbody"])):
+        tables.update(place_tables(stocking if stocking is not None else cuboids, cuboids["waterbody_species"]))
+    with trace.stage("rolling_trends", rows_in=len(yearly_species)):
+        tables.update(rolling_tables(cuboids))
+    with trace.stage("change_points", rows_in=len(yearly_species)) as stage:
+        tables.update(shift_tables(cuboids, tables["trend_df"]))
+        stage["rows_out"] = len(tables["shift_summary"])
+    with trace.stage("stocking_events", rows_in=len(df_clean)) as stage:
+        events = stocking_events(df_clean, EVENT_KEYS)
+        site_events = stocking_events(df_clean, SITE_EVENT_KEYS)
+        tables.update(event_tables(events, site_events))
+        stage["rows_out"] = len(events) + len(site_events)
+    return tables
+
+
+def run_from_aggregates(aggregates):
+    """The same tables from the additive aggregates of a streaming/incremental run.
+
+    The water body x species totals aren't kept there, so the top 3 species
+    per water body is left out.
+    """
+    yearly_species = yearly(aggregates["date_species"], ["Species"], "Number")
+
+    tables = {"yearly_species": yearly_species}
+    tables.update(species_tables(yearly_species))
+    tables.update(trend_tables(yearly_species))
+    tables.update(place_tables({
+        "county": aggregates["county"].rename(columns={"Number": "total_stocked"}),
+        "month": aggregates["month"].rename(columns={"Number": "total_stocked"}),
+        "waterbody": aggregates["waterbody"][["Water Body", "Stocking Efforts"]],
+    }))
+    return tables
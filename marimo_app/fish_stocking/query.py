@@ -0,0 +1,214 @@
+"""Declarative queries over the Parquet cache, run by an embedded DuckDB.
+
+A query names what to measure, what to group by, which rows to keep and
+how many of the top / bottom groups to return::
+
+    stocking = Stocking(load_report["cache"])
+    stocking.query(measure="Number", by=["County"], where={"Year": (2010, 2020)}, top=10)
+
+and is compiled to a single SQL statement over the year-partitioned dataset
+the cache writes. Filters on ``Year`` skip whole partitions, the other
+filters are pushed down into the Parquet scan, the aggregation runs on every
+core and spills to disk when the groups don't fit in memory, so nothing has
+to be loaded into pandas first.
+
+Run ``python -m fish_stocking.query path/to/fish_stocking_data.csv`` for the
+top 10 counties of 2010-2020 and the SQL it ran.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+
+from .cache import PARTITION_COLUMN, ROW_COLUMN
+
+# dimensions derived from Date on the fly, named like the calendar columns of dates.with_calendar
+DERIVED = {
+    "month": 'month("Date")',
+    "iso_week": 'weekofyear("Date")',
+    "day_of_year": 'dayofyear("Date")',
+}
+
+# how -> SQL aggregate, "count" being the number of rows as in rollup.rollup
+AGGREGATES = {
+    "sum": "sum({})",
+    "count": "count(*)",
+    "nunique": "count(DISTINCT {})",
+    "mean": "avg({})",
+    "min": "min({})",
+    "max": "max({})",
+}
+
+INTEGER_TYPES = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT")
+
+SPILL_DIR_NAME = "duckdb_spill"
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _measures(measure, agg):
+    # "Number" -> {"Number": ("Number", agg)}, a dict is taken as rollup style measures
+    if isinstance(measure, str):
+        return {measure: (measure, agg)}
+    return dict(measure)
+
+
+class Stocking:
+    """Query interface to one cache entry (see ``cache.load_stocking_cached``).
+
+    ``threads`` defaults to the number of cores. Aggregations that don't
+    fit in ``memory_limit`` (e.g. ``"2GB"``, DuckDB's default when None)
+    spill to a directory next to the entry. ``exclude_rows`` are row
+    positions of the loaded frame left out of every query (e.g. the index of
+    the quarantine from ``validation.validate``).
+    """
+
+    def __init__(self, entry, threads=None, memory_limit=None, exclude_rows=None):
+        self.entry = Path(entry)
+        config = {
+            "threads": threads or os.cpu_count() or 1,
+            "temp_directory": str(self.entry.parent / SPILL_DIR_NAME),
+        }
+        if memory_limit is not None:
+            config["memory_limit"] = memory_limit
+        self._con = duckdb.connect(config=config)
+        source = str(self.entry / "**" / "*.parquet").replace("'", "''")
+        view = (
+            f"CREATE VIEW stocking AS SELECT * EXCLUDE ({_quote(ROW_COLUMN)}) "
+            f"FROM read_parquet('{source}', hive_partitioning = true)"
+        )
+        if exclude_rows is not None and len(exclude_rows):
+            # an anti join on the cache's row positions, however many rows there are
+            excluded = pa.table({"row": pa.array(np.asarray(exclude_rows, dtype="int64"))})
+            # a table, not a registered frame: those aren't seen by the cursors queries run on
+            self._con.execute("CREATE TABLE excluded_rows AS SELECT * FROM excluded")
+            view += f" WHERE {_quote(ROW_COLUMN)} NOT IN (SELECT row FROM excluded_rows)"
+        self._con.execute(view)
+        self.types = {row[0]: row[1] for row in self._con.execute("DESCRIBE stocking").fetchall()}
+        self.columns = list(self.types)
+
+    def _column(self, name):
+        if name in DERIVED:
+            return DERIVED[name]
+        if name not in self.columns:
+            raise KeyError(f"unknown column {name!r}, expected one of {self.columns + list(DERIVED)}")
+        return _quote(name)
+
+    def _predicates(self, where):
+        # {column: value} -> SQL conditions and their parameters
+        conditions, params = [], []
+        for name, value in (where or {}).items():
+            column = self._column(name)
+            if value is None:
+                conditions.append(f"{column} IS NULL")
+            elif isinstance(value, tuple):
+                # (low, high), both ends included, None for an open end;
+                # a missing value is in no range, not even (None, None)
+                low, high = value
+                if low is None and high is None:
+                    conditions.append(f"{column} IS NOT NULL")
+                if low is not None:
+                    conditions.append(f"{column} >= ?")
+                    params.append(low)
+                if high is not None:
+                    conditions.append(f"{column} <= ?")
+                    params.append(high)
+            elif isinstance(value, (list, set, frozenset)):
+                values = sorted(value) if isinstance(value, (set, frozenset)) else list(value)
+                if not values:
+                    conditions.append("false")
+                else:
+                    conditions.append(f"{column} IN ({', '.join('?' * len(values))})")
+                    params.extend(values)
+            else:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        return conditions, params
+
+    def sql(self, measure="Number", by=(), where=None, agg="sum", top=None, bottom=None):
+        """``(sql, params)`` of a query, see ``query``."""
+        if top is not None and bottom is not None:
+            raise ValueError("pass either top or bottom, not both")
+        by = [by] if isinstance(by, str) else list(by)
+        measures = _measures(measure, agg)
+
+        select = [f"{self._column(dim)} AS {_quote(dim)}" for dim in by]
+        for output, (column, how) in measures.items():
+            if how not in AGGREGATES:
+                raise ValueError(f"unknown aggregation {how!r} for {output!r}")
+            source = self._column(column) if how != "count" else None
+            expression = AGGREGATES[how].format(source)
+            if how == "sum" and self.types.get(column) in INTEGER_TYPES:
+                # DuckDB sums integers into a 128 bit HUGEINT, which pandas only takes as float
+                expression = f"CAST({expression} AS BIGINT)"
+            select.append(f"{expression} AS {_quote(output)}")
+
+        conditions, params = self._predicates(where)
+        # rows missing a group key are left out, like a pandas groupby
+        conditions += [f"{self._column(dim)} IS NOT NULL" for dim in by]
+
+        sql = f"SELECT {', '.join(select)} FROM stocking"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        if by:
+            sql += f" GROUP BY {', '.join(str(i) for i in range(1, len(by) + 1))}"
+
+        # same order as ranking.top_bottom: top largest first, bottom smallest
+        # first, missing values last and ties by the group keys either way
+        keys = [_quote(dim) for dim in by]
+        values = [_quote(output) for output in measures]
+        if top is not None:
+            order = [f"{v} DESC NULLS LAST" for v in values] + [f"{k} ASC" for k in keys]
+        elif bottom is not None:
+            order = [f"{v} ASC NULLS LAST" for v in values] + [f"{k} ASC" for k in keys]
+        else:
+            order = [f"{k} ASC" for k in keys]
+        if order:
+            sql += f" ORDER BY {', '.join(order)}"
+        limit = top if top is not None else bottom
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return sql, params
+
+    def query(self, measure="Number", by=(), where=None, agg="sum", top=None, bottom=None):
+        """Aggregate ``measure`` per ``by`` group over the rows matching ``where``.
+
+        ``measure`` is a column aggregated with ``agg`` (``"sum"``,
+        ``"count"``, ``"nunique"``, ``"mean"``, ``"min"`` or ``"max"``) or,
+        as in ``rollup.rollup``, a dict of output column -> ``(column, how)``.
+        ``by`` may use the derived ``month``, ``iso_week`` and ``day_of_year``.
+        ``where`` maps a column to a value, a list of values or an inclusive
+        ``(low, high)`` range (``(None, None)`` keeps the rows where it is set). ``top`` / ``bottom`` keep the groups with the
+        largest / smallest values (ranked on the measures in order); bottom
+        comes smallest first. Without either the groups come in key order.
+        """
+        sql, params = self.sql(measure, by, where, agg, top, bottom)
+        # a cursor per query, so queries from several threads don't share one connection
+        with self._con.cursor() as cursor:
+            return cursor.execute(sql, params).df()
+
+    def explain(self, *args, **kwargs):
+        """DuckDB's physical plan of ``query(*args, **kwargs)`` (shows the pushed down filters)."""
+        sql, params = self.sql(*args, **kwargs)
+        with self._con.cursor() as cursor:
+            return cursor.execute(f"EXPLAIN {sql}", params).fetchall()[0][1]
+
+    def close(self):
+        self._con.close()
+
+
+if __name__ == "__main__":
+    from .cache import load_stocking_cached
+
+    source = sys.argv[1] if len(sys.argv) > 1 else "../data/fish_stocking_data.csv"
+    _, report = load_stocking_cached(source)
+    stocking = Stocking(report["cache"])
+    args = dict(measure="Number", by=["County"], where={PARTITION_COLUMN: (2010, 2020)}, top=10)
+    print(stocking.sql(**args)[0], "\n")
+    print(stocking.query(**args).to_string(index=False))
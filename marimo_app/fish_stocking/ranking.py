@@ -0,0 +1,127 @@
+"""Top-k / bottom-k selection without sorting the whole table.
+
+Rows are ranked by the ``by`` columns descending with ties broken by row
+position, i.e. the order ``df.sort_values(by, ascending=False, kind="stable")``
+would give (missing values last); the bottom of ``top_bottom`` follows the
+ascending sort, so ties keep row order there too. Only the rows that can
+make the cut are sorted, so picking the extremes of a table with thousands
+of water bodies or sites is linear in its length. ``top_n_per_group`` does the same for the
+leaders inside every group at once.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _ranking_keys(df, by):
+    # numeric keys where a larger key ranks higher, missing values rank last
+    keys = []
+    for column in by:
+        values = df[column].to_numpy(dtype="float64", na_value=np.nan)
+        keys.append(np.where(np.isnan(values), -np.inf, values))
+    return keys
+
+
+def _candidates(primary, k, largest):
+    # every row that could be among the k largest / smallest, ties included
+    n = len(primary)
+    if k >= n:
+        return np.arange(n)
+    if largest:
+        kth = np.partition(primary, n - k)[n - k]
+        return np.flatnonzero(primary >= kth)
+    kth = np.partition(primary, k - 1)[k - 1]
+    return np.flatnonzero(primary <= kth)
+
+
+def _ranked(keys, rows):
+    # order candidate rows by the keys descending, then by position
+    order = np.lexsort([rows] + [-key[rows] for key in reversed(keys)])
+    return rows[order]
+
+
+def top_bottom(df, by, k=10):
+    """Return ``(top, bottom)``: the ``k`` highest rows, highest first, and the ``k`` lowest, lowest first.
+
+    Ties keep row order at both ends, like ``.head(k)`` of the table sorted
+    descending and ascending (``top_k`` either way round).
+    """
+    return top_k(df, by, k), top_k(df, by, k, ascending=True)
+
+
+def top_k(df, by, k=10, ascending=False):
+    """The ``k`` highest rows by ``by`` (or lowest with ``ascending=True``).
+
+    Same rows and order as ``df.sort_values(by, ascending=ascending,
+    kind="stable").head(k)``.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    keys = _ranking_keys(df, by)
+    if ascending:
+        # flip the keys but keep missing values ranked last
+        keys = [np.where(np.isneginf(key), -np.inf, -key) for key in keys]
+    k = max(min(k, len(df)), 0)
+    if k == 0:
+        return df.iloc[:0]
+    return df.take(_ranked(keys, _candidates(keys[0], k, largest=True))[:k])
+
+
+def tail_k(df, by, k=10):
+    """The last ``k`` rows of the ranking, highest first (missing values at the end).
+
+    Same rows and order as ``df.sort_values(by, ascending=False,
+    kind="stable").tail(k)``.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    keys = _ranking_keys(df, by)
+    k = max(min(k, len(df)), 0)
+    if k == 0:
+        return df.iloc[:0]
+    return df.take(_ranked(keys, _candidates(keys[0], k, largest=False))[-k:])
+
+
+def top_n_per_group(df, group, by, n=3):
+    """The ``n`` highest rows by ``by`` within every group of ``group``.
+
+    One sort over (group, value, position) covers all groups, instead of
+    filtering the table once per group. Returns the kept rows ordered by
+    group and rank, with a 1-based ``Rank`` column. Rows with a missing
+    group key are left out.
+    """
+    group = [group] if isinstance(group, str) else list(group)
+    codes = df.groupby(group, observed=True, sort=True).ngroup().to_numpy()
+    rows = np.flatnonzero(codes >= 0)
+    values = _ranking_keys(df, [by])[0]
+
+    order = rows[np.lexsort([rows, -values[rows], codes[rows]])]
+    sorted_codes = codes[order]
+
+    # rank within each group = distance from the start of the group's run
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    run_lengths = np.diff(np.r_[starts, len(order)])
+    rank = np.arange(len(order)) - np.repeat(starts, run_lengths)
+
+    keep = rank < n
+    leaders = df.take(order[keep])
+    leaders["Rank"] = rank[keep] + 1
+    return leaders
+
+
+def format_leaders(leaders, group, label, value, n=3, fill="(-- NONE --)", groups=None, missing="n/a"):
+    """One "label (value), ..." string per group from ``top_n_per_group`` output.
+
+    Groups with fewer than ``n`` leaders are padded with ``fill``; ``groups``
+    adds groups that have no leaders at all. Missing values show as ``missing``.
+    """
+    # a missing value can't go through "{:,}"
+    values = leaders[value].astype(object).map(lambda v: missing if pd.isna(v) else f"{v:,}")
+    text = leaders[label].astype(str) + " (" + values + ")"
+    wide = (
+        pd.DataFrame({group: leaders[group].to_numpy(), "Rank": leaders["Rank"].to_numpy(), "text": text.to_numpy()})
+        .pivot(index=group, columns="Rank", values="text")
+        .reindex(columns=range(1, n + 1))
+    )
+    if groups is not None:
+        wide = wide.reindex(pd.Index(groups, name=group))
+    wide = wide.fillna(fill)
+    return wide[1].str.cat([wide[rank] for rank in range(2, n + 1)], sep=", ")
@@ -0,0 +1,85 @@
+"""Rolling N-year metrics per species / county / water body.
+
+The yearly totals of every group are laid out as one dense groups x years
+matrix (years without stocking are 0) and prefix sums of ``y`` and ``x*y``
+are taken along the years once. Every window's sum and OLS slope is then a
+difference of two prefix sums, so each step costs O(1) whatever the window
+length, instead of refitting every window from scratch.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def yearly_matrix(df, by, value="Number", year="Year"):
+    """``(matrix, years)``: ``by`` x every year from first to last, missing years as 0."""
+    by = [by] if isinstance(by, str) else list(by)
+    matrix = df.groupby(by + [year], observed=True)[value].sum().unstack(year, fill_value=0)
+    years = np.arange(matrix.columns.min(), matrix.columns.max() + 1) if len(matrix.columns) else np.array([])
+    return matrix.reindex(columns=years, fill_value=0), years
+
+
+def _window_sums(prefix, window):
+    # sum over the ``window`` columns ending at each column, NaN until a full window exists
+    sums = np.full(prefix[:, 1:].shape, np.nan)
+    sums[:, window - 1:] = prefix[:, window:] - prefix[:, :-window]
+    return sums
+
+
+def rolling_metrics(df, by, window=5, value="Number", year="Year"):
+    """Moving sum, mean and OLS slope over ``window`` years, plus year over year change.
+
+    One row per group and year; the moving columns are NaN for the first
+    ``window - 1`` years. ``Rolling Slope`` is in fish per year.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    matrix, years = yearly_matrix(df, by, value, year)
+    y = matrix.to_numpy(dtype="int64")
+    x = np.arange(len(years), dtype="int64")
+
+    # prefix sums along the years, exact in int64
+    zeros = np.zeros((len(y), 1), dtype="int64")
+    prefix_y = np.hstack([zeros, np.cumsum(y, axis=1)])
+    prefix_xy = np.hstack([zeros, np.cumsum(y * x, axis=1)])
+    sum_y = _window_sums(prefix_y, window)
+    sum_xy = _window_sums(prefix_xy, window)
+
+    # sum of x and x^2 over a window ending at t only depend on t
+    end = x.astype("float64")
+    sum_x = window * end - window * (window - 1) / 2
+    sum_xx = (
+        window * end**2 - end * window * (window - 1) + (window - 1) * window * (2 * window - 1) / 6
+    )
+    denominator = window * sum_xx - sum_x**2
+    slope = (window * sum_xy - sum_x * sum_y) / denominator if window > 1 else np.full(y.shape, np.nan)
+
+    previous = np.hstack([np.full((len(y), 1), np.nan), y[:, :-1]])
+    change = y - previous
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(previous > 0, change / previous * 100, np.nan)
+
+    labels = matrix.index.to_frame(index=False)
+    out = labels.loc[labels.index.repeat(len(years))].reset_index(drop=True)
+    out[year] = np.tile(years, len(labels))
+    out[value] = y.ravel()
+    out["Rolling Sum"] = sum_y.ravel()
+    out["Rolling Mean"] = sum_y.ravel() / window
+    out["Rolling Slope"] = slope.ravel()
+    out["YoY Change"] = change.ravel()
+    out["YoY Change %"] = pct.ravel()
+    return out
+
+
+def trend_flips(rolling, by):
+    """Years where a group's rolling slope changed sign from the previous year."""
+    by = [by] if isinstance(by, str) else list(by)
+    slope = rolling["Rolling Slope"].to_numpy()
+    previous = np.r_[np.nan, slope[:-1]]
+    same_group = np.r_[False, np.logical_and.reduce([
+        rolling[column].to_numpy()[1:] == rolling[column].to_numpy()[:-1] for column in by
+    ])]
+    # strictly positive to strictly negative or back (NaN compares false)
+    flipped = same_group & (np.sign(slope) * np.sign(previous) < 0)
+    flips = rolling.loc[flipped, by + ["Year", "Rolling Slope"]].reset_index(drop=True)
+    flips.insert(len(by) + 1, "Now", np.where(flips["Rolling Slope"] > 0, "Increasing", "Decreasing"))
+    return flips
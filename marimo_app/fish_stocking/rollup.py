@@ -0,0 +1,99 @@
+"""Shared rollup of the stocking data into the groupings the notebook uses.
+
+``compute_cuboids`` scans the frame once to build a base cuboid at the finest
+grain any requested grouping needs, then rolls every requested grouping up
+from that (much smaller) base instead of re-scanning the full frame.
+"""
+
+import pandas as pd
+
+from .dates import calendar_features
+
+# row count carried by the base cuboid so "count" can be rolled up as a sum
+COUNT_COLUMN = "__rows"
+
+# dimensions computed from another column of the base cuboid when the frame
+# doesn't already carry them (see dates.with_calendar)
+DERIVED_DIMENSIONS = {
+    "Year": ("Date", lambda date: calendar_features(date)["Year"]),
+    "month": ("Date", lambda date: calendar_features(date)["month"]),
+}
+
+
+def _source_columns(dimensions, available):
+    columns = []
+    for dim in dimensions:
+        source = DERIVED_DIMENSIONS[dim][0] if dim in DERIVED_DIMENSIONS and dim not in available else dim
+        if source not in columns:
+            columns.append(source)
+    return columns
+
+
+def build_base(df, dimensions, sum_columns):
+    """Group ``df`` once at the grain of ``dimensions``.
+
+    Missing keys are kept (``dropna=False``) so coarser groupings still see
+    every row; they are dropped again when a grouping is rolled up.
+    """
+    grouped = df.groupby(list(dimensions), observed=True, dropna=False)
+    base = grouped[list(sum_columns)].sum()
+    base[COUNT_COLUMN] = grouped.size()
+    return base.reset_index()
+
+
+def rollup(base, by, measures):
+    """Roll ``base`` up to ``by``.
+
+    ``measures`` maps output column -> (column, how) where ``how`` is one of
+    ``"sum"``, ``"count"`` (number of rows) or ``"nunique"``.
+    """
+    aggregations = {}
+    for output, (column, how) in measures.items():
+        if how == "sum":
+            aggregations[output] = (column, "sum")
+        elif how == "count":
+            aggregations[output] = (COUNT_COLUMN, "sum")
+        elif how == "nunique":
+            aggregations[output] = (column, "nunique")
+        else:
+            raise ValueError(f"unknown aggregation {how!r} for {output!r}")
+    return base.groupby(list(by), observed=True).agg(**aggregations).reset_index()
+
+
+def _grain(specs):
+    # every dimension a grouping (or a nunique measure) needs, and the columns to sum
+    dimensions, sum_columns = [], []
+    for dims, measures in specs.values():
+        for dim in list(dims) + [col for col, how in measures.values() if how == "nunique"]:
+            if dim not in dimensions:
+                dimensions.append(dim)
+        for column, how in measures.values():
+            if how == "sum" and column not in sum_columns:
+                sum_columns.append(column)
+    return dimensions, sum_columns
+
+
+def base_grain(specs, columns):
+    """``(dimensions, sum_columns)`` of the base cuboid ``specs`` need, for a frame with ``columns``."""
+    dimensions, sum_columns = _grain(specs)
+    return _source_columns(dimensions, columns), sum_columns
+
+
+def rollup_base(base, specs):
+    """Every grouping in ``specs`` rolled up from a base cuboid (see ``build_base``)."""
+    for dim in _grain(specs)[0]:
+        if dim in DERIVED_DIMENSIONS and dim not in base:
+            source, derive = DERIVED_DIMENSIONS[dim]
+            base[dim] = derive(base[source])
+    return {name: rollup(base, dims, measures) for name, (dims, measures) in specs.items()}
+
+
+def compute_cuboids(df, specs):
+    """Compute every grouping in ``specs`` from a single pass over ``df``.
+
+    ``specs`` maps a name to ``(dimensions, measures)`` as taken by ``rollup``,
+    e.g. ``{"county": (["County"], {"total_stocked": ("Number", "sum")})}``.
+    Derived dimensions (``Year``, ``month``) are taken from ``df`` when it has
+    them and otherwise computed from Date on the base cuboid.
+    """
+    return rollup_base(build_base(df, *base_grain(specs, df.columns)), specs)
@@ -0,0 +1,488 @@
+"""Serve the summary tables over HTTP, for dashboards that poll the same aggregates.
+
+Run from the ``marimo_app`` folder::
+
+    python -m fish_stocking.serve ../data/fish_stocking_data.csv --port 8050
+    curl 'localhost:8050/tables/county_stocked?year_from=2010&year_to=2020'
+    curl 'localhost:8050/tables/trend_df?format=arrow' > trend_df.arrow
+    python -m fish_stocking.serve ../data/fish_stocking_data.csv --bench
+
+Every table is computed through the query layer (``query.Stocking``) and
+can be narrowed with ``year_from`` / ``year_to`` / ``species`` / ``county``
+(the last two may repeat). Responses are JSON records, or an Arrow IPC
+stream with ``format=arrow`` or an ``Accept: application/vnd.apache.arrow.stream``
+header.
+
+Encoded responses are kept in an in-process LRU cache whose entries expire
+after ``--ttl`` seconds; identical requests arriving while one is being
+computed wait for that one instead of computing it again. Each response has
+an ``ETag`` (a hash of the body), so a dashboard sending it back in
+``If-None-Match`` gets an empty 304 when nothing changed.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from . import pipeline
+from .cache import load_stocking_cached
+from .query import Stocking
+from .validation import validate
+
+TABLES = ("species_stats", "yearly_totals", "trend_df", "county_stocked", "monthly_stocked", "waterbody_efforts")
+
+JSON_TYPE = "application/json"
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+
+# query string filter -> column, the list ones may be given more than once
+LIST_FILTERS = {"species": "Species", "county": "County"}
+
+STATUS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+          405: "Method Not Allowed", 500: "Internal Server Error"}
+
+# for requests too malformed to route, the connection is closed after it
+BAD_REQUEST = b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+
+
+class ResultCache:
+    """LRU cache of at most ``max_entries`` values, each dropped ``ttl`` seconds after it was computed.
+
+    ``get`` coalesces: while a key is being computed, other callers of the
+    same key wait for that computation. Failures aren't cached.
+    """
+
+    def __init__(self, max_entries=256, ttl=60.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self._pending = {}  # key -> task computing it
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _store(self, key):
+        def store(task):
+            if task.cancelled() or task.exception() is not None:
+                return
+            self._entries[key] = (self.clock() + self.ttl, task.result())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return store
+
+    async def get(self, key, compute):
+        """The cached value of ``key``, or ``await compute()`` (once for all concurrent callers)."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+
+        task = self._pending.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+            if self.ttl > 0 and self.max_entries > 0:
+                task.add_done_callback(self._store(key))
+        # a caller going away doesn't cancel the computation the others wait on
+        return await asyncio.shield(task)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+
+def _year(value):
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"years are whole numbers, got {value!r}") from None
+
+
+def parse_filters(params):
+    """``where`` for ``Stocking.query`` from the parsed query string; ValueError when malformed."""
+    where = {}
+    year_from, year_to = params.get("year_from", [None])[-1], params.get("year_to", [None])[-1]
+    if year_from is not None or year_to is not None:
+        where["Year"] = (_year(year_from), _year(year_to))
+    for name, column in LIST_FILTERS.items():
+        if name in params:
+            where[column] = sorted(set(params[name]))
+    return where
+
+
+class StockingTables:
+    """Computes the served tables from the Parquet cache of ``source``.
+
+    The source csv is re-checked (size and mtime) on every computation and
+    the cache reloaded when it changed, so results are never staler than the
+    result cache's ttl. Rows quarantined by ``validation.validate`` are left out.
+
+    One thread reloads while the others keep computing on the previous data,
+    which is closed once the last computation using it is done.
+    """
+
+    def __init__(self, source, cache_dir=None):
+        self.source = source
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._signature = None
+        self._stocking = None
+        # computations running on each Stocking
+        self._users = {}
+
+    def refresh(self):
+        """Reload the cache when the source changed since the last load."""
+        stat = os.stat(self.source)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if signature == self._signature:
+            return
+        # only the first load has nothing to serve in the meantime
+        if not self._reload_lock.acquire(blocking=self._stocking is None):
+            return
+        try:
+            if signature == self._signature:
+                return
+            df, report = load_stocking_cached(self.source, self.cache_dir)
+            _, quarantine, _, _ = validate(df)
+            stocking = Stocking(report["cache"], exclude_rows=quarantine.index)
+            with self._lock:
+                previous, self._stocking, self._signature = self._stocking, stocking, signature
+                idle = previous is not None and previous not in self._users
+            if idle:
+                previous.close()
+        finally:
+            self._reload_lock.release()
+
+    @contextmanager
+    def stocking(self):
+        """The current ``query.Stocking``, kept open until the block ends."""
+        self.refresh()
+        with self._lock:
+            stocking = self._stocking
+            self._users[stocking] = self._users.get(stocking, 0) + 1
+        try:
+            yield stocking
+        finally:
+            with self._lock:
+                self._users[stocking] -= 1
+                # no entry for a Stocking nothing runs on, current or not
+                if not self._users[stocking]:
+                    del self._users[stocking]
+                done = stocking not in self._users and stocking is not self._stocking
+            # the last computation on data that was reloaded meanwhile
+            if done:
+                stocking.close()
+
+    def compute(self, name, where=None):
+        """The ``name`` table (one of ``TABLES``) over the rows matching ``where``."""
+        with self.stocking() as stocking:
+            return self._compute(stocking, name, where)
+
+    def _compute(self, stocking, name, where):
+        if name == "county_stocked":
+            return stocking.query({"total_stocked": ("Number", "sum")}, by="County", where=where)
+        if name == "monthly_stocked":
+            return stocking.query({"total_stocked": ("Number", "sum")}, by="month", where=where)
+        if name == "waterbody_efforts":
+            return stocking.query({"Stocking Efforts": ("Number", "count")}, by="Water Body", where=where)
+
+        yearly_species = stocking.query("Number", by=["Year", "Species"], where=where)
+        if name == "trend_df":
+            return pipeline.trend_tables(yearly_species)["trend_df"]
+        if name in ("species_stats", "yearly_totals"):
+            return pipeline.species_tables(yearly_species)[name]
+        raise KeyError(name)
+
+
+def encode(df, fmt):
+    """``df`` as JSON records or an Arrow IPC stream; a named index becomes a column."""
+    if df.index.name is not None:
+        df = df.reset_index()
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    return df.to_json(orient="records", date_format="iso").encode()
+
+
+def etag(body):
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _json(status, value, **headers):
+    return status, {"Content-Type": JSON_TYPE, **headers}, json.dumps(value).encode()
+
+
+class StockingService:
+    """The HTTP side: routing, the result cache and conditional responses.
+
+    ``GET /`` lists the tables, ``GET /tables/<name>`` serves one and
+    ``GET /stats`` shows the cache counters.
+    """
+
+    def __init__(self, tables, cache=None):
+        self.tables = tables
+        self.cache = cache if cache is not None else ResultCache()
+
+    def _build(self, name, where, fmt):
+        # runs in a worker thread: compute, encode and tag in one go so the cache keeps the bytes
+        body = encode(self.tables.compute(name, where), fmt)
+        return etag(body), body
+
+    async def respond(self, method, target, headers):
+        """``(status, headers, body)`` for a request."""
+        if method not in ("GET", "HEAD"):
+            return _json(405, {"error": f"{method} not allowed"}, Allow="GET, HEAD")
+        url = urlsplit(target)
+        params = parse_qs(url.query)
+        if url.path == "/":
+            return _json(200, {"tables": [f"/tables/{name}" for name in TABLES]})
+        if url.path == "/stats":
+            return _json(200, self.cache.stats())
+
+        name = url.path.removeprefix("/tables/")
+        if not url.path.startswith("/tables/") or name not in TABLES:
+            return _json(404, {"error": f"no table at {url.path}", "tables": list(TABLES)})
+        try:
+            where = parse_filters(params)
+        except ValueError as e:
+            return _json(400, {"error": str(e)})
+        fmt = params.get("format", ["arrow" if ARROW_TYPE in headers.get("accept", "") else "json"])[-1]
+        if fmt not in ("json", "arrow"):
+            return _json(400, {"error": f"format must be json or arrow, got {fmt!r}"})
+
+        key = (name, fmt, tuple((column, tuple(v) if isinstance(v, list) else v) for column, v in where.items()))
+        loop = asyncio.get_running_loop()
+        try:
+            tag, body = await self.cache.get(key, lambda: loop.run_in_executor(None, self._build, name, where, fmt))
+        except Exception as e:
+            return _json(500, {"error": f"{type(e).__name__}: {e}"})
+
+        response_headers = {
+            "Content-Type": ARROW_TYPE if fmt == "arrow" else JSON_TYPE,
+            "ETag": tag,
+            "Cache-Control": f"max-age={int(self.cache.ttl)}",
+        }
+        matches = [value.strip() for value in headers.get("if-none-match", "").split(",")]
+        if tag in matches or "*" in matches:
+            return 304, response_headers, b""
+        return 200, response_headers, body
+
+    async def handle(self, reader, writer):
+        """One connection: HTTP/1.1 requests, kept alive until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    writer.write(BAD_REQUEST)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    field, _, value = line.decode("latin-1").partition(":")
+                    headers[field.strip().lower()] = value.strip()
+                # nothing reads a request body, but it has to be skipped to find the next request
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    writer.write(BAD_REQUEST)
+                    break
+                if length:
+                    await reader.readexactly(length)
+
+                status, response_headers, body = await self.respond(method, target, headers)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                response_headers["Content-Length"] = str(len(body)) if status != 304 else None
+                response_headers["Connection"] = "keep-alive" if keep_alive else "close"
+                head = f"HTTP/1.1 {status} {STATUS[status]}\r\n" + "".join(
+                    f"{field}: {value}\r\n" for field, value in response_headers.items() if value is not None
+                )
+                writer.write(head.encode("latin-1") + b"\r\n")
+                if method != "HEAD":
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8050):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def _fetch(reader, writer, path, headers=None):
+    # one GET on a kept alive connection -> (status, response headers)
+    request = f"GET {path} HTTP/1.1\r\nHost: bench\r\n" + "".join(
+        f"{field}: {value}\r\n" for field, value in (headers or {}).items()
+    )
+    writer.write(request.encode() + b"\r\n")
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        field, _, value = line.decode("latin-1").partition(":")
+        response_headers[field.strip().lower()] = value.strip()
+    await reader.readexactly(int(response_headers.get("content-length", 0)))
+    return status, response_headers
+
+
+async def load_test(host, port, paths, requests=1000, concurrency=16, conditional=False):
+    """Latency percentiles and throughput of ``requests`` GETs over ``concurrency`` connections.
+
+    The paths are requested round robin; with ``conditional`` every request
+    sends back the ETag the connection last saw for its path.
+    """
+    latencies, statuses = [], []
+    counter = iter(range(requests))
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        tags = {}
+        try:
+            for i in counter:
+                path = paths[i % len(paths)]
+                headers = {"If-None-Match": tags[path]} if conditional and path in tags else None
+                start = time.perf_counter()
+                status, response_headers = await _fetch(reader, writer, path, headers)
+                latencies.append(time.perf_counter() - start)
+                statuses.append(status)
+                if "etag" in response_headers:
+                    tags[path] = response_headers["etag"]
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000
+    return {
+        "Requests": len(latencies),
+        "Req/s": len(latencies) / elapsed,
+        "Mean ms": latencies.mean(),
+        "p50 ms": np.percentile(latencies, 50),
+        "p95 ms": np.percentile(latencies, 95),
+        "p99 ms": np.percentile(latencies, 99),
+        "304s": statuses.count(304),
+    }
+
+
+async def benchmark(source, requests=1000, concurrency=16, ttl=60.0, max_entries=256):
+    """Run the load generator against an in-process server through each cache scenario.
+
+    Client and server share one event loop (and process), so the numbers
+    are a lower bound on what a separate client would see.
+    """
+    tables = StockingTables(source)
+    tables.refresh()
+    paths = [f"/tables/{name}" for name in TABLES]
+    filtered = [f"{path}?year_from=2010&year_to=2020" for path in paths]
+    scenarios = [
+        # without a cache every request is computed, so fewer of them
+        ("no result cache, only coalescing", 0, paths, {"requests": max(requests // 20, len(paths)), "concurrency": concurrency}),
+        ("cold, identical requests coalesced", ttl, filtered[:1], {"requests": concurrency, "concurrency": concurrency}),
+        ("warm json", ttl, paths, {"requests": requests, "concurrency": concurrency}),
+        ("warm arrow", ttl, [f"{path}?format=arrow" for path in paths], {"requests": requests, "concurrency": concurrency}),
+        ("warm conditional (ETag)", ttl, paths, {"requests": requests, "concurrency": concurrency, "conditional": True}),
+    ]
+
+    rows = []
+    for name, scenario_ttl, scenario_paths, options in scenarios:
+        service = StockingService(tables, ResultCache(max_entries, scenario_ttl))
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        if name.startswith("warm"):
+            await load_test("127.0.0.1", port, scenario_paths, len(scenario_paths), 1)
+        result = await load_test("127.0.0.1", port, scenario_paths, **options)
+        server.close()
+        await server.wait_closed()
+        stats = service.cache.stats()
+        rows.append({"Scenario": name, **result, "Computed": stats["misses"], "Coalesced": stats["coalesced"]})
+    return pd.DataFrame(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fish_stocking.serve", description=__doc__.splitlines()[0])
+    parser.add_argument("source", nargs="?", default="../data/fish_stocking_data.csv",
+                        help="MDNR stocking csv export (default: %(default)s)")
+    parser.add_argument("--host", default="127.0.0.1", help="(default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8050, help="(default: %(default)s)")
+    parser.add_argument("--ttl", type=float, default=60.0,
+                        help="seconds a computed table is served from the cache (default: %(default)s)")
+    parser.add_argument("--max-entries", type=int, default=256,
+                        help="most responses kept in the cache (default: %(default)s)")
+    parser.add_argument("--bench", action="store_true",
+                        help="benchmark latency & throughput with a local load generator instead of serving")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per --bench scenario (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=32, help="--bench client connections (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    service = StockingService(StockingTables(args.source), ResultCache(args.max_entries, args.ttl))
+    # load (or build) the parquet cache before taking requests
+    service.tables.refresh()
+    server = await service.start(args.host, args.port)
+    print(f"serving {', '.join(TABLES)} on http://{args.host}:{args.port}/tables/", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.bench:
+        from tabulate import tabulate
+
+        table = asyncio.run(benchmark(args.source, args.requests, args.concurrency, args.ttl, args.max_entries))
+        print(tabulate(table, headers="keys", showindex=False, floatfmt=".2f"))
+        return 0
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
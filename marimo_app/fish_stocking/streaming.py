@@ -0,0 +1,61 @@
+"""Streaming aggregation for exports that don't fit in memory.
+
+The csv is read in bounded chunks through a generator pipeline
+(parse -> clean -> partial aggregate) and the partial sums, counts and
+Date x Species keys (which carry the distinct years per species) are merged
+as they arrive. Only one chunk plus the running aggregates are held at once.
+
+Run ``python -m fish_stocking.streaming path/to/fish_stocking_data.csv 256``
+to aggregate with a 256 MB ceiling for the chunks.
+"""
+
+import sys
+from functools import reduce
+
+from .incremental import derived_views, merge_aggregates, partial_aggregates
+from .loader import iter_stocking_csv
+
+PROBE_ROWS = 10_000
+
+# parsing a chunk needs a few times the memory of the finished chunk
+PARSE_OVERHEAD = 4
+
+
+def chunk_rows_for_budget(path, max_memory_mb, probe_rows=PROBE_ROWS):
+    """How many rows fit in ``max_memory_mb``, estimated from the first rows."""
+    probe = next(iter_stocking_csv(path, chunksize=probe_rows), None)
+    if probe is None or probe.empty:
+        return probe_rows
+    bytes_per_row = probe.memory_usage(deep=True).sum() / len(probe)
+    return max(int(max_memory_mb * 1_000_000 / (bytes_per_row * PARSE_OVERHEAD)), 1_000)
+
+
+def stream_aggregates(path, max_memory_mb=256, chunksize=None):
+    """Aggregate the csv chunk by chunk into the additive aggregates.
+
+    ``chunksize`` overrides the row count derived from ``max_memory_mb``.
+    Returns the same dict as ``incremental.merge_aggregates``, or None for an
+    empty file.
+    """
+    if chunksize is None:
+        chunksize = chunk_rows_for_budget(path, max_memory_mb)
+
+    chunks = iter_stocking_csv(path, chunksize=chunksize)
+    partials = (partial_aggregates(chunk) for chunk in chunks)
+    return reduce(merge_aggregates, partials, None)
+
+
+def stream_views(path, max_memory_mb=256, chunksize=None):
+    """``species_stats``, ``yearly_totals``, ``county_stocked``, ``monthly_stocked``,
+    ``waterbody_efforts`` (and the top/bottom 10s) computed by streaming."""
+    aggregates = stream_aggregates(path, max_memory_mb=max_memory_mb, chunksize=chunksize)
+    return derived_views(aggregates)
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "../data/fish_stocking_data.csv"
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 256
+    print(f"chunks of {chunk_rows_for_budget(source, budget):,} rows for {budget:g} MB")
+    views = stream_views(source, max_memory_mb=budget)
+    print(views["species_stats"].sort_values("Total Fish Stocked", ascending=False).head(10))
+    print(views["yearly_totals"])
@@ -0,0 +1,188 @@
+"""Synthetic MDNR stocking exports, for benchmarking at sizes the real data never reaches.
+
+The columns, date layout and distributions follow the real export: rows per
+species (Brown/Rainbow trout and Walleye are most of the plants), fish per
+plant (Walleye fry are half of all fish stocked), the April-June peak, a
+long tail of water bodies and a few percent of missing Water Body/Strain.
+
+Run ``python -m fish_stocking.synthetic 1000000 synthetic.csv`` to write one.
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+# species: (share of rows, median fish per plant, log-spread of fish per plant, median length, strains)
+SPECIES = {
+    "Brown trout": (0.2946, 1500, 1.0, 5.9, ("Wild Rose", "Gilchrist Creek", "Sturgeon River", "Seeforellen")),
+    "Rainbow trout": (0.1940, 5000, 1.0, 7.2, ("Eagle Lake", "Michigan", "Shasta", "Arlee")),
+    "Walleye": (0.1484, 12900, 1.9, 1.7, ("Muskegon", "Bay De Noc", "St. Marys River")),
+    "Brook trout": (0.1273, 600, 1.0, 6.4, ("Assinica", "Jumbo River", "Iron River")),
+    "Lake trout": (0.0713, 33700, 1.0, 6.3, ("Seneca Lake", "Lewis Lake", "Apostle/Gull Is")),
+    "Splake": (0.0287, 6900, 1.0, 7.7, ("Hybrid",)),
+    "Chinook salmon": (0.0254, 76500, 1.0, 3.5, ("Michigan",)),
+    "Coho salmon": (0.0229, 44700, 1.0, 5.5, ("Michigan", "Hinchinbrooke")),
+    "Lake sturgeon": (0.0139, 120, 1.0, 6.4, ("Black Lake", "Sturgeon-Baraga", "Saint Clair")),
+    "Muskellunge": (0.0137, 750, 1.0, 9.5, ("Great Lakes", "Northern", "Iowa")),
+    "Channel catfish": (0.0093, 2500, 1.0, 7.8, ()),
+    "Yellow Perch": (0.0077, 650, 1.0, 5.0, ()),
+    "Atlantic salmon": (0.0065, 15000, 1.0, 6.6, ("Landlocked",)),
+    "Bluegill": (0.0052, 525, 1.0, 5.0, ()),
+    "Fathead minnow": (0.0051, 20000, 1.0, 2.0, ()),
+    "Northern pike": (0.0050, 440, 1.0, 4.7, ()),
+    "Black crappie": (0.0047, 400, 1.0, 5.0, ()),
+    "Hybrid Sunfish": (0.0046, 750, 1.0, 5.0, ("Hybrid",)),
+    "Largemouth bass": (0.0032, 200, 1.0, 6.2, ()),
+    "Redear sunfish": (0.0024, 740, 1.0, 3.9, ()),
+    "Lake herring": (0.0023, 3300, 1.0, 4.3, ()),
+    "Smallmouth bass": (0.0014, 200, 1.0, 6.0, ()),
+    "Lake whitefish": (0.0009, 14000, 1.0, 2.6, ()),
+    "Golden shiner": (0.0007, 8000, 1.0, 2.5, ()),
+    "Arctic grayling": (0.0002, 200, 1.0, 11.0, ("Chena River",)),
+    "Pumpkinseed": (0.0002, 420, 1.0, 3.4, ()),
+    "Tiger muskellunge": (0.0001, 100, 1.0, 12.0, ("Hybrid",)),
+    "White sucker": (0.0001, 510, 1.0, 19.8, ()),
+    "Emerald shiner": (0.00003, 14400, 1.0, 1.5, ()),
+    "Flathead catfish": (0.00003, 3, 1.0, 6.4, ()),
+    "Rainbow smelt": (0.00003, 125000, 1.0, 0.0, ()),
+}
+
+COUNTIES = (
+    "Alcona", "Alger", "Allegan", "Alpena", "Antrim", "Arenac", "Baraga", "Barry", "Bay", "Benzie",
+    "Berrien", "Branch", "Calhoun", "Cass", "Charlevoix", "Cheboygan", "Chippewa", "Clare", "Clinton",
+    "Crawford", "Delta", "Dickinson", "Eaton", "Emmet", "Genesee", "Gladwin", "Gogebic", "Grand Traverse",
+    "Gratiot", "Hillsdale", "Houghton", "Huron", "Ingham", "Ionia", "Iosco", "Iron", "Isabella", "Jackson",
+    "Kalamazoo", "Kalkaska", "Kent", "Keweenaw", "Lake", "Lapeer", "Leelanau", "Lenawee", "Livingston",
+    "Luce", "Mackinac", "Macomb", "Manistee", "Marquette", "Mason", "Mecosta", "Menominee", "Midland",
+    "Missaukee", "Monroe", "Montcalm", "Montmorency", "Muskegon", "Newaygo", "Oakland", "Oceana", "Ogemaw",
+    "Ontonagon", "Osceola", "Oscoda", "Otsego", "Ottawa", "Presque Isle", "Roscommon", "Saginaw",
+    "Saint Clair", "Saint Joseph", "Sanilac", "Schoolcraft", "Shiawassee", "Tuscola", "Van Buren",
+    "Washtenaw", "Wayne", "Wexford",
+)
+
+# share of plants per month, January first
+MONTH_SHARE = (0.002, 0.001, 0.041, 0.349, 0.282, 0.137, 0.028, 0.009, 0.023, 0.084, 0.039, 0.005)
+
+OPERATIONS = ("State Plant", "Private Plant (under permit)", "Federal Plant", "Marsh & Rearing Pond Release", "Tribal Plant")
+OPERATION_SHARE = (0.76, 0.09, 0.06, 0.05, 0.04)
+
+MARKS = ("none", "oxytetracycline", "adipose, coded wire tag", "right pectoral clip", "adipose clip")
+MARK_SHARE = (0.78, 0.07, 0.05, 0.05, 0.05)
+
+# columns in export order (Range, Section & Town are in the export, the loader skips them)
+COLUMNS = (
+    "County", "Water Body", "Site Name", "Town", "Range", "Section", "Species", "Strain",
+    "Date", "Number", "Avg. Length", "Operation", "Fin Clips, Marks, Tags",
+)
+
+FIRST_YEAR, LAST_YEAR = 2000, 2025
+
+MAX_NUMBER = 6_000_000
+
+
+def default_water_bodies(rows):
+    # the real export has ~2.2k water bodies for ~33k rows; grow slowly with size
+    return int(min(200_000, max(500, 60 * np.sqrt(rows))))
+
+
+def _weights(shares):
+    shares = np.asarray(shares, dtype="float64")
+    return shares / shares.sum()
+
+
+class Generator:
+    """Draws synthetic export rows; the water body/site layout is fixed per seed."""
+
+    def __init__(self, water_bodies=2000, seed=0):
+        rng = np.random.default_rng(seed)
+        self.seed = seed
+
+        # water bodies get a zipf-ish popularity, a home county & a couple of sites each
+        self.water_bodies = np.array([f"Water Body {i:06d}" for i in range(water_bodies)], dtype=object)
+        self.water_body_weight = _weights(1.0 / np.arange(1, water_bodies + 1) ** 0.8)
+        self.water_body_county = rng.integers(0, len(COUNTIES), water_bodies)
+        self.sites_per_water_body = rng.integers(1, 4, water_bodies)
+        self.sites = np.array([f"SITE-{i:06d}-{j}" for i in range(water_bodies) for j in range(3)], dtype=object)
+        self.towns = np.array([f"{n:02d}N" for n in range(1, 60)], dtype=object)
+
+        self.species = np.array(list(SPECIES), dtype=object)
+        self.species_weight = _weights([spec[0] for spec in SPECIES.values()])
+        self.log_median = np.log([spec[1] for spec in SPECIES.values()])
+        self.log_spread = np.array([spec[2] for spec in SPECIES.values()])
+        self.median_length = np.array([spec[3] for spec in SPECIES.values()])
+
+        # strains as one flat table, indexed by (species offset + draw)
+        strains = [spec[4] for spec in SPECIES.values()]
+        self.strain_offset = np.cumsum([0] + [len(s) for s in strains[:-1]])
+        self.strain_count = np.array([len(s) for s in strains])
+        self.strains = np.array([s for group in strains for s in group] + [None], dtype=object)
+
+        # the export's date layout, formatted once per calendar day
+        self.days = pd.date_range(f"{FIRST_YEAR}-01-01", f"{LAST_YEAR}-12-31", freq="D")
+        self.day_text = np.array([f"{d.month}/{d.day}/{d.year} 12:00:00 AM" for d in self.days], dtype=object)
+        day_month = self.days.month.to_numpy() - 1
+        month_days = np.bincount(day_month, minlength=12)
+        # later years plant a bit less, like the real export
+        year_weight = np.linspace(1.15, 0.85, LAST_YEAR - FIRST_YEAR + 1)[self.days.year - FIRST_YEAR]
+        self.day_weight = _weights(np.asarray(MONTH_SHARE)[day_month] / month_days[day_month] * year_weight)
+
+    def frame(self, rows, rng):
+        """``rows`` synthetic rows as strings/numbers, shaped like the raw csv."""
+        species = rng.choice(len(self.species), rows, p=self.species_weight)
+        water_body = rng.choice(len(self.water_bodies), rows, p=self.water_body_weight)
+        site = rng.integers(0, 3, rows) % self.sites_per_water_body[water_body]
+        day = rng.choice(len(self.days), rows, p=self.day_weight)
+
+        number = np.exp(self.log_median[species] + self.log_spread[species] * rng.standard_normal(rows))
+        # the biggest real plant is 5.5M walleye fry
+        number = np.clip(number.round(), 1, MAX_NUMBER).astype("int64")
+        # the export has the odd negative correction
+        corrections = rng.random(rows) < 1e-4
+        number[corrections] = -number[corrections]
+
+        length = np.maximum(self.median_length[species] * rng.lognormal(0.0, 0.25, rows), 0).round(2)
+
+        strain_count = self.strain_count[species]
+        strain = np.where(
+            (strain_count > 0) & (rng.random(rows) > 0.03),
+            self.strain_offset[species] + rng.integers(0, 1 << 30, rows) % np.maximum(strain_count, 1),
+            len(self.strains) - 1,
+        )
+
+        water_body_name = self.water_bodies[water_body]
+        water_body_name[rng.random(rows) < 0.037] = None
+
+        return pd.DataFrame({
+            "County": np.asarray(COUNTIES, dtype=object)[self.water_body_county[water_body]],
+            "Water Body": water_body_name,
+            "Site Name": self.sites[water_body * 3 + site],
+            "Town": self.towns[water_body % len(self.towns)],
+            "Range": (water_body % 30 + 1).astype(str),
+            "Section": (water_body % 36 + 1),
+            "Species": self.species[species],
+            "Strain": self.strains[strain],
+            "Date": self.day_text[day],
+            "Number": number,
+            "Avg. Length": length,
+            "Operation": np.asarray(OPERATIONS, dtype=object)[rng.choice(len(OPERATIONS), rows, p=_weights(OPERATION_SHARE))],
+            "Fin Clips, Marks, Tags": np.asarray(MARKS, dtype=object)[rng.choice(len(MARKS), rows, p=_weights(MARK_SHARE))],
+        }, columns=list(COLUMNS))
+
+    def chunks(self, rows, chunk_rows=1_000_000):
+        """Yield ``rows`` rows in frames of at most ``chunk_rows``."""
+        rng = np.random.default_rng([self.seed, rows])
+        for start in range(0, rows, chunk_rows):
+            yield self.frame(min(chunk_rows, rows - start), rng)
+
+
+def write_synthetic_csv(path, rows, seed=0, chunk_rows=1_000_000, water_bodies=None):
+    """Write a ``rows``-row synthetic export to ``path`` in constant memory."""
+    generator = Generator(water_bodies or default_water_bodies(rows), seed)
+    for i, chunk in enumerate(generator.chunks(rows, chunk_rows)):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    write_synthetic_csv(sys.argv[2], int(float(sys.argv[1])))
@@ -0,0 +1,216 @@
+"""Per-stage timing, CPU, row and memory trace of an analysis run.
+
+Wrap each stage in ``trace.stage(name)``::
+
+    trace = Trace(profile=["trend_fit"])
+    with trace.stage("load") as stage:
+        df_raw = load_stocking_csv(path)
+        stage["rows_out"] = len(df_raw)
+
+``trace.table()`` is the trace as a frame, ``trace.write_chrome_trace(path)``
+writes it for chrome://tracing / Perfetto, and stages named in ``profile``
+are sampled by a small stack sampler (``trace.write_profile(name, path)``
+writes the folded stacks for speedscope or flamegraph.pl).
+
+Per-stage peaks come from resetting the kernel's RSS high-water mark at
+the start of each stage, which also resets what ``getrusage`` reports, so
+the peak seen before every reset is kept and ``process_peak_mb`` (or
+``trace.peak_mb()``) gives the peak of the whole process.
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+
+def _status_mb(field):
+    match = re.search(rf"{field}:\s+(\d+) kB", Path("/proc/self/status").read_text())
+    return int(match.group(1)) / 1024
+
+
+# the highest peak cleared by reset_peak
+_cleared_peak_mb = 0.0
+
+
+def reset_peak():
+    """Reset the peak RSS to the current RSS; False where that isn't possible (non linux)."""
+    global _cleared_peak_mb
+    before = peak_mb()
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+    except OSError:
+        return False
+    _cleared_peak_mb = max(_cleared_peak_mb, before)
+    return True
+
+
+def peak_mb():
+    """Peak RSS in MB, NaN where neither /proc nor ``resource`` are there (windows)."""
+    try:
+        return _status_mb("VmHWM")
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return float("nan")
+    # no /proc: the process wide peak, which only ever grows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1_000_000 if sys.platform == "darwin" else peak / 1_000
+
+
+def process_peak_mb():
+    """Peak RSS of the process so far in MB, including what ``reset_peak`` cleared."""
+    # peak_mb first, so a NaN (nothing to read) stays NaN
+    return max(peak_mb(), _cleared_peak_mb)
+
+
+def rss_mb():
+    try:
+        return _status_mb("VmRSS")
+    except OSError:
+        return peak_mb()
+
+
+class StackSampler:
+    """Samples one thread's python stack every ``interval`` seconds from a background thread."""
+
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+class Trace:
+    """Structured record of the stages of one run.
+
+    ``profile`` names the stages to run under the stack sampler.
+    """
+
+    def __init__(self, profile=()):
+        self.profile = set(profile)
+        self.events = []
+        self.origin = time.perf_counter()
+        self._open = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Time the block; set ``rows_out`` (or ``rows_in``) on the yielded dict."""
+        # peaks are reset per stage, so fold the current peak into enclosing stages first
+        current_peak = peak_mb()
+        for parent in self._open:
+            parent["peak_mb"] = max(parent["peak_mb"], current_peak)
+        reset_peak()
+
+        event = {"name": name, "rows_in": rows_in, "rows_out": None, "depth": len(self._open)}
+        before = rss_mb()
+        event["peak_mb"] = before
+        sampler = StackSampler().start() if name in self.profile else None
+        self._open.append(event)
+        start, cpu_start = time.perf_counter(), time.process_time()
+        event["start_s"] = start - self.origin
+        try:
+            yield event
+        finally:
+            event["wall_s"] = time.perf_counter() - start
+            event["cpu_s"] = time.process_time() - cpu_start
+            self._open.pop()
+            if sampler is not None:
+                event["profile"] = sampler.stop()
+            event["peak_mb"] = max(event["peak_mb"], peak_mb())
+            event["rss_delta_mb"] = rss_mb() - before
+            event["peak_delta_mb"] = event["peak_mb"] - before
+            for parent in self._open:
+                parent["peak_mb"] = max(parent["peak_mb"], event["peak_mb"])
+
+            # a re-run stage (e.g. a re-executed notebook cell) replaces its earlier record
+            self.events = [e for e in self.events if e["name"] != name] + [event]
+
+    def peak_mb(self):
+        """Peak RSS of the whole run (the process) in MB, NaN where it can't be read."""
+        return process_peak_mb()
+
+    def __contains__(self, name):
+        return any(e["name"] == name for e in self.events)
+
+    def __getitem__(self, name):
+        for event in self.events:
+            if event["name"] == name:
+                return event
+        known = ", ".join(e["name"] for e in self.events) or "none"
+        raise KeyError(f"no stage {name!r} in the trace (stages: {known})")
+
+    def table(self):
+        """One row per stage in the order they started."""
+        events = sorted(self.events, key=lambda e: e["start_s"])
+        return pd.DataFrame({
+            "Stage": ["  " * e["depth"] + e["name"] for e in events],
+            "Wall s": [e["wall_s"] for e in events],
+            "CPU s": [e["cpu_s"] for e in events],
+            "Rows In": pd.array([e["rows_in"] for e in events], dtype="Int64"),
+            "Rows Out": pd.array([e["rows_out"] for e in events], dtype="Int64"),
+            "Memory Delta MB": [e["rss_delta_mb"] for e in events],
+            "Peak Delta MB": [e["peak_delta_mb"] for e in events],
+        })
+
+    def chrome_trace(self):
+        """The trace in Chrome's trace event format (complete "X" events, microseconds)."""
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": e["name"],
+                    "ph": "X",
+                    "ts": e["start_s"] * 1e6,
+                    "dur": e["wall_s"] * 1e6,
+                    "pid": pid,
+                    "tid": 0,
+                    "args": {
+                        key: e[key]
+                        for key in ("cpu_s", "rows_in", "rows_out", "rss_delta_mb", "peak_delta_mb", "peak_mb")
+                    },
+                }
+                for e in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def write_chrome_trace(self, path):
+        Path(path).write_text(json.dumps(self.chrome_trace()))
+        return path
+
+    def write_profile(self, name, path):
+        """Folded stacks ("frame;frame;frame count" lines) sampled during stage ``name``."""
+        stacks = self[name].get("profile") or {}
+        Path(path).write_text("".join(f"{stack} {count}\n" for stack, count in stacks.items()))
+        return path
@@ -0,0 +1,200 @@
+"""Data quality rules for the stocking data, checked in bulk.
+
+Rules are declared as ``name -> (check, column(s), options)``::
+
+    RULES = {
+        "number_non_negative": ("non_negative", "Number", {}),
+        "known_county": ("known", "County", {"values": MICHIGAN_COUNTIES}),
+    }
+
+``default_rules(counties=...)`` builds the default rules for another set of
+counties (e.g. a multi-state export), or without the county rule.
+
+Every check turns its columns into a boolean mask of offending rows with
+vectorized operations (categorical columns are checked on their categories
+and codes, not row by row), so all rules together cost one pass over the
+frame. Rows failing an ``"error"`` rule are quarantined: they are split off
+with the names of the rules they broke instead of flowing into the analysis
+(a Date the loader couldn't parse is NaT and fails ``date_in_range``, the
+quarantine shows its original text in ``loader.RAW_DATE_COLUMN``).
+``"warn"`` rules are only reported.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .dedup import KEY_COLUMNS, exact_duplicates
+from .loader import RAW_DATE_COLUMN
+
+# the 83 counties, spelled the way the MDNR export does
+MICHIGAN_COUNTIES = (
+    "Alcona", "Alger", "Allegan", "Alpena", "Antrim", "Arenac", "Baraga", "Barry", "Bay", "Benzie",
+    "Berrien", "Branch", "Calhoun", "Cass", "Charlevoix", "Cheboygan", "Chippewa", "Clare", "Clinton",
+    "Crawford", "Delta", "Dickinson", "Eaton", "Emmet", "Genesee", "Gladwin", "Gogebic",
+    "Grand Traverse", "Gratiot", "Hillsdale", "Houghton", "Huron", "Ingham", "Ionia", "Iosco", "Iron",
+    "Isabella", "Jackson", "Kalamazoo", "Kalkaska", "Kent", "Keweenaw", "Lake", "Lapeer", "Leelanau",
+    "Lenawee", "Livingston", "Luce", "Mackinac", "Macomb", "Manistee", "Marquette", "Mason", "Mecosta",
+    "Menominee", "Midland", "Missaukee", "Monroe", "Montcalm", "Montmorency", "Muskegon", "Newaygo",
+    "Oakland", "Oceana", "Ogemaw", "Ontonagon", "Osceola", "Oscoda", "Otsego", "Ottawa", "Presque Isle",
+    "Roscommon", "Saginaw", "Saint Clair", "Saint Joseph", "Sanilac", "Schoolcraft", "Shiawassee",
+    "Tuscola", "Van Buren", "Washtenaw", "Wayne", "Wexford",
+)
+
+# the export starts in 2000; the upper end (None) is today
+DATE_RANGE = ("2000-01-01", None)
+
+
+def default_rules(counties=MICHIGAN_COUNTIES, date_range=DATE_RANGE):
+    """The default rules, counties checked against ``counties`` (None leaves the rule out)."""
+    rules = {
+        "number_non_negative": ("non_negative", "Number", {}),
+        "date_in_range": ("in_range", "Date", {"low": date_range[0], "high": date_range[1]}),
+        "known_county": ("known", "County", {"values": counties}),
+        # only reported, dedup.deduplicate can collapse them before aggregation
+        "duplicate_event": ("unique", KEY_COLUMNS, {"severity": "warn"}),
+        # a strain used for several species: the species it is rarely (< 1%) seen with
+        "strain_matches_species": ("consistent", ("Strain", "Species"), {"min_share": 0.01, "severity": "warn"}),
+    }
+    if counties is None:
+        del rules["known_county"]
+    return rules
+
+
+RULES = default_rules()
+
+SEVERITIES = ("error", "warn")
+
+
+def _codes(series):
+    # integer codes with -1 for missing, straight from the categories when there are some
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy(), len(series.cat.categories)
+    codes, uniques = pd.factorize(series)
+    return codes, len(uniques)
+
+
+def non_negative(df, column):
+    """Missing or below 0."""
+    values = df[column]
+    return (values.isna() | (values < 0)).to_numpy()
+
+
+def in_range(df, column, low=None, high=None):
+    """Missing, or outside ``low`` .. ``high`` (both included, None for today on dates)."""
+    values = df[column]
+    bad = values.isna().to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(values):
+        low = pd.Timestamp(low) if low is not None else None
+        high = pd.Timestamp(high) if high is not None else pd.Timestamp.now().normalize()
+    if low is not None:
+        bad |= (values < low).to_numpy()
+    if high is not None:
+        bad |= (values > high).to_numpy()
+    return bad
+
+
+def known(df, column, values):
+    """Missing or not one of ``values``."""
+    series = df[column]
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # check the categories once and look every row's code up, -1 (missing) lands on the False
+        allowed = np.append(series.cat.categories.isin(values), False)
+        return ~allowed[series.cat.codes.to_numpy()]
+    return ~series.isin(values).to_numpy()
+
+
+def unique(df, columns):
+    """Every repeat of a row already seen on ``columns`` (the first one passes)."""
+    return exact_duplicates(df, columns)[0]
+
+
+def consistent(df, columns, min_share=0.01):
+    """Rows whose ``(key, value)`` pair makes up less than ``min_share`` of the key's rows.
+
+    E.g. ``("Strain", "Species")`` flags a strain showing up with a species
+    it is almost never stocked as. Rows missing either column pass.
+    """
+    key, value = columns
+    key_codes, n_keys = _codes(df[key])
+    value_codes, n_values = _codes(df[value])
+    present = (key_codes >= 0) & (value_codes >= 0)
+    pairs = key_codes.astype("int64") * max(n_values, 1) + value_codes
+    pair_counts = np.bincount(pairs[present], minlength=max(n_keys * n_values, 1))
+    key_counts = np.bincount(key_codes[present], minlength=max(n_keys, 1))
+    bad = np.zeros(len(df), dtype=bool)
+    bad[present] = pair_counts[pairs[present]] < min_share * key_counts[key_codes[present]]
+    return bad
+
+
+CHECKS = {
+    "non_negative": non_negative,
+    "in_range": in_range,
+    "known": known,
+    "unique": unique,
+    "consistent": consistent,
+}
+
+
+def rule_masks(df, rules=None):
+    """``{rule: (mask of offending rows, severity)}`` for every rule."""
+    masks = {}
+    for name, (check, columns, options) in (RULES if rules is None else rules).items():
+        options = dict(options)
+        severity = options.pop("severity", "error")
+        if severity not in SEVERITIES:
+            raise ValueError(f"severity of {name!r} must be one of {SEVERITIES}, got {severity!r}")
+        if check not in CHECKS:
+            raise ValueError(f"unknown check {check!r} for {name!r}, expected one of {list(CHECKS)}")
+        masks[name] = (CHECKS[check](df, columns, **options), severity)
+    return masks
+
+
+def validate(df, rules=None, samples=5, counties=MICHIGAN_COUNTIES):
+    """``(valid, quarantine, report, sample_rows)`` of ``df`` checked against ``rules``.
+
+    ``rules`` defaults to ``default_rules(counties)``. ``valid`` is ``df``
+    without the rows failing an error rule (index reset, and without the raw
+    text of unparsed dates), ``quarantine`` those rows (original index, named
+    ``Row``) with a ``Failed Rules`` column. ``report`` has one row per rule
+    with the number of offending rows, ``sample_rows`` the first ``samples``
+    offending rows of each rule.
+    """
+    rules = default_rules(counties) if rules is None else rules
+    masks = rule_masks(df, rules)
+    errors = np.zeros(len(df), dtype=bool)
+    for mask, severity in masks.values():
+        if severity == "error":
+            errors |= mask
+
+    report, sampled = [], []
+    for name, (mask, severity) in masks.items():
+        check, columns, _ = rules[name]
+        failed = int(mask.sum())
+        report.append({
+            "Rule": name,
+            "Check": check,
+            "Columns": columns if isinstance(columns, str) else ", ".join(columns),
+            "Severity": severity,
+            "Failed": failed,
+            "Failed %": round(failed / max(len(df), 1) * 100, 3),
+        })
+        rows = df.iloc[np.flatnonzero(mask)[:samples]]
+        sampled.append(rows.assign(Rule=name) if len(rows) else None)
+
+    quarantine = df[errors].rename_axis("Row")
+    # quarantined rows are few, so their rule names are joined in python
+    names = np.array(list(masks), dtype=object)
+    hits = np.zeros((len(quarantine), len(masks)), dtype=bool)
+    for i, (mask, _) in enumerate(masks.values()):
+        hits[:, i] = mask[errors]
+    quarantine["Failed Rules"] = [", ".join(names[row]) for row in hits]
+
+    sampled = [rows for rows in sampled if rows is not None]
+    sample_rows = (
+        pd.concat(sampled).rename_axis("Row").reset_index() if sampled
+        else pd.DataFrame(columns=["Row", *df.columns, "Rule"])
+    )
+    sample_rows = sample_rows[["Rule", "Row", *df.columns]]
+    # the raw date text only matters for rows that were quarantined
+    valid = df[~errors].drop(columns=RAW_DATE_COLUMN, errors="ignore").reset_index(drop=True)
+    return valid, quarantine, pd.DataFrame(report), sample_rows
@@ -0,0 +1,99 @@
+"""The original notebook's pandas cells, as functions of the raw csv, to compare against.
+
+Only two things differ from the notebook: its sorts are made stable (the
+notebook's default quicksort leaves the order of tied rows to numpy), and the
+chart / print code is left out.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.stats import linregress
+
+
+def baseline_tables(path):
+    df_raw = pd.read_csv(path)
+    df_clean = df_raw.drop(columns=["Range", "Section", "Town"])
+    df_clean["Date"] = pd.to_datetime(df_clean["Date"], errors="coerce").dt.date
+
+    yearly_species = df_clean.groupby(["Date", "Species"])["Number"].sum().reset_index()
+    yearly_species["Year"] = pd.to_datetime(yearly_species["Date"]).dt.year
+    species_stats = pd.DataFrame({
+        "Years Stocked": yearly_species.groupby("Species")["Year"].nunique(),
+        "Total Fish Stocked": yearly_species.groupby("Species")["Number"].sum(),
+    })
+    top_10_consistent = species_stats.sort_values(
+        by=["Total Fish Stocked", "Years Stocked"], ascending=False, kind="stable"
+    ).head(10)
+    bottom_10_consistent = species_stats.sort_values(
+        by=["Total Fish Stocked", "Years Stocked"], ascending=True, kind="stable"
+    ).head(10)
+
+    yearly_totals = yearly_species.groupby("Year")["Number"].sum().reset_index().sort_values("Year")
+    yearly_totals["5yr_bin"] = (yearly_totals["Year"] // 5) * 5
+    yearly_totals["10yr_bin"] = (yearly_totals["Year"] // 10) * 10
+    averages = [
+        yearly_totals["Number"].mean(),
+        yearly_totals.groupby("5yr_bin")["Number"].sum().mean(),
+        yearly_totals.groupby("10yr_bin")["Number"].sum().mean(),
+    ]
+
+    species_trends = yearly_species.groupby(["Year", "Species"])["Number"].sum().reset_index()
+    species_trends = species_trends[(species_trends["Year"] >= 2000) & (species_trends["Year"] <= 2025)]
+    trend_results = []
+    for species, group in species_trends.groupby("Species"):
+        if len(group["Year"].unique()) > 3:
+            slope, intercept, r_value, p_value, std_err = linregress(group["Year"], group["Number"])
+            trend_results.append({
+                "Species": species,
+                "Slope": slope,
+                "Mean Stocked": group["Number"].mean(),
+                "Years Observed": group["Year"].nunique(),
+            })
+    trend_df = pd.DataFrame(trend_results)
+    trend_df["Trend"] = np.where(trend_df["Slope"] > 0, "Increasing", "Decreasing")
+    top_increasing = trend_df.sort_values("Slope", ascending=False, kind="stable").head(10)
+    top_decreasing = trend_df.sort_values("Slope", ascending=True, kind="stable").head(10)
+
+    county_stocked = df_clean.groupby("County")["Number"].sum().reset_index(name="total_stocked")
+    county_stocked = county_stocked.sort_values(by="total_stocked", ascending=False, kind="stable")
+
+    df_clean["Date"] = pd.to_datetime(df_clean["Date"])
+    df_clean["Year"] = df_clean["Date"].dt.year
+    df_clean["month"] = df_clean["Date"].dt.month
+    monthly_stocked = df_clean.groupby("month")["Number"].sum().reset_index(name="total_stocked")
+    monthly_stocked = monthly_stocked.sort_values("month")
+
+    waterbody_efforts = df_clean.groupby("Water Body").size().reset_index(name="Stocking Efforts")
+    by_efforts = waterbody_efforts.sort_values(by="Stocking Efforts", ascending=False, kind="stable")
+
+    species_totals = df_clean.groupby(["Water Body", "Species"], as_index=False)["Number"].sum()
+    top_10_waterbodies_top10 = by_efforts.head(10).copy()
+    summaries = []
+    for wb in top_10_waterbodies_top10["Water Body"]:
+        subset = species_totals[species_totals["Water Body"] == wb].sort_values(
+            "Number", ascending=False, kind="stable"
+        ).head(3)
+        species_list = [f"{sp} ({num:,})" for sp, num in zip(subset["Species"], subset["Number"])]
+        while len(species_list) < 3:
+            species_list.append("(-- NONE --)")
+        summaries.append(", ".join(species_list))
+    top_10_waterbodies_top10["Top 3 Species"] = summaries
+
+    return {
+        "species_stats": species_stats,
+        "top_10_consistent": top_10_consistent,
+        "bottom_10_consistent": bottom_10_consistent,
+        "yearly_totals": yearly_totals,
+        "averages": averages,
+        "trend_df": trend_df,
+        "top_increasing": top_increasing,
+        "top_decreasing": top_decreasing,
+        "county_stocked": county_stocked,
+        "top_10_counties": county_stocked.head(10),
+        "bottom_10_counties": county_stocked.tail(10),
+        "monthly_stocked": monthly_stocked,
+        "waterbody_efforts": waterbody_efforts,
+        "top_10_waterbodies": by_efforts.head(10),
+        "bottom_10_waterbodies": by_efforts.tail(10),
+        "top_10_waterbodies_top10": top_10_waterbodies_top10,
+    }
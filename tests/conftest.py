@@ -0,0 +1,13 @@
+import pytest
+
+from helpers import write_export
+
+
+@pytest.fixture(scope="session")
+def export_csv(tmp_path_factory):
+    return write_export(tmp_path_factory.mktemp("export") / "fish_stocking_data.csv")
+
+
+@pytest.fixture(scope="session")
+def bad_dates_csv(tmp_path_factory):
+    return write_export(tmp_path_factory.mktemp("bad_dates") / "fish_stocking_data.csv", bad_dates=50)
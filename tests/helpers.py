@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd
+
+from fish_stocking.synthetic import Generator
+
+
+def write_export(path, rows=5_000, bad_dates=0, seed=0):
+    """A small synthetic export at ``path``, ``bad_dates`` of its rows with an unparseable Date."""
+    df = Generator(water_bodies=300, seed=seed).frame(rows, np.random.default_rng(seed))
+    if bad_dates:
+        df.loc[df.index[:: rows // bad_dates][:bad_dates], "Date"] = "not a date"
+    df.to_csv(path, index=False)
+    return path
+
+
+def _plain(df):
+    # categoricals as plain values and a fresh index, what the tables show
+    df = df.reset_index(drop=not df.index.name)
+    return df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+
+
+def assert_same_table(left, right, **kwargs):
+    """Same rows in the same order, whatever the index, integer or categorical dtypes."""
+    pd.testing.assert_frame_equal(_plain(left), _plain(right), check_dtype=False, **kwargs)
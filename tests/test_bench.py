@@ -0,0 +1,40 @@
+import pandas as pd
+
+from fish_stocking import pipeline
+from fish_stocking.bench import DUCKDB_STAGES, STAGES, run_duckdb_stages, run_stages, write_synthetic_cache
+from fish_stocking.cache import read_cache, write_cache_chunks
+from fish_stocking.loader import load_stocking_csv, typed
+from fish_stocking.query import Stocking
+from fish_stocking.synthetic import Generator
+
+
+def test_run_stages_times_every_stage(export_csv, tmp_path):
+    results = run_stages(export_csv, tmp_path)
+    assert list(results) == list(STAGES)
+    assert results["rankings"]["rows"] == results["rankings_duckdb"]["rows"]
+
+
+def test_chunked_cache_is_the_whole_cache(tmp_path):
+    chunks = list(Generator(water_bodies=300, seed=1).chunks(20_000, 6_000))
+    pd.concat(chunks, ignore_index=True).to_csv(tmp_path / "export.csv", index=False)
+    df = load_stocking_csv(tmp_path / "export.csv")
+
+    write_cache_chunks((typed(chunk) for chunk in chunks), tmp_path / "chunked", {})
+    # category order follows the chunks, the values are the same
+    pd.testing.assert_frame_equal(read_cache(tmp_path / "chunked"), df, check_categorical=False)
+
+
+def test_duckdb_stages_match_the_cache(tmp_path):
+    entry = write_synthetic_cache(tmp_path / "entry", 20_000, chunk_rows=6_000)
+    results = run_duckdb_stages(entry)
+    assert list(results) == list(DUCKDB_STAGES)
+
+    stocking = Stocking(entry)
+    try:
+        efforts = stocking.query(pipeline.STOCKING_EFFORTS, by="Water Body")
+    finally:
+        stocking.close()
+    df = read_cache(entry)
+    assert results["rankings_duckdb"]["rows"] == len(efforts) == df["Water Body"].nunique()
+    assert efforts["Stocking Efforts"].sum() == df["Water Body"].notna().sum()
+
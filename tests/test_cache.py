@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pandas as pd
+
+from fish_stocking.cache import clear_cache, load_stocking_cached, read_cache, write_cache_chunks
+from fish_stocking.loader import load_stocking_csv
+from helpers import write_export
+
+
+def test_cache_keeps_the_loader_categories(export_csv, tmp_path):
+    df = load_stocking_csv(export_csv)
+    write_cache_chunks([df.iloc[:2_000], df.iloc[2_000:]], tmp_path / "entry", {})
+    pd.testing.assert_frame_equal(read_cache(tmp_path / "entry"), df)
+
+
+def test_warm_load_matches_the_cold_one(export_csv, tmp_path):
+    cold, cold_report = load_stocking_cached(export_csv, tmp_path)
+    warm, warm_report = load_stocking_cached(export_csv, tmp_path)
+    assert (cold_report["status"], warm_report["status"]) == ("cold", "warm")
+    assert warm_report["cache"] == cold_report["cache"]
+    pd.testing.assert_frame_equal(cold, load_stocking_csv(export_csv))
+    pd.testing.assert_frame_equal(warm, cold)
+
+
+def test_a_changed_export_is_parsed_again(tmp_path):
+    source = write_export(tmp_path / "fish_stocking_data.csv", rows=500)
+    _, first = load_stocking_cached(source, tmp_path / "cache")
+    write_export(source, rows=600, seed=1)
+    df, second = load_stocking_cached(source, tmp_path / "cache")
+    assert second["status"] == "cold" and second["cache"] != first["cache"]
+    assert len(df) == 600
+    # the stale entry is gone
+    assert [path.name for path in (tmp_path / "cache").iterdir()] == [Path(second["cache"]).name]
+
+    clear_cache(source, tmp_path / "cache")
+    assert not any((tmp_path / "cache").iterdir())
+    assert load_stocking_cached(source, tmp_path / "cache")[1]["status"] == "cold"
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from fish_stocking.changepoints import detect, pelt, robust_z
+
+
+def test_pelt_finds_a_planted_shift():
+    rng = np.random.default_rng(0)
+    values = np.vstack([
+        np.r_[rng.normal(0, 1, 20), rng.normal(8, 1, 20)],
+        rng.normal(3, 1, 40),
+    ])
+    changes = pelt(values)
+    assert np.flatnonzero(changes[0]).tolist() == [20]
+    assert not changes[1].any()
+
+
+def test_robust_z():
+    values = np.array([[1.0, 2.0, np.nan, 3.0, 4.0, 100.0], [5.0, 5.0, 5.0, 5.0, 5.0, 5.0]])
+    scores = robust_z(values)
+    present = values[0][~np.isnan(values[0])]
+    mad = np.median(np.abs(present - 3.0))
+    np.testing.assert_allclose(scores[0], (values[0] - 3.0) / (1.4826 * mad))
+    # no spread at all scores 0
+    assert scores[1].tolist() == [0.0] * 6
+
+
+def test_detect_reports_the_shift_and_the_outlier():
+    years = np.arange(2000, 2020)
+    noise = np.random.default_rng(0).normal(1, 0.1, (2, len(years)))
+    shifted = (np.where(years < 2010, 1_000, 10_000) * noise[0]).astype("int64")
+    spiked = (5_000 * noise[1]).astype("int64")
+    spiked[3] = 200_000
+    df = pd.DataFrame({
+        "Species": ["Walleye"] * len(years) + ["Perch"] * len(years),
+        "Year": np.r_[years, years],
+        "Number": np.r_[shifted, spiked],
+    })
+    changes, anomalies, summary = detect(df, "Species")
+    assert changes.loc[changes["Species"] == "Walleye", "Year"].tolist() == [2010]
+    assert anomalies.loc[anomalies["Species"] == "Perch", "Year"].tolist() == [2003]
+    assert anomalies.loc[anomalies["Species"] == "Perch", "Number"].tolist() == [200_000]
+    walleye = summary.set_index("Species").loc["Walleye"]
+    assert walleye["Last Change"] == 2010 and walleye["Shifted"]
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from fish_stocking.charts import ChartCache, barh, line
+
+
+def test_unchanged_charts_come_from_the_cache(tmp_path):
+    yearly = pd.DataFrame({"Year": [2000, 2001, 2002], "Number": [100, 250, 175]})
+    counties = pd.DataFrame({"County": ["Kent", "Bay"], "total_stocked": [10, 20]})
+    jobs = {
+        "yearly": (line, yearly, {"x": "Year", "y": "Number", "title": "Per Year", "xlabel": "Year", "ylabel": "Fish"}),
+        "counties": (barh, counties, {"x": "total_stocked", "y": "County", "title": "Counties", "xlabel": "Fish"}),
+    }
+    charts = ChartCache(tmp_path, workers=0)
+    images = charts.render_all(jobs)
+    assert all(image.startswith(b"\x89PNG") for image in images.values())
+    assert charts.render_all(jobs) == images
+    assert charts.stats().set_index("Chart").loc["yearly"].tolist() == [1, 1]
+
+    # changed data or style is drawn again
+    jobs["yearly"] = (line, yearly.assign(Number=[1, 2, 3]), jobs["yearly"][2])
+    charts.render(barh, counties, name="counties", **{**jobs["counties"][2], "color": "red"})
+    charts.render_all(jobs)
+    assert charts.stats().set_index("Chart")["Misses"].to_dict() == {"counties": 2, "yearly": 2}
+
+    svg = charts.render(line, yearly, fmt="svg", **jobs["yearly"][2])
+    assert b"<svg" in svg
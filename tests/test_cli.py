@@ -0,0 +1,15 @@
+import pytest
+
+from fish_stocking import cli
+
+
+def test_profile_needs_trace():
+    with pytest.raises(SystemExit):
+        cli.parse_args(["data.csv", "--profile", "trend_fit"])
+
+
+def test_profile_stage_has_to_exist(capsys):
+    with pytest.raises(SystemExit):
+        cli.parse_args(["data.csv", "--trace", "trace.json", "--profile", "trend_fitt"])
+    assert "trend_fit" in capsys.readouterr().err
+    assert cli.parse_args(["data.csv", "--trace", "trace.json", "--profile", "trend_fit"]).profile == ["trend_fit"]
@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from fish_stocking.cube import StockingCube
+from fish_stocking.dates import with_calendar
+from fish_stocking.loader import load_stocking_csv
+from helpers import assert_same_table
+
+
+@pytest.fixture(scope="module")
+def stocking(export_csv):
+    df = with_calendar(load_stocking_csv(export_csv))
+    return df, StockingCube(df)
+
+
+def _direct(df, by, years, where):
+    rows = df[df["Year"].notna() & df["Year"].between(*years)]
+    for dim, allowed in where.items():
+        rows = rows[rows[dim].isin(allowed)]
+    grouped = rows.groupby(by, observed=True)
+    return pd.DataFrame({
+        "Number": grouped["Number"].sum(), "Stocking Efforts": grouped.size(),
+    }).reset_index()
+
+
+@pytest.mark.parametrize("by", ["Year", "month", "Species", "County", "Water Body"])
+def test_queries_match_a_groupby(stocking, by):
+    df, cube = stocking
+    species = cube.options("Species")[:3]
+    for years, where in [((1900, 2100), {}), ((1995, 2010), {"Species": species})]:
+        expected = _direct(df, by, years, where)
+        if by == "Year":
+            # every year of the range, stocked or not
+            expected = expected.set_index("Year").reindex(
+                [y for y in cube.years if years[0] <= y <= years[1]], fill_value=0
+            ).reset_index()
+        assert_same_table(cube.query(by, years, where), expected, obj=f"{by} {years}")
+
+
+def test_cube_from_dates_matches_the_calendar_columns(stocking, export_csv):
+    _, cube = stocking
+    from_dates = StockingCube(load_stocking_csv(export_csv))
+    assert_same_table(from_dates.query("County", (2000, 2005)), cube.query("County", (2000, 2005)))
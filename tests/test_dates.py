@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from fish_stocking.dates import CALENDAR_COLUMNS, calendar_features, with_calendar, year_bin
+
+
+def _expected(dates):
+    return pd.DataFrame({
+        "Year": dates.dt.year,
+        "month": dates.dt.month,
+        "iso_week": dates.dt.isocalendar().week,
+        "day_of_year": dates.dt.dayofyear,
+        "5yr_bin": (dates.dt.year // 5) * 5,
+        "10yr_bin": (dates.dt.year // 10) * 10,
+    })
+
+
+def test_features_match_the_dt_accessors():
+    # spans leap years and the ISO weeks that belong to the year before / after
+    dates = pd.Series(pd.date_range("1999-12-25", "2005-01-07", freq="D"))
+    features = calendar_features(dates)
+    assert dict(features.dtypes.astype(str)) == CALENDAR_COLUMNS
+    pd.testing.assert_frame_equal(features, _expected(dates), check_dtype=False)
+
+
+def test_sparse_and_missing_dates():
+    dates = pd.Series(pd.to_datetime(["1950-03-01", None, "2024-12-30", "1987-06-15"]), index=[10, 11, 12, 13])
+    features = calendar_features(dates)
+    assert features.index.tolist() == [10, 11, 12, 13]
+    assert features.iloc[1].isna().all()
+    present = dates.notna()
+    pd.testing.assert_frame_equal(features[present], _expected(dates[present]), check_dtype=False)
+
+
+def test_with_calendar_leaves_the_input_alone():
+    df = pd.DataFrame({"Date": pd.to_datetime(["2001-01-01", "2012-07-04"]), "Year": [0, 0]})
+    out = with_calendar(df)
+    assert df["Year"].tolist() == [0, 0]
+    assert list(out.columns) == ["Date", *CALENDAR_COLUMNS]
+    assert out["Year"].tolist() == [2001, 2012]
+
+
+def test_year_bin():
+    assert year_bin(np.array([1999, 2000, 2003, 2009]), 5).tolist() == [1995, 2000, 2000, 2005]
+    assert year_bin(np.array([1999, 2000, 2009]), 10).tolist() == [1990, 2000, 2000]
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from fish_stocking import dedup
+
+
+def events(rows):
+    return pd.DataFrame(rows, columns=list(dedup.KEY_COLUMNS)).astype({"Date": "datetime64[ns]"})
+
+
+def test_exact_duplicates_keep_the_first_copy():
+    df = events([
+        ("2020-05-01", "Reeds Lake", "Boat Launch", "Walleye", None, 100),
+        ("2020-05-02", "Reeds Lake", "Boat Launch", "Walleye", None, 100),
+        ("2020-05-01", "Reeds Lake", "Boat Launch", "Walleye", None, 100),
+        ("2020-05-01", "Reeds Lake", "Boat Launch", "Walleye", None, 100),
+    ])
+    mask, first = dedup.exact_duplicates(df)
+    assert mask.tolist() == [False, False, True, True]
+    assert first.tolist() == [0, 1, 0, 0]
+
+
+def test_hash_collisions_are_not_duplicates(monkeypatch):
+    df = events([
+        ("2020-05-01", "Reeds Lake", "Boat Launch", "Walleye", None, 100),
+        ("2020-06-01", "Saginaw Bay", "Pier", "Brown Trout", "Seeforellen", 2183),
+    ])
+    monkeypatch.setattr(dedup, "event_hashes", lambda df, columns: np.zeros(len(df), dtype="uint64"))
+    mask, _ = dedup.exact_duplicates(df)
+    assert not mask.any()
+    assert len(dedup.deduplicate(df, collapse="exact")[0]) == 2
+
+
+def test_near_duplicates_at_other_sites_are_kept():
+    df = events([
+        ("2020-05-01", "Lake Michigan", "Ludington", "Chinook Salmon", None, 50000),
+        ("2020-05-01", "Lake Michigan", "Frankfort", "Chinook Salmon", None, 50000),
+        ("2020-05-03", "Lake Michigan", "Frankfort", "Chinook Salmon", None, 50100),
+    ])
+    pairs, _ = dedup.near_duplicates(df)
+    assert pairs[["Row", "Duplicate Of"]].values.tolist() == [[2, 1]]
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fish_stocking.dimensions import DimensionRegistry
+from fish_stocking.loader import load_stocking_csv
+
+
+@pytest.fixture(scope="module")
+def df(export_csv):
+    return load_stocking_csv(export_csv)
+
+
+def test_registry_codes_are_the_loader_categories(df):
+    dimensions = DimensionRegistry(df)
+    for dim in ("Species", "County", "Water Body", "Site Name"):
+        pd.testing.assert_index_equal(dimensions.labels[dim], df[dim].cat.categories)
+        np.testing.assert_array_equal(dimensions.codes(df[dim], dim), df[dim].cat.codes.to_numpy())
+
+
+def test_has_tag_matches_the_notebook_regex(df):
+    dimensions = DimensionRegistry(df)
+    expected = df["Species"].astype(object).str.contains("Salmon|Trout|Steelhead", case=False).fillna(False)
+    for values in (df["Species"], df["Species"].astype(object), df["Species"].astype("string")):
+        mask = dimensions.has_tag(values, "Species", "salmon_trout_steelhead")
+        pd.testing.assert_series_equal(mask, expected.astype(bool), check_names=False)
+
+
+def test_unseen_and_missing_values_are_never_tagged(df):
+    dimensions = DimensionRegistry(df)
+    values = pd.Series(["Coho salmon", "Sockeye salmon", None], index=[5, 6, 7])
+    assert dimensions.codes(values, "Species")[1:].tolist() == [-1, -1]
+    assert dimensions.has_tag(values, "Species", "salmon_trout_steelhead").tolist() == [True, False, False]
+    # a categorical with categories of its own goes through the registry codes too
+    mask = dimensions.has_tag(values.astype("category"), "Species", "salmon_trout_steelhead")
+    assert mask.tolist() == [True, False, False]
+    assert mask.index.tolist() == [5, 6, 7]
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from fish_stocking import pipeline
+from fish_stocking.events import stocking_events, stocking_frequency
+from fish_stocking.loader import load_stocking_csv
+
+
+def test_sites_are_events_of_their_own():
+    df = pd.DataFrame({
+        "Water Body": ["Reeds Lake"] * 4,
+        "Site Name": ["Launch", "Dock", "Launch", "Launch"],
+        "Species": ["Walleye"] * 4,
+        "Date": pd.to_datetime(["2020-05-01", "2020-05-01", "2020-05-11", "2021-05-01"]),
+        "Number": pd.array([100, 50, 20, None], dtype="Int32"),
+    })
+    tables = pipeline.event_tables(
+        stocking_events(df, pipeline.EVENT_KEYS), stocking_events(df, pipeline.SITE_EVENT_KEYS),
+    )
+    per_year = tables["stocking_per_year"].set_index("Year")
+    assert per_year.loc[2020, ["Times Stocked", "Plants", "Fish Stocked"]].tolist() == [2, 3, 170]
+
+    sites = tables["site_stocking_per_year"].set_index(["Site Name", "Year"])
+    assert sites.loc[("Launch", 2020), "Times Stocked"] == 2
+    assert sites.loc[("Dock", 2020), "Times Stocked"] == 1
+    assert sites.loc[("Launch", 2021), "Median Days Between"] == 355
+
+    summary = tables["site_stocking_frequency"].set_index("Site Name")
+    assert summary.loc["Launch", "Events"] == 3 and summary.loc["Dock", "Events"] == 1
+
+
+def test_times_stocked_match_a_groupby(export_csv):
+    df = load_stocking_csv(export_csv)
+    keys = pipeline.SITE_EVENT_KEYS
+    frequency = stocking_frequency(stocking_events(df, keys), keys)
+
+    dated = df.dropna(subset=keys + ["Date"]).assign(Year=lambda d: d["Date"].dt.year)
+    expected = dated.groupby(keys + ["Year"], observed=True)["Date"].nunique()
+    got = frequency.set_index(keys + ["Year"])["Times Stocked"]
+    assert np.array_equal(got.sort_index().to_numpy(), expected.sort_index().to_numpy())
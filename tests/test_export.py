@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from fish_stocking.export import export_parquet_bundle, export_workbook, frame_hash, prepare_tables
+
+
+def _tables():
+    return {
+        "CountyStocked": pd.DataFrame({"County": ["Kent", "Bay"], "total_stocked": [10, 20]}),
+        "CleanedData": pd.DataFrame({"Number": range(100), "Date": pd.date_range("2000-01-01", periods=100)}),
+    }
+
+
+def test_frame_hash_follows_the_content():
+    df = _tables()["CountyStocked"]
+    assert frame_hash(df) == frame_hash(df.copy())
+    assert frame_hash(df) != frame_hash(df.assign(total_stocked=[10, 21]))
+    assert frame_hash(df) != frame_hash(df.astype({"total_stocked": "int32"}))
+    assert frame_hash(df) != frame_hash(df.rename(columns={"County": "Name"}))
+
+
+def test_raw_modes():
+    tables = _tables()
+    assert list(prepare_tables(tables, "skip")) == ["CountyStocked"]
+    sample = prepare_tables(tables, "sample", sample_rows=10)["CleanedData"]
+    assert len(sample) == 10 and sample.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(sample, prepare_tables(tables, "sample", sample_rows=10)["CleanedData"])
+    with pytest.raises(ValueError, match="raw_mode"):
+        prepare_tables(tables, "most")
+
+
+def test_workbook_is_only_rewritten_when_a_table_changed(tmp_path):
+    path = tmp_path / "stocking.xlsx"
+    tables = _tables()
+    assert export_workbook(tables, path)["written"]
+    assert not export_workbook(tables, path)["written"]
+
+    tables["CountyStocked"] = tables["CountyStocked"].assign(total_stocked=[11, 20])
+    report = export_workbook(tables, path)
+    assert report["written"] and report["stale"] == ["CountyStocked"]
+    back = pd.read_excel(path, sheet_name=None)
+    assert list(back) == ["CountyStocked", "CleanedData"]
+    pd.testing.assert_frame_equal(back["CountyStocked"], tables["CountyStocked"])
+
+
+def test_parquet_bundle_rewrites_only_stale_tables(tmp_path):
+    tables = _tables()
+    assert export_parquet_bundle(tables, tmp_path)["stale"] == ["CountyStocked", "CleanedData"]
+    assert export_parquet_bundle(tables, tmp_path)["stale"] == []
+
+    tables["CleanedData"] = tables["CleanedData"].iloc[:50]
+    assert export_parquet_bundle(tables, tmp_path)["stale"] == ["CleanedData"]
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "CleanedData.parquet"), tables["CleanedData"])
+
+    del tables["CleanedData"]
+    export_parquet_bundle(tables, tmp_path)
+    assert not (tmp_path / "CleanedData.parquet").exists()
@@ -0,0 +1,86 @@
+import os
+
+import pandas as pd
+import pytest
+
+from fish_stocking import incremental
+
+
+def stocking(rows):
+    return pd.DataFrame(rows, columns=["Date", "Species", "County", "Water Body", "Number"]).astype(
+        {"Date": "datetime64[ns]"}
+    )
+
+
+@pytest.fixture
+def df():
+    # the last date has the same row twice, the case the watermark has to count right
+    return stocking([
+        ("2020-05-01", "Walleye", "Kent", "Reeds Lake", 100),
+        ("2020-05-02", "Brown Trout", "Bay", "Saginaw Bay", 2183),
+        ("2020-05-02", "Brown Trout", "Bay", "Saginaw Bay", 2183),
+    ])
+
+
+def county_totals(aggregates):
+    return aggregates["county"].set_index("County")["Number"].to_dict()
+
+
+def test_refreshing_the_same_file_ingests_nothing(df, tmp_path):
+    _, ingested, _ = incremental.refresh(df, tmp_path)
+    assert ingested == 3
+    for _ in range(2):
+        aggregates, ingested, skipped = incremental.refresh(df, tmp_path)
+        assert ingested == skipped == 0
+        assert county_totals(aggregates) == {"Kent": 100, "Bay": 4366}
+
+
+def test_repeat_published_later_on_the_watermark_date(df, tmp_path):
+    incremental.refresh(df, tmp_path)
+    later = pd.concat([df, df.iloc[[2]]], ignore_index=True)
+    aggregates, ingested, _ = incremental.refresh(later, tmp_path)
+    assert ingested == 1
+    assert county_totals(aggregates) == {"Kent": 100, "Bay": 6549}
+    assert incremental.refresh(later, tmp_path)[1] == 0
+
+
+def test_refresh_dying_before_the_watermark_leaves_the_state_alone(df, tmp_path, monkeypatch):
+    incremental.refresh(df.iloc[:1], tmp_path)
+    before = incremental.read_watermark(tmp_path)
+
+    # dies after the new aggregates are written, before the watermark is swapped in
+    replace = os.replace
+
+    def crash(src, dst):
+        if os.path.basename(dst) == incremental.WATERMARK_FILE:
+            raise OSError("disk gone")
+        replace(src, dst)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(incremental.os, "replace", crash)
+        with pytest.raises(OSError):
+            incremental.refresh(df, tmp_path)
+
+    assert incremental.read_watermark(tmp_path) == before
+    assert county_totals(incremental.load_aggregates(tmp_path)) == {"Kent": 100}
+
+    aggregates, ingested, _ = incremental.refresh(df, tmp_path)
+    assert ingested == 2
+    assert county_totals(aggregates) == {"Kent": 100, "Bay": 4366}
+    # only the aggregates the watermark names are left
+    assert len(list(tmp_path.glob(f"{incremental.AGGREGATES_PREFIX}*"))) == 1
+
+
+def test_backfilled_rows_are_counted_as_skipped(df, tmp_path):
+    incremental.refresh(df, tmp_path)
+    backfilled = stocking([("2020-04-01", "Brown Trout", "Bay", "Saginaw Bay", 500)])
+    newer = stocking([("2020-06-01", "Walleye", "Kent", "Reeds Lake", 50)])
+    aggregates, ingested, skipped = incremental.refresh(pd.concat([df, backfilled, newer], ignore_index=True), tmp_path)
+    assert (ingested, skipped) == (1, 1)
+    assert county_totals(aggregates) == {"Kent": 150, "Bay": 4366}
+
+
+def test_unparsed_date_text_doesnt_change_the_row_hashes(df, tmp_path):
+    incremental.refresh(df, tmp_path)
+    with_text = df.assign(**{"Date Text": pd.array([None] * len(df), dtype="string")})
+    assert incremental.refresh(with_text, tmp_path)[1] == 0
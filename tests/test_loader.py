@@ -0,0 +1,36 @@
+import pandas as pd
+
+from fish_stocking.loader import (
+    RAW_DATE_COLUMN, SCHEMA, SKIPPED_COLUMNS, iter_stocking_csv, load_stocking_csv, typed,
+)
+
+
+def test_columns_dtypes_and_dates(export_csv):
+    raw = pd.read_csv(export_csv)
+    df = load_stocking_csv(export_csv)
+    assert list(df.columns) == [col for col in raw.columns if col not in SKIPPED_COLUMNS]
+    for col, dtype in SCHEMA.items():
+        assert df[col].dtype == dtype, col
+    assert RAW_DATE_COLUMN not in df
+    expected = pd.to_datetime(raw["Date"], format="mixed").dt.normalize()
+    pd.testing.assert_series_equal(df["Date"], expected, check_dtype=False)
+    pd.testing.assert_series_equal(df["Number"].astype("int64"), raw["Number"])
+
+
+def test_unparsed_dates_keep_their_text(bad_dates_csv):
+    df = load_stocking_csv(bad_dates_csv)
+    unparsed = df["Date"].isna()
+    assert unparsed.sum() == 50
+    assert (df.loc[unparsed, RAW_DATE_COLUMN] == "not a date").all()
+    assert df.loc[~unparsed, RAW_DATE_COLUMN].isna().all()
+
+
+def test_chunks_add_up_to_the_whole_load(export_csv):
+    whole = load_stocking_csv(export_csv)
+    chunks = pd.concat(iter_stocking_csv(export_csv, chunksize=1_500), ignore_index=True)
+    pd.testing.assert_frame_equal(chunks.astype(whole.dtypes.to_dict()), whole)
+
+
+def test_typed_matches_the_csv_load(export_csv):
+    whole = load_stocking_csv(export_csv)
+    pd.testing.assert_frame_equal(typed(pd.read_csv(export_csv)), whole, check_dtype=False, check_categorical=False)
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from fish_stocking.memo import DiskMemo
+
+
+def test_hits_misses_and_remembered_frames(tmp_path):
+    calls = []
+
+    def totals(df, by):
+        calls.append(by)
+        return df.groupby(by)["Number"].sum()
+
+    df = pd.DataFrame({"County": ["Kent", "Bay", "Kent"], "Number": [1, 2, 3]})
+    memo = DiskMemo(tmp_path)
+    cached = memo(totals)
+    first = cached(df, "County")
+    pd.testing.assert_series_equal(cached(df.copy(), "County"), first)
+    # a fresh memo on the same directory reads the pickle back
+    pd.testing.assert_series_equal(DiskMemo(tmp_path)(totals)(df, "County"), first)
+    cached(df.assign(Number=[1, 2, 4]), "County")
+    assert len(calls) == 2
+    assert memo.stats().values.tolist() == [[totals.__qualname__, 1, 2]]
+
+    # a remembered frame is keyed on its fingerprint, not its content
+    memo.remember(df, "source-a")
+    cached(df, "County")
+    other = memo.remember(df.copy(), "source-a")
+    cached(other, "County")
+    assert len(calls) == 3
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    memo = DiskMemo(tmp_path, max_bytes=0)
+    square = memo(lambda x: x * x)
+    assert square(3) == 9
+    assert memo.evictions == 1 and not list(tmp_path.glob("*.pkl"))
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from fish_stocking import parallel, pipeline
+from fish_stocking.dates import with_calendar
+from fish_stocking.incremental import partial_aggregates
+from fish_stocking.loader import load_stocking_csv
+from fish_stocking.rollup import compute_cuboids
+
+
+@pytest.fixture(scope="module")
+def df(bad_dates_csv):
+    df = load_stocking_csv(bad_dates_csv)
+    # a few blank counts, kept as <NA> in the nullable Number
+    df.loc[df.index[::700], "Number"] = pd.NA
+    return df
+
+
+def test_parallel_aggregates_equal_the_serial_ones(df):
+    serial = partial_aggregates(df)
+    in_pool = parallel.parallel_aggregates(df, workers=2)
+    assert list(in_pool) == list(serial)
+    for name, frame in serial.items():
+        pd.testing.assert_frame_equal(in_pool[name], frame)
+
+
+@pytest.mark.parametrize("calendar", [False, True])
+def test_parallel_cuboids_equal_the_serial_ones(df, calendar):
+    df = with_calendar(df) if calendar else df
+    specs = {**pipeline.CUBOIDS, **pipeline.PLACE_CUBOIDS}
+    serial = compute_cuboids(df, specs)
+    in_pool = parallel.parallel_cuboids(df, specs, workers=2)
+    for name, frame in serial.items():
+        pd.testing.assert_frame_equal(in_pool[name], frame)
+
+
+def test_shared_frame_keeps_nullable_integers(df, tmp_path):
+    spec = parallel.share_frame(df[["Number"]], tmp_path)
+    pd.testing.assert_frame_equal(parallel.attach_frame(spec, 0, len(df)), df[["Number"]].reset_index(drop=True))
+
+
+def test_run_analysis_with_workers(df):
+    valid = df[df["Date"].notna()].reset_index(drop=True)
+    serial = pipeline.run_analysis(valid)
+    in_pool = pipeline.run_analysis(valid, workers=2)
+    for name, table in serial.items():
+        if isinstance(table, pd.DataFrame):
+            pd.testing.assert_frame_equal(in_pool[name], table)
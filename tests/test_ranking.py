@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fish_stocking.ranking import format_leaders, tail_k, top_bottom, top_k, top_n_per_group
+
+
+@pytest.fixture
+def ties():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "Water Body": [f"Lake {i:03d}" for i in range(200)],
+        "Stocking Efforts": rng.integers(1, 6, 200),
+        "Number": pd.array(np.where(rng.random(200) < 0.05, None, rng.integers(0, 50, 200)), dtype="Int64"),
+    })
+
+
+@pytest.mark.parametrize("by", ["Stocking Efforts", ["Stocking Efforts", "Number"], "Number"])
+def test_top_bottom_is_the_stable_sort(ties, by):
+    top, bottom = top_bottom(ties, by, 10)
+    pd.testing.assert_frame_equal(top, ties.sort_values(by, ascending=False, kind="stable").head(10))
+    # ties keep row order at the bottom too
+    pd.testing.assert_frame_equal(bottom, ties.sort_values(by, ascending=True, kind="stable").head(10))
+
+
+@pytest.mark.parametrize("by", ["Stocking Efforts", "Number"])
+def test_tail_k_is_the_tail_of_the_ranking(ties, by):
+    pd.testing.assert_frame_equal(tail_k(ties, by, 10), ties.sort_values(by, ascending=False, kind="stable").tail(10))
+    pd.testing.assert_frame_equal(top_k(ties, by, 10), ties.sort_values(by, ascending=False, kind="stable").head(10))
+
+
+def test_more_rows_asked_than_there_are(ties):
+    top, bottom = top_bottom(ties.head(3), "Stocking Efforts", 10)
+    assert len(top) == len(bottom) == 3
+    assert tail_k(ties.iloc[:0], "Stocking Efforts").empty
+
+
+def test_top_n_per_group_matches_a_sort_per_group():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        "Water Body": rng.choice(["A", "B", "C", None], 300),
+        "Species": rng.choice(list("abcdefg"), 300),
+        "Number": rng.integers(0, 20, 300),
+    })
+    leaders = top_n_per_group(df, "Water Body", "Number", 3)
+    expected = (
+        df.dropna(subset=["Water Body"])
+        .sort_values("Number", ascending=False, kind="stable")
+        .groupby("Water Body", sort=True)
+        .head(3)
+        .sort_values("Water Body", kind="stable")
+    )
+    pd.testing.assert_frame_equal(leaders.drop(columns="Rank"), expected)
+    assert leaders.groupby("Water Body")["Rank"].apply(list).tolist() == [[1, 2, 3]] * 3
+
+
+def test_format_leaders_pads_and_shows_missing_values():
+    leaders = pd.DataFrame({
+        "Water Body": ["A", "A", "B"],
+        "Species": ["Walleye", "Brown trout", "Splake"],
+        "Number": pd.array([1_500_000, None, 20], dtype="Int64"),
+        "Rank": [1, 2, 1],
+    })
+    text = format_leaders(leaders, "Water Body", "Species", "Number", 3, groups=["A", "B", "C"])
+    assert text.to_dict() == {
+        "A": "Walleye (1,500,000), Brown trout (n/a), (-- NONE --)",
+        "B": "Splake (20), (-- NONE --), (-- NONE --)",
+        "C": "(-- NONE --), (-- NONE --), (-- NONE --)",
+    }
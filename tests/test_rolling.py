@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import linregress
+
+from fish_stocking.rolling import rolling_metrics, trend_flips, yearly_matrix
+
+
+def _yearly():
+    rng = np.random.default_rng(0)
+    rows = [
+        (species, year, int(rng.integers(0, 10_000)))
+        for species in ["Walleye", "Brown Trout", "Lake Sturgeon"]
+        for year in range(2000, 2016)
+        # gaps, which count as years without stocking
+        if rng.random() > 0.2
+    ]
+    return pd.DataFrame(rows, columns=["Species", "Year", "Number"])
+
+
+def test_matches_refitting_every_window():
+    df = _yearly()
+    window = 4
+    out = rolling_metrics(df, "Species", window=window)
+    matrix, years = yearly_matrix(df, "Species")
+    assert len(out) == len(matrix) * len(years)
+
+    for species, rows in out.groupby("Species"):
+        series = pd.Series(matrix.loc[species].to_numpy(), dtype="float64")
+        windows = series.rolling(window)
+        slope = windows.apply(lambda values: linregress(np.arange(window), values).slope, raw=True)
+        assert rows["Number"].tolist() == series.tolist()
+        np.testing.assert_allclose(rows["Rolling Sum"], windows.sum())
+        np.testing.assert_allclose(rows["Rolling Mean"], windows.mean())
+        np.testing.assert_allclose(rows["Rolling Slope"], slope, atol=1e-6)
+        np.testing.assert_allclose(rows["YoY Change"], series.diff())
+
+
+def test_trend_flips():
+    rolling = pd.DataFrame({
+        "Species": ["Walleye"] * 4 + ["Perch"] * 2,
+        "Year": [2000, 2001, 2002, 2003, 2000, 2001],
+        "Rolling Slope": [np.nan, 5.0, -2.0, -1.0, 3.0, -3.0],
+    })
+    flips = trend_flips(rolling, "Species")
+    assert flips[["Species", "Year", "Now"]].values.tolist() == [
+        ["Walleye", 2002, "Decreasing"], ["Perch", 2001, "Decreasing"],
+    ]
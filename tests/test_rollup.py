@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fish_stocking import pipeline
+from fish_stocking.cache import load_stocking_cached
+from fish_stocking.dates import with_calendar
+from fish_stocking.loader import load_stocking_csv
+from fish_stocking.query import Stocking
+from fish_stocking.rollup import compute_cuboids, rollup
+from baseline import baseline_tables
+from helpers import assert_same_table
+
+SPECS = {**pipeline.CUBOIDS, **pipeline.PLACE_CUBOIDS, **{
+    "species_years": (["Species"], {"Years": ("Year", "nunique"), "Rows": ("Number", "count")}),
+}}
+
+
+@pytest.mark.parametrize("calendar", [True, False], ids=["with_calendar", "from_date"])
+def test_cuboids_match_a_groupby_each(export_csv, calendar):
+    df = load_stocking_csv(export_csv)
+    cuboids = compute_cuboids(with_calendar(df) if calendar else df, SPECS)
+    df = with_calendar(df)
+    for name, (dims, measures) in SPECS.items():
+        grouped = df.groupby(dims, observed=True)
+        expected = pd.DataFrame({
+            output: grouped.size() if how == "count" else grouped[column].agg(how)
+            for output, (column, how) in measures.items()
+        }).reset_index()
+        assert_same_table(cuboids[name], expected)
+
+
+def test_unknown_aggregation():
+    with pytest.raises(ValueError, match="median"):
+        rollup(pd.DataFrame({"County": ["Bay"], "Number": [1]}), ["County"], {"x": ("Number", "median")})
+
+
+@pytest.fixture(params=["pandas", "duckdb"])
+def analysis(request, export_csv, tmp_path):
+    if request.param == "pandas":
+        yield pipeline.run_analysis(load_stocking_csv(export_csv))
+        return
+    df, report = load_stocking_cached(export_csv, tmp_path)
+    stocking = Stocking(report["cache"])
+    yield pipeline.run_analysis(df, stocking=stocking)
+    stocking.close()
+
+
+def test_tables_match_the_notebook(analysis, export_csv):
+    baseline = baseline_tables(export_csv)
+    same = [
+        "species_stats", "top_10_consistent", "bottom_10_consistent", "yearly_totals",
+        "top_10_counties", "bottom_10_counties", "monthly_stocked", "waterbody_efforts",
+        "top_10_waterbodies", "bottom_10_waterbodies", "top_10_waterbodies_top10",
+    ]
+    for name in same:
+        assert_same_table(analysis[name], baseline[name], obj=name)
+
+    # the notebook's county table is sorted, the groups here come in county order
+    counties = analysis["county_stocked"].sort_values("total_stocked", ascending=False, kind="stable")
+    assert_same_table(counties, baseline["county_stocked"])
+    np.testing.assert_allclose(analysis["averages"]["Fish Stocked"], baseline["averages"])
+
+    for name in ("trend_df", "top_increasing", "top_decreasing"):
+        assert_same_table(analysis[name][baseline[name].columns], baseline[name], obj=name)
@@ -0,0 +1,179 @@
+import asyncio
+import threading
+
+import pandas as pd
+
+from fish_stocking import serve
+
+
+class FakeStocking:
+    def __init__(self, entry, exclude_rows=None):
+        self.entry = entry
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_reload_closes_the_previous_stocking_after_its_last_use(tmp_path, monkeypatch):
+    source = tmp_path / "fish.csv"
+    source.write_text("a")
+    loads = []
+    monkeypatch.setattr(serve, "load_stocking_cached", lambda path, cache_dir: loads.append(1) or (None, {"cache": len(loads)}))
+    monkeypatch.setattr(serve, "validate", lambda df: (None, pd.DataFrame(), None, None))
+    monkeypatch.setattr(serve, "Stocking", FakeStocking)
+
+    tables = serve.StockingTables(source)
+    with tables.stocking() as first:
+        source.write_text("ab")
+        with tables.stocking() as second:
+            assert second is not first and second.entry == 2
+        # still in use by the outer computation
+        assert not first.closed and not second.closed
+    assert first.closed and not second.closed
+    with tables.stocking() as again:
+        assert again is second
+    assert len(loads) == 2
+
+
+def test_reload_doesnt_block_computations_on_the_previous_data(tmp_path, monkeypatch):
+    source = tmp_path / "fish.csv"
+    source.write_text("a")
+    loading, release = threading.Event(), threading.Event()
+
+    def load(path, cache_dir):
+        if source.read_text() == "ab":
+            loading.set()
+            release.wait(5)
+        return None, {"cache": source.read_text()}
+
+    monkeypatch.setattr(serve, "load_stocking_cached", load)
+    monkeypatch.setattr(serve, "validate", lambda df: (None, pd.DataFrame(), None, None))
+    monkeypatch.setattr(serve, "Stocking", FakeStocking)
+
+    tables = serve.StockingTables(source)
+    tables.refresh()
+    source.write_text("ab")
+    reloader = threading.Thread(target=tables.refresh)
+    reloader.start()
+    assert loading.wait(5)
+    with tables.stocking() as stocking:
+        assert stocking.entry == "a"
+    release.set()
+    reloader.join()
+    with tables.stocking() as stocking:
+        assert stocking.entry == "ab"
+
+
+def test_malformed_content_length_is_a_bad_request():
+    async def request():
+        service = serve.StockingService(tables=None)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET / HTTP/1.1\r\nContent-Length: lots\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    assert asyncio.run(request()).startswith(b"HTTP/1.1 400 Bad Request")
+
+
+def test_finished_computations_leave_no_user_entries(tmp_path, monkeypatch):
+    source = tmp_path / "fish.csv"
+    source.write_text("a")
+    monkeypatch.setattr(serve, "load_stocking_cached", lambda path, cache_dir: (None, {"cache": source.read_text()}))
+    monkeypatch.setattr(serve, "validate", lambda df: (None, pd.DataFrame(), None, None))
+    monkeypatch.setattr(serve, "Stocking", FakeStocking)
+
+    tables = serve.StockingTables(source)
+    for _ in range(3):
+        with tables.stocking():
+            pass
+    assert tables._users == {}
+    with tables.stocking() as first:
+        source.write_text("ab")
+        with tables.stocking():
+            assert len(tables._users) == 2
+    assert tables._users == {} and first.closed
+
+
+class FakeTables:
+    def __init__(self):
+        self.calls = 0
+        self.value = 1
+
+    def compute(self, name, where=None):
+        self.calls += 1
+        return pd.DataFrame({"County": ["Alcona"], "total_stocked": [self.value]})
+
+
+def test_etag_and_not_modified():
+    tables = FakeTables()
+    service = serve.StockingService(tables, serve.ResultCache(ttl=60))
+
+    async def requests():
+        first = await service.respond("GET", "/tables/county_stocked", {})
+        tag = first[1]["ETag"]
+        again = await service.respond("GET", "/tables/county_stocked", {"if-none-match": f'"other", {tag}'})
+        service.cache.clear()
+        tables.value = 2
+        changed = await service.respond("GET", "/tables/county_stocked", {"if-none-match": tag})
+        return first, again, changed
+
+    first, again, changed = asyncio.run(requests())
+    assert first[0] == 200 and first[2] == b'[{"County":"Alcona","total_stocked":1}]'
+    assert again[0] == 304 and again[2] == b"" and again[1]["ETag"] == first[1]["ETag"]
+    assert changed[0] == 200 and changed[1]["ETag"] != first[1]["ETag"]
+    assert tables.calls == 2
+
+
+def test_identical_requests_are_computed_once():
+    tables = FakeTables()
+    started = threading.Event()
+    release = threading.Event()
+    compute = tables.compute
+
+    def slow(name, where=None):
+        started.set()
+        release.wait(5)
+        return compute(name, where)
+
+    tables.compute = slow
+    service = serve.StockingService(tables, serve.ResultCache(ttl=60))
+
+    async def requests():
+        pending = [asyncio.ensure_future(service.respond("GET", "/tables/county_stocked", {})) for _ in range(5)]
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        await asyncio.sleep(0.01)
+        release.set()
+        return await asyncio.gather(*pending)
+
+    responses = asyncio.run(requests())
+    assert {response[2] for response in responses} == {responses[0][2]}
+    assert tables.calls == 1
+    assert service.cache.stats() == {"entries": 1, "hits": 0, "misses": 1, "coalesced": 4}
+
+
+def test_entries_expire_and_the_least_recently_used_goes_first():
+    now = [0.0]
+    cache = serve.ResultCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    computed = []
+
+    def get(key):
+        async def compute():
+            computed.append(key)
+            return key
+        return asyncio.run(cache.get(key, compute))
+
+    get("a"), get("b"), get("a")
+    # a was used last, so c pushes b out
+    get("c")
+    get("a"), get("b")
+    assert computed == ["a", "b", "c", "b"]
+
+    now[0] = 11
+    get("a")
+    assert computed[-1] == "a" and cache.stats()["entries"] == 2
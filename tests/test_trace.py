@@ -0,0 +1,24 @@
+import pytest
+
+from fish_stocking.trace import Trace
+
+
+def test_missing_stage_names_the_known_ones():
+    trace = Trace()
+    with trace.stage("load"):
+        pass
+    assert "load" in trace and "trend_fit" not in trace
+    with pytest.raises(KeyError, match="load"):
+        trace["trend_fit"]
+
+
+def test_run_peak_survives_the_per_stage_resets():
+    trace = Trace()
+    with trace.stage("big"):
+        block = bytearray(200 * 1024 * 1024)
+        block[::4096] = b"x" * len(block[::4096])
+        del block
+    with trace.stage("small"):
+        pass
+    assert trace["small"]["peak_delta_mb"] < 100
+    assert trace.peak_mb() >= trace["big"]["peak_mb"] > trace["small"]["peak_mb"] + 100
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import linregress
+
+from fish_stocking.trends import grouped_linregress
+
+
+def test_rows_without_a_group_are_left_out():
+    df = pd.DataFrame({
+        "Species": ["Walleye"] * 4 + [None] * 2,
+        "Year": [2000, 2001, 2002, 2003, 2000, 2001],
+        "Number": [10.0, 14.0, 15.0, 21.0, 1e6, 0.0],
+    })
+    result = grouped_linregress(df, ["Species"], "Year", "Number")
+    expected = linregress(df["Year"][:4], df["Number"][:4])
+    assert result["Species"].tolist() == ["Walleye"]
+    assert result["n"].tolist() == [4]
+    assert np.isclose(result["slope"][0], expected.slope)
+    assert np.isclose(result["pvalue"][0], expected.pvalue)
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from fish_stocking import validation
+from fish_stocking.loader import RAW_DATE_COLUMN, load_stocking_csv
+
+
+def stocking(rows):
+    df = pd.DataFrame(rows, columns=["Date", "County", "Water Body", "Site Name", "Species", "Strain", "Number"])
+    return df.astype({
+        "Date": "datetime64[ns]", "County": "category", "Species": "category", "Strain": "category",
+        "Number": "Int32",
+    })
+
+
+@pytest.fixture
+def df():
+    return stocking([
+        ("2020-05-01", "Kent", "Reeds Lake", "Launch", "Walleye", None, 100),
+        ("2020-05-01", "Kent", "Reeds Lake", "Launch", "Walleye", None, -5),
+        ("2020-05-02", "Kent", "Reeds Lake", "Launch", "Walleye", None, None),
+        ("1999-12-31", "Kent", "Reeds Lake", "Launch", "Walleye", None, 100),
+        (None, "Kent", "Reeds Lake", "Launch", "Walleye", None, 100),
+        ("2020-05-03", "Lucas", "Maumee River", "Dock", "Walleye", None, 100),
+        ("2020-05-01", "Kent", "Reeds Lake", "Launch", "Walleye", None, 100),
+    ])
+
+
+def test_each_rule_flags_its_rows(df):
+    masks = {name: mask.tolist() for name, (mask, _) in validation.rule_masks(df).items()}
+    assert masks["number_non_negative"] == [False, True, True, False, False, False, False]
+    assert masks["date_in_range"] == [False, False, False, True, True, False, False]
+    assert masks["known_county"] == [False, False, False, False, False, True, False]
+    assert masks["duplicate_event"] == [False] * 6 + [True]
+
+
+def test_consistent_flags_rare_pairs():
+    df = pd.DataFrame({"Strain": ["Seeforellen"] * 200 + ["Seeforellen"], "Species": ["Brown Trout"] * 200 + ["Walleye"]})
+    assert validation.consistent(df, ("Strain", "Species")).tolist() == [False] * 200 + [True]
+
+
+def test_errors_are_quarantined_warnings_only_reported(df):
+    valid, quarantine, report, samples = validation.validate(df)
+    assert quarantine.index.tolist() == [1, 2, 3, 4, 5]
+    assert quarantine.loc[5, "Failed Rules"] == "known_county"
+    assert len(valid) == 2 and valid.index.tolist() == [0, 1]
+    assert report.set_index("Rule")["Failed"].to_dict() == {
+        "number_non_negative": 2, "date_in_range": 2, "known_county": 1,
+        "duplicate_event": 1, "strain_matches_species": 0,
+    }
+    assert set(samples["Rule"]) == {"number_non_negative", "date_in_range", "known_county", "duplicate_event"}
+
+
+def test_counties_are_a_parameter(df):
+    assert 5 not in validation.validate(df, counties=["Kent", "Lucas"])[1].index
+    _, quarantine, report, _ = validation.validate(df, counties=None)
+    assert 5 not in quarantine.index and "known_county" not in set(report["Rule"])
+
+
+def test_quarantine_keeps_the_unparsed_date_text(tmp_path):
+    path = tmp_path / "fish.csv"
+    path.write_text(
+        "County,Water Body,Site Name,Species,Strain,Date,Number\n"
+        "Kent,Reeds Lake,Launch,Walleye,,4/24/2000 12:00:00 AM,100\n"
+        "Kent,Reeds Lake,Launch,Walleye,,24th of April,100\n"
+    )
+    df = load_stocking_csv(path)
+    assert df[RAW_DATE_COLUMN].isna().tolist() == [True, False]
+    valid, quarantine, _, _ = validation.validate(df)
+    assert quarantine[RAW_DATE_COLUMN].tolist() == ["24th of April"]
+    assert RAW_DATE_COLUMN not in valid
+
+
+def test_clean_dates_add_no_column(export_csv):
+    assert RAW_DATE_COLUMN not in load_stocking_csv(export_csv)